@@ -1,10 +1,15 @@
 
+from collections import OrderedDict, defaultdict
+from collections.abc import Sequence
+from functools import lru_cache
 from itertools import product
 from timeit import default_timer as timer
 
 from aimacode.logic import associate
+from aimacode.planning import Action
 from aimacode.search import InstrumentedProblem
-from aimacode.utils import expr
+from aimacode.utils import expr, Expr, Symbol
+from search_monitor import SearchMonitor
 
 
 class PrintableProblem(InstrumentedProblem):
@@ -16,16 +21,44 @@ class PrintableProblem(InstrumentedProblem):
             len(self.problem.actions_list), self.succs, self.goal_tests, self.states)
 
 
-def run_search(problem, search_function, parameter=None):
+def run_search(problem, search_function, parameter=None, progress=None, interval=1.0, labels=None):
+    """ Solve the problem with the search function and print the statistics of
+    the search and the plan
+
+    If progress is the path of a file, the progress of the search is appended
+    to it as JSON lines every interval seconds (see search_monitor.SearchMonitor),
+    with the fields in labels added to each record.
+    """
     ip = PrintableProblem(problem)
+    cache = getattr(problem, 'heuristic_cache', None)
+    cache_stats = cache.stats() if cache is not None else None
+    monitor = None
+    if progress is not None:
+        monitor = SearchMonitor(ip, progress, interval, labels)
+        if parameter is not None:
+            parameter = ip.timed(parameter)
     start = timer()
-    if parameter is not None:
-        node = search_function(ip, parameter)
-    else:
-        node = search_function(ip)
+    try:
+        if parameter is not None:
+            node = search_function(ip, parameter)
+        else:
+            node = search_function(ip)
+    finally:
+        if monitor is not None:
+            monitor.close()
     end = timer()
     print("\n# Actions   Expansions   Goal Tests   New Nodes")
     print("{}\n".format(ip))
+    for stat, value in sorted(ip.search_stats.items()):
+        print("{}: {}".format(stat.replace('_', ' ').capitalize(), value))
+    if monitor is not None:
+        summary = monitor.summary()
+        print("Expansions per second: {expansions_per_sec:.1f}  Peak explored: {peak_explored}  "
+              "Peak RSS: {peak_rss_mb:.1f} MB".format(**summary))
+        print("Heuristic time: {heuristic_time:.2f}s  Successor time: {successor_time:.2f}s".format(**summary))
+    if cache is not None and cache.stats()['misses'] > cache_stats['misses']:
+        print("Heuristic cache  hits: {hits}  misses: {misses}  evictions: {evictions}\n".format(
+            **{k: v - cache_stats[k] for k, v in cache.stats().items() if k in cache_stats}))
     show_solution(node, end - start)
     print()
 
@@ -65,7 +98,89 @@ def make_relations(name, *args, key=lambda x: True):
 
     See additional examples in example_have_cake.py and air_cargo_problems.py 
     """
-    return create_expressions("{}({})".format(name, ", ".join(c)) for c in product(*args) if key(c))
+    return [make_literal(name, *c) for c in product(*args) if key(c)]
+
+
+@lru_cache(maxsize=None)
+def make_literal(predicate, *args):
+    """ Build the expression predicate(*args) directly from the names of the
+    predicate and its arguments (without parsing a string with `expr`)
+
+    Literals are interned by (predicate, args), so every call with the same names
+    returns the same Expr instance.
+
+    Example
+    -------
+
+    >>> make_literal("At", "C1", "SFO") == expr("At(C1, SFO)")
+
+        True
+    """
+    return Expr(predicate, *(Symbol(arg) for arg in args))
+
+
+def prune_unreachable(initial, goal, actions):
+    """ Drop the actions and fluents that cannot be reached from the initial state
+
+    Reachability is computed as a fixpoint of the delete relaxation of the problem
+    that tracks positive and negative literals separately (i.e., the literals in
+    a planning graph without mutexes): an action is reachable once all of its
+    preconditions are reachable, and then all of its effects are reachable.
+
+    Parameters
+    ----------
+    initial : FluentState
+        The initial state of the problem
+
+    goal : iterable
+        The goal literals of the problem (goal fluents are never dropped, so that
+        unreachable goals still make the goal test fail)
+
+    actions : list
+        The grounded Action objects of the problem
+
+    Returns
+    -------
+    (FluentState, list)
+        The initial state without the fluents that can never become True, and the
+        reachable actions (in their original order) with any preconditions and
+        effects on the dropped fluents removed
+    """
+    reached_pos, reached_neg = set(initial.pos), set(initial.neg)
+    missing = []
+    waiting = defaultdict(list)
+    for idx, action in enumerate(actions):
+        preconditions = ([(p, True) for p in action.precond_pos if p not in reached_pos] +
+                         [(p, False) for p in action.precond_neg if p not in reached_neg])
+        missing.append(len(preconditions))
+        for literal in preconditions:
+            waiting[literal].append(idx)
+
+    queue = [idx for idx, count in enumerate(missing) if count == 0]
+    reachable = set(queue)
+    while queue:
+        action = actions[queue.pop()]
+        new_literals = ([(e, True) for e in action.effect_add if e not in reached_pos] +
+                        [(e, False) for e in action.effect_rem if e not in reached_neg])
+        for literal, value in new_literals:
+            (reached_pos if value else reached_neg).add(literal)
+            for idx in waiting.pop((literal, value), []):
+                missing[idx] -= 1
+                if missing[idx] == 0:
+                    reachable.add(idx)
+                    queue.append(idx)
+
+    dropped = set(initial.neg) - reached_pos - set(goal)
+    pruned = []
+    for idx, action in enumerate(actions):
+        if idx not in reachable:
+            continue
+        if dropped & (action.precond_neg | action.effect_rem):
+            action = Action(Expr(action.name, *action.args),
+                            [action.precond_pos, action.precond_neg - dropped],
+                            [action.effect_add, action.effect_rem - dropped])
+        pruned.append(action)
+    return FluentState(initial.pos, [f for f in initial.neg if f not in dropped]), pruned
 
 
 class FluentState:
@@ -107,6 +222,147 @@ def conjunctive_sentence(pos_list, neg_list):
     return associate('&', clauses)
 
 
+class HeuristicCache:
+    """ Bounded cache of heuristic values keyed by packed states
+
+    Heuristic values depend only on the state of a search node, so caching them
+    by (heuristic name, packed state) instead of by node avoids keeping search
+    nodes (and their whole chain of parents) alive after the search drops them.
+    A single cache is shared by all heuristics and all searches on a problem.
+
+    Parameters
+    ----------
+    maxsize : int or None
+        The maximum number of values to keep (None keeps every value)
+
+    policy : str
+        The eviction policy when the cache is full: 'lru' evicts the least
+        recently used value and 'fifo' evicts the oldest inserted value
+
+    Attributes
+    ----------
+    hits, misses, evictions : int
+        Counters of lookups that found a value, lookups that did not, and values
+        discarded to stay within maxsize
+    """
+    POLICIES = ('lru', 'fifo')
+
+    def __init__(self, maxsize=2**18, policy='lru'):
+        if policy not in self.POLICIES:
+            raise ValueError("Unknown eviction policy '{}'; choose from {}".format(policy, self.POLICIES))
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("maxsize must be a positive integer or None")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.hits = self.misses = self.evictions = 0
+        self._store = OrderedDict()
+
+    def get(self, key, default=None):
+        """ Return the cached value for key (or default), updating the counters """
+        try:
+            value = self._store[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        if self.policy == 'lru':
+            self._store.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """ Store a value, evicting old values if the cache is full """
+        self._store[key] = value
+        if self.maxsize is not None:
+            while len(self._store) > self.maxsize:
+                self._store.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self._store)}
+
+    def __len__(self):
+        return len(self._store)
+
+    def __repr__(self):
+        return '<HeuristicCache {}/{} {} hits={hits} misses={misses} evictions={evictions}>'.format(
+            len(self._store), self.maxsize, self.policy, **self.stats())
+
+
+def pack_state(state):
+    """ Pack an ordered sequence of True/False values into the bits of an int
+    (the value of element i is stored in bit i)
+
+    Packed states are much more compact than tuples of booleans, which makes
+    them a better choice for keys of large tables of states.
+    """
+    if isinstance(state, ZobristState):
+        return state.packed
+    return int(bytes(reversed(state)).translate(_BITS) or b'0', 2)
+
+
+_BITS = bytes.maketrans(b'\x00\x01', b'01')
+
+
+class ZobristState(Sequence):
+    """ Read-only sequence of True/False fluent values stored as the bits of an
+    int (see pack_state) together with a Zobrist hash of the state
+
+    The hash is the XOR of a random key for each True fluent, so the successor
+    of a state is hashed incrementally by toggling the keys of the fluents that
+    an action changes (see BasePlanningProblem.result). Hashing a state takes
+    constant time, and the packed bits are only compared when two hashes are
+    equal.
+
+    Attributes
+    ----------
+    packed : int
+        The fluent values of the state (bit i is the value of fluent i)
+
+    size : int
+        The number of fluents in the state
+    """
+    __slots__ = ('packed', 'size', '_hash')
+
+    def __init__(self, packed, size, hash_value):
+        self.packed = packed
+        self.size = size
+        self._hash = hash_value
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, ZobristState):
+            return self._hash == other._hash and self.packed == other.packed
+        return NotImplemented
+
+    def __lt__(self, other):
+        return tuple(self) < tuple(other)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("state index out of range")
+        return bool(self.packed >> index & 1)
+
+    def __iter__(self):
+        bits = format(self.packed, 'b').zfill(self.size)
+        return (bit == '1' for bit in reversed(bits))
+
+    def __repr__(self):
+        return repr(tuple(self))
+
+
 def encode_state(fs, fluent_map):
     """ Convert a FluentState (list of positive fluents and negative fluents) into
     an ordered sequence of True/False values.
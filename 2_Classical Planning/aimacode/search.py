@@ -5,10 +5,14 @@ then create problem instances and solve them with calls to the various search
 functions."""
 
 from .utils import (
-    is_in, memoize, print_table, Stack, FIFOQueue, PriorityQueue, name
+    is_in, memoize, print_table, Stack, IndexedStack, FIFOQueue,
+    IndexedPriorityQueue, name
 )
 
+import heapq
+import itertools
 import sys
+from timeit import default_timer as timer
 
 infinity = float('inf')
 
@@ -60,6 +64,24 @@ class Problem:
         and action. The default method costs 1 for every step in the path."""
         return c + 1
 
+    def state_key(self, state):
+        """Return a hashable key identifying the state, used by the graph
+        searches to detect repeated states. Override this method to use a
+        more compact representation than the state itself."""
+        return state
+
+    def report(self, **stats):
+        """Record statistics reported by a search algorithm at the end of
+        a search (e.g. the peak frontier size). The default method ignores
+        them; see InstrumentedProblem."""
+        pass
+
+    def expanded(self, node, frontier_size, explored_size):
+        """Called by the search algorithms each time they expand a node,
+        with the current sizes of their frontier and explored set. The
+        default method ignores the event; see InstrumentedProblem."""
+        pass
+
     def value(self, state):
         """For optimization problems, each state has a value.  Hill-climbing
         and related algorithms try to maximize this value."""
@@ -76,7 +98,13 @@ class Node:
     the total path_cost (also known as g) to reach the node.  Other functions
     may add an f and h value; see best_first_graph_search and astar_search for
     an explanation of how the f and h values are handled. You will not need to
-    subclass this class."""
+    subclass this class.
+
+    Search algorithms can create millions of nodes, so nodes use __slots__
+    instead of a per-instance __dict__; the f and h slots are left unset
+    until an algorithm caches a value in them (see utils.memoize)."""
+
+    __slots__ = ('state', 'parent', 'action', 'path_cost', 'depth', 'f', 'h')
 
     def __init__(self, state, parent=None, action=None, path_cost=0):
         "Create a search tree Node, derived from a parent by an action."
@@ -142,6 +170,7 @@ def tree_search(problem, frontier):
         node = frontier.pop()
         if problem.goal_test(node.state):
             return node
+        problem.expanded(node, len(frontier), 0)
         frontier.extend(node.expand(problem))
     return None
 
@@ -157,12 +186,37 @@ def graph_search(problem, frontier):
         if problem.goal_test(node.state):
             return node
         explored.add(node.state)
+        problem.expanded(node, len(frontier), len(explored))
         frontier.extend(child for child in node.expand(problem)
                         if child.state not in explored and
                         child not in frontier)
     return None
 
 
+def hashed_graph_search(problem, frontier):
+    """Search through the successors of a problem to find a goal, like
+    graph_search, but the explored set holds problem.state_key(state) and
+    the frontier must be a queue with hashed membership tests by the same
+    key (e.g. IndexedStack), so that checking a child against the explored
+    states and the frontier takes O(1) instead of scanning the frontier."""
+    key = problem.state_key
+    frontier.append(Node(problem.initial))
+    explored = set()
+    try:
+        while frontier:
+            node = frontier.pop()
+            if problem.goal_test(node.state):
+                return node
+            explored.add(key(node.state))
+            problem.expanded(node, len(frontier), len(explored))
+            frontier.extend(child for child in node.expand(problem)
+                            if key(child.state) not in explored and
+                            child not in frontier)
+        return None
+    finally:
+        problem.report(max_frontier=getattr(frontier, 'peak', len(frontier)))
+
+
 def breadth_first_tree_search(problem):
     "Search the shallowest nodes in the search tree first."
     return tree_search(problem, FIFOQueue())
@@ -175,57 +229,69 @@ def depth_first_tree_search(problem):
 
 def depth_first_graph_search(problem):
     "Search the deepest nodes in the search tree first."
-    return graph_search(problem, Stack())
+    return hashed_graph_search(problem, IndexedStack(lambda node: problem.state_key(node.state)))
 
 
 def breadth_first_search(problem):
-    "[Figure 3.11]"
+    """[Figure 3.11]
+    The explored set and the frontier index hold problem.state_key(state)
+    rather than the states themselves to reduce peak memory."""
+    key = problem.state_key
     node = Node(problem.initial)
     if problem.goal_test(node.state):
         return node
-    frontier = FIFOQueue()
+    frontier = FIFOQueue(key=lambda n: key(n.state))
     frontier.append(node)
     explored = set()
     while frontier:
         node = frontier.pop()
-        explored.add(node.state)
+        explored.add(key(node.state))
+        problem.expanded(node, len(frontier), len(explored))
         for child in node.expand(problem):
-            if child.state not in explored and child not in frontier:
+            if key(child.state) not in explored and child not in frontier:
                 if problem.goal_test(child.state):
                     return child
                 frontier.append(child)
     return None
 
 
-def best_first_graph_search(problem, f):
+def best_first_graph_search(problem, f, tie=None):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
     if f is a heuristic estimate to the goal, then we have greedy best
     first search; if f is node.depth then we have breadth-first search.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
-    a best first search you can examine the f values of the path returned."""
+    a best first search you can examine the f values of the path returned.
+    Nodes with equal f are ordered by tie(node) if it is specified, and
+    then first-in first-out. The frontier holds one node per state
+    (identified by problem.state_key), so a better path to a queued state
+    replaces the queued node."""
     f = memoize(f, 'f')
+    key = problem.state_key
     node = Node(problem.initial)
     if problem.goal_test(node.state):
         return node
-    frontier = PriorityQueue(min, f)
+    frontier = IndexedPriorityQueue(min, f, key=lambda n: key(n.state), tie=tie)
     frontier.append(node)
     explored = set()
-    while frontier:
-        node = frontier.pop()
-        if problem.goal_test(node.state):
-            return node
-        explored.add(node.state)
-        for child in node.expand(problem):
-            if child.state not in explored and child not in frontier:
-                frontier.append(child)
-            elif child in frontier:
-                incumbent = frontier[child]
-                if f(child) < f(incumbent):
-                    # del frontier[incumbent]
+    try:
+        while frontier:
+            node = frontier.pop()
+            if problem.goal_test(node.state):
+                return node
+            explored.add(key(node.state))
+            problem.expanded(node, len(frontier), len(explored))
+            for child in node.expand(problem):
+                if key(child.state) not in explored and child not in frontier:
                     frontier.append(child)
-    return None
+                elif child in frontier:
+                    incumbent = frontier[child]
+                    if f(child) < f(incumbent):
+                        frontier.append(child)  # decrease-key replaces the incumbent
+        return None
+    finally:
+        problem.report(max_frontier=frontier.peak)
 
 
 def uniform_cost_search(problem):
@@ -271,9 +337,340 @@ greedy_best_first_graph_search = best_first_graph_search
 def astar_search(problem, h=None):
     """A* search is best-first graph search with f(n) = g(n)+h(n).
     You need to specify the h function when you call astar_search, or
-    else in your Problem subclass."""
+    else in your Problem subclass. The f values are cached on the nodes,
+    so h is not memoized separately (expensive heuristics should cache
+    their own values by state)."""
+    h = h or problem.h
+    # among nodes with equal f, prefer the deepest (i.e., lowest h) nodes
+    return best_first_graph_search(problem, lambda n: n.path_cost + h(n),
+                                   tie=lambda n: -n.path_cost)
+
+
+def lazy_greedy_best_first_search(problem, h=None, preferred=None, boost=1000):
+    """Greedy best-first search with deferred heuristic evaluation: the
+    children of a node are queued with the h value of their parent, and h
+    is only computed for a node when it is removed from the queue (so one
+    evaluation per expanded node instead of one per generated node).
+
+    If preferred(node) is given, it returns the preferred operators of the
+    node (e.g., the helpful actions of a relaxed plan); the children reached
+    through them are also queued in a second queue. The queues are used in
+    turn, and the preferred queue gets boost extra turns each time a lower
+    h value is found. preferred(node) is called before h(node), so both can
+    be computed together. The number of heuristic evaluations and of nodes
+    expanded from the preferred queue are reported to the problem.
+
+    See Also
+    --------
+    Richter & Helmert, "Preferred operators and deferred evaluation in
+    satisficing planning" (2009)"""
+    h = h or problem.h
+    key = problem.state_key
+    counter = itertools.count()
+    queues = [[], []]       # regular and preferred queues of (h of parent, order, node)
+    turns = [0, 0]          # the queue with the fewest turns is used next
+    queues[0].append((0, next(counter), Node(problem.initial)))
+    closed = set()
+    best_h = infinity
+    evaluations = preferred_expansions = peak = 0
+    try:
+        while queues[0] or queues[1]:
+            which = min((i for i in (1, 0) if queues[i]), key=lambda i: turns[i])
+            turns[which] += 1
+            _, _, node = heapq.heappop(queues[which])
+            k = key(node.state)
+            if k in closed:
+                continue
+            closed.add(k)
+            if problem.goal_test(node.state):
+                return node
+            helpful = preferred(node) if preferred is not None else ()
+            value = h(node)
+            evaluations += 1
+            if value == infinity:
+                continue
+            if value < best_h:
+                best_h = value
+                turns[1] -= boost
+            preferred_expansions += which
+            problem.expanded(node, len(queues[0]) + len(queues[1]), len(closed))
+            for child in node.expand(problem):
+                if key(child.state) in closed:
+                    continue
+                entry = (value, next(counter), child)
+                heapq.heappush(queues[0], entry)
+                if child.action in helpful:
+                    heapq.heappush(queues[1], entry)
+            peak = max(peak, len(queues[0]) + len(queues[1]))
+        return None
+    finally:
+        problem.report(max_frontier=peak, evaluations=evaluations,
+                       preferred_expansions=preferred_expansions)
+
+
+def anytime_weighted_astar_search(problem, h=None, weight=3.0, step=0.5, time_limit=None):
+    """Anytime Repairing A* (ARA*): a generator that yields a plan found quickly
+    by weighted A* with f(n) = g(n) + weight*h(n), and then every better plan
+    it finds as the weight is lowered by step down to 1. Each weighted search
+    stops once no queued node can improve on the best plan (by its weighted f),
+    and the next search reuses the open nodes and best path costs of the last
+    one, only reopening the states whose path cost improved after they were
+    expanded. The generator stops when the time_limit (in seconds) runs out,
+    or after the search with weight 1, when the last plan is optimal (for an
+    admissible h). The last weight used and the number of plans found are
+    reported to the problem."""
     h = memoize(h or problem.h, 'h')
-    return best_first_graph_search(problem, lambda n: n.path_cost + h(n))
+    key = problem.state_key
+    deadline = None if time_limit is None else timer() + time_limit
+    root = Node(problem.initial)
+    if problem.goal_test(root.state):
+        yield root
+        return
+    best_g = {key(root.state): 0}
+    incumbent, solutions = None, 0
+    w = max(1.0, weight)
+    reopened = [root]
+    try:
+        while True:
+            frontier = IndexedPriorityQueue(min, lambda n: n.path_cost + w * h(n),
+                                            key=lambda n: key(n.state), tie=lambda n: -n.path_cost)
+            for node in reopened:
+                if node.path_cost == best_g[key(node.state)]:
+                    frontier.append(node)
+            closed, inconsistent = set(), {}
+            while frontier:
+                node = frontier.peek()
+                if incumbent is not None and node.path_cost + w * h(node) >= incumbent.path_cost:
+                    break
+                if deadline is not None and timer() > deadline:
+                    return
+                frontier.pop()
+                closed.add(key(node.state))
+                problem.expanded(node, len(frontier), len(closed))
+                for child in node.expand(problem):
+                    k = key(child.state)
+                    if child.path_cost >= best_g.get(k, infinity):
+                        continue
+                    best_g[k] = child.path_cost
+                    if problem.goal_test(child.state):
+                        if incumbent is None or child.path_cost < incumbent.path_cost:
+                            incumbent = child
+                            solutions += 1
+                            yield child
+                    elif k in closed:
+                        inconsistent[k] = child
+                    else:
+                        frontier.append(child)
+            if w == 1.0:
+                return
+            reopened = list(frontier) + list(inconsistent.values())
+            w = max(1.0, w - step)
+    finally:
+        problem.report(weight=w, solutions=solutions)
+
+
+def anytime_astar_search(problem, h=None, time_limit=60):
+    """Return the best plan found by anytime_weighted_astar_search within
+    time_limit seconds (or None if no plan was found in time)."""
+    best = None
+    for best in anytime_weighted_astar_search(problem, h, time_limit=time_limit):
+        pass
+    return best
+
+
+def iterative_deepening_astar_search(problem, h=None, table_size=2**16):
+    """IDA* search: repeated depth-first searches that only expand the nodes
+    with f(n) = g(n)+h(n) within a bound, raising the bound to the smallest
+    f value that exceeded it until a goal is found. The search is iterative
+    (so deep plans don't hit the recursion limit), and each iteration keeps
+    a transposition table with the cheapest path cost found to the states
+    (by problem.state_key) to prune duplicate paths. The table holds at most
+    table_size states: once it is full, only the states already in it are
+    updated, so the memory stays bounded and the paths to the other states
+    are just not pruned (the search stays optimal). The number of iterations,
+    the re-expansion overhead (the expansions beyond one per distinct state
+    expanded in the last iteration) and the largest table are reported to
+    the problem."""
+    h = h or problem.h
+    key = problem.state_key
+    root = Node(problem.initial)
+    root.f = bound = h(root)
+    iterations = expansions = max_table = 0
+    table, expanded = {}, set()
+    try:
+        while bound < infinity:
+            iterations += 1
+            next_bound = infinity
+            table, expanded = {key(root.state): 0}, set()
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                if node.f > bound:
+                    next_bound = min(next_bound, node.f)
+                    continue
+                if table.get(key(node.state), infinity) < node.path_cost:
+                    continue  # a cheaper path to the state was found after this node was pushed
+                if problem.goal_test(node.state):
+                    return node
+                expansions += 1
+                expanded.add(key(node.state))
+                problem.expanded(node, len(stack), len(table))
+                children = []
+                for child in node.expand(problem):
+                    k = key(child.state)
+                    best = table.get(k)
+                    if best is not None and best <= child.path_cost:
+                        continue
+                    if best is not None or len(table) < table_size:
+                        table[k] = child.path_cost
+                    child.f = child.path_cost + h(child)
+                    children.append(child)
+                # the child with the lowest f is popped (and expanded) first
+                children.sort(key=lambda n: n.f, reverse=True)
+                stack.extend(children)
+            max_table = max(max_table, len(table))
+            bound = next_bound
+        return None
+    finally:
+        max_table = max(max_table, len(table))
+        problem.report(iterations=iterations, reexpansions=expansions - len(expanded),
+                       max_table=max_table)
+
+
+class _MemoryNode(Node):
+    """A node of the tree kept in memory by SMA*. children holds the successors
+    currently in memory, forgotten maps the state keys of the successors that
+    were dropped to their backed-up f values (None if there are none), and token identifies the current
+    entry of the node in the open list (None if the node is not in it)."""
+
+    __slots__ = ('children', 'forgotten', 'token')
+
+    def __init__(self, state, parent=None, action=None, path_cost=0):
+        super().__init__(state, parent, action, path_cost)
+        self.children = []
+        self.forgotten = None
+        self.token = None
+
+
+def sma_star_search(problem, h=None, max_nodes=100000):
+    """SMA* search: A* that keeps at most max_nodes nodes in memory. When the
+    memory is full, the leaf with the highest f value (the shallowest among
+    ties) is forgotten and its f value is backed up in its parent, which is
+    regenerated if its forgotten successors become the most promising nodes
+    again. SMA* is optimal if max_nodes is enough to store the shallowest
+    optimal solution path (deeper nodes get f = infinity). The backed-up f
+    values never decrease, and the parent of forgotten nodes keeps their f
+    values by state, so a regenerated successor gets back the f value of the
+    subtree it headed. Successors are not generated if their state (by
+    problem.state_key) is on the path to the node, or if they are already
+    in memory as successors of the node. All the successors
+    of a node are generated at once, so the limit can be exceeded by the
+    successors of one node before the worst leaves are forgotten. The number
+    of regenerated nodes, forgotten nodes and the peak of nodes in memory
+    (after forgetting) are reported to the problem."""
+    if max_nodes < 2:
+        raise ValueError("max_nodes must be at least 2")
+    h = h or problem.h
+    key = problem.state_key
+    counter = itertools.count()
+    open_heap, leaf_heap = [], []  # (f, -depth, token, node), (-f, depth, token, node)
+
+    def push(node):
+        priority = node.f if node.forgotten is None else min(node.forgotten.values())
+        node.token = next(counter)
+        heapq.heappush(open_heap, (priority, -node.depth, node.token, node))
+        if not node.children:
+            heapq.heappush(leaf_heap, (-priority, node.depth, node.token, node))
+
+    def backup(node):
+        # the f value of an expanded node is the lowest f value of its successors
+        # (but never lower than before, so f values stay monotone)
+        while node is not None and (node.children or node.forgotten is not None):
+            f = min([c.f for c in node.children] + list((node.forgotten or {}).values()) or [infinity])
+            f = max(node.f, f)
+            if f == node.f:
+                break
+            node.f = f
+            node = node.parent
+
+    def forget(node):
+        parent = node.parent
+        parent.children.remove(node)
+        node.token = None
+        if parent.forgotten is None:
+            parent.forgotten = {}
+        parent.forgotten[key(node.state)] = node.f
+        push(parent)
+        backup(parent)
+
+    root = _MemoryNode(problem.initial)
+    root.f = h(root)
+    push(root)
+    used = peak = 1
+    regenerated = forgotten = 0
+    try:
+        while open_heap:
+            priority, _, token, node = heapq.heappop(open_heap)
+            if token != node.token:
+                continue
+            if priority == infinity:
+                return None
+            if node.forgotten is None and problem.goal_test(node.state):
+                return node
+            node.token = None
+            problem.expanded(node, used, used)
+
+            # the ancestors of the node and its successors still in memory are skipped
+            skipped = {key(c.state) for c in node.children}
+            ancestor = node
+            while ancestor is not None:
+                skipped.add(key(ancestor.state))
+                ancestor = ancestor.parent
+            successors = []
+            for action in problem.actions(node.state):
+                state = problem.result(node.state, action)
+                k = key(state)
+                if k in skipped:
+                    continue
+                skipped.add(k)
+                child = _MemoryNode(state, node, action,
+                                    problem.path_cost(node.path_cost, node.state, action, state))
+                if child.depth < max_nodes - 1:
+                    child.f = max(node.f, child.path_cost + h(child))
+                    if node.forgotten is not None and k in node.forgotten:
+                        child.f = max(child.f, node.forgotten[k])
+                else:
+                    child.f = infinity
+                successors.append(child)
+            if node.forgotten is not None:
+                regenerated += len(successors)
+                node.forgotten = None
+            if not successors and not node.children:
+                # a dead end is forgotten with f = infinity
+                node.f = infinity
+                if node.parent is None:
+                    return None
+                forget(node)
+                used -= 1
+                continue
+
+            node.children.extend(successors)
+            used += len(successors)
+            for child in successors:
+                push(child)
+            backup(node)
+
+            while used > max_nodes:
+                _, _, token, worst = heapq.heappop(leaf_heap)
+                if token != worst.token or worst.children or worst.parent is None:
+                    continue
+                forget(worst)
+                forgotten += 1
+                used -= 1
+            peak = max(peak, used)
+        return None
+    finally:
+        problem.report(reexpansions=regenerated, forgotten=forgotten, max_nodes_used=peak)
 
 # ______________________________________________________________________________
 # Other search algorithms
@@ -323,14 +720,50 @@ class InstrumentedProblem(Problem):
         self.problem = problem
         self.succs = self.goal_tests = self.states = 0
         self.found = None
+        self.search_stats = {}
+        self.observers = []
+        self.successor_time = self.heuristic_time = 0.0
+        # actions and result are only timed once an observer or a timed
+        # heuristic is registered, so plain benchmarks pay no timer calls
+        self.timing = False
+
+    def add_observer(self, observer):
+        """Call observer.expanded(node, frontier_size, explored_size) each
+        time the search expands a node (see Problem.expanded), and start
+        timing actions and result."""
+        self.observers.append(observer)
+        self.timing = True
+
+    def timed(self, h):
+        """Return h wrapped to add the time spent evaluating it to
+        heuristic_time, and start adding the time spent in actions and
+        result to successor_time."""
+        self.timing = True
+
+        def timed_h(node):
+            start = timer()
+            value = h(node)
+            self.heuristic_time += timer() - start
+            return value
+        return timed_h
 
     def actions(self, state):
         self.succs += 1
-        return self.problem.actions(state)
+        if not self.timing:
+            return self.problem.actions(state)
+        start = timer()
+        actions = self.problem.actions(state)
+        self.successor_time += timer() - start
+        return actions
 
     def result(self, state, action):
         self.states += 1
-        return self.problem.result(state, action)
+        if not self.timing:
+            return self.problem.result(state, action)
+        start = timer()
+        state = self.problem.result(state, action)
+        self.successor_time += timer() - start
+        return state
 
     def goal_test(self, state):
         self.goal_tests += 1
@@ -345,6 +778,16 @@ class InstrumentedProblem(Problem):
     def value(self, state):
         return self.problem.value(state)
 
+    def state_key(self, state):
+        return self.problem.state_key(state)
+
+    def report(self, **stats):
+        self.search_stats.update(stats)
+
+    def expanded(self, node, frontier_size, explored_size):
+        for observer in self.observers:
+            observer.expanded(node, frontier_size, explored_size)
+
     def __getattr__(self, attr):
         return getattr(self.problem, attr)
 
@@ -7,6 +7,7 @@ import operator
 import os.path
 import random
 import math
+import weakref
 
 import heapq
 from functools import lru_cache
@@ -142,15 +143,38 @@ class Expr(object):
     """A mathematical expression with an operator and 0 or more arguments.
     op is a str like '+' or 'sin'; args are Expressions.
     Expr('x') or Symbol('x') creates a symbol (a nullary Expr).
-    Expr('-', x) creates a unary; Expr('+', x, 1) creates a binary."""
-    __slots__ = ["op", "args", "__hash"]
-    def __init__(self, op, *args):
-        self.op = op
-        self.args = args
-        self.__hash = hash(self.op) ^ hash(self.args)
+    Expr('-', x) creates a unary; Expr('+', x, 1) creates a binary.
+
+    Exprs are immutable and hash-consed: structurally equal expressions are
+    the same object for as long as any reference to them exists, so equality
+    is usually an identity check. The negation of an expression is cached,
+    so ~e is constant time after the first call."""
+    __slots__ = ["op", "args", "__hash", "_inverse", "__weakref__"]
+    _interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, op, *args):
+        # arguments are interned, so expressions are keyed by their identity (they
+        # are kept alive by self.args); other arguments are keyed with their type
+        # so that 1 and 1.0 stay distinct
+        key = (op,) + tuple(id(arg) if isinstance(arg, Expr) else (type(arg), arg) for arg in args)
+        self = cls._interned.get(key)
+        if self is None:
+            self = super().__new__(cls)
+            self.op = op
+            self.args = args
+            self.__hash = hash(op) ^ hash(args)
+            self._inverse = None
+            cls._interned[key] = self
+        return self
+
+    def __reduce__(self):
+        # rebuild through __new__ so that unpickled expressions are interned
+        return (Expr, (self.op,) + self.args)
 
     def __eq__(self, other):
-        return (isinstance(other, Expr)
+        return (self is other or
+                isinstance(other, Expr)
+                and self.__hash == other.__hash
                 and self.op == other.op
                 and self.args == other.args)
 
@@ -159,7 +183,13 @@ class Expr(object):
     # custom unary operator overloads to handle 
     def __pos__(self): return self
     def __neg__(self): return self.args[0] if '-' == self.op else Expr("-", self)
-    def __invert__(self): return self.args[0] if '~' == self.op else Expr("~", self)
+
+    def __invert__(self):
+        if '~' == self.op:
+            return self.args[0]
+        if self._inverse is None:
+            self._inverse = Expr("~", self)
+        return self._inverse
 
     # Operator overloads
     # def __neg__(self): return Expr('-', self)
@@ -299,14 +329,16 @@ class defaultkeydict(collections.defaultdict):
 
 
 # ______________________________________________________________________________
-# Queues: Stack, FIFOQueue, PriorityQueue
+# Queues: Stack, IndexedStack, FIFOQueue, PriorityQueue, IndexedPriorityQueue
 
 
 class Queue:
     """Queue is an abstract class/interface. There are three types:
         Stack(): A Last In First Out Queue.
+        IndexedStack(key): A Stack with O(1) membership tests by key.
         FIFOQueue(): A First In First Out Queue.
         PriorityQueue(order, f): Queue in sorted order (default min-first).
+        IndexedPriorityQueue(order, f, key): PriorityQueue with one item per key.
     Each type supports the following methods and functions:
         q.append(item)  -- add an item to the queue
         q.extend(items) -- equivalent to: for item in items: q.append(item)
@@ -329,31 +361,68 @@ def Stack():
     return []
 
 
+class IndexedStack(Queue):
+    """A Last-In-First-Out Queue with an index of the keys of its items
+
+    ADDED TO AIMA VERSION
+        - Stack() is a plain list, so `item in stack` scans the whole stack;
+          the index makes membership tests O(1)
+        - Tracks the peak number of stacked items
+    """
+    def __init__(self, key=lambda x: x):
+        self.A = []
+        self.key = key
+        self.peak = 0
+        self.__keys = Counter()
+
+    def append(self, item):
+        key = self.key(item)
+        self.A.append((key, item))
+        self.__keys[key] += 1
+        if len(self.A) > self.peak:
+            self.peak = len(self.A)
+
+    def __len__(self):
+        return len(self.A)
+
+    def pop(self):
+        key, item = self.A.pop()
+        self.__keys[key] -= 1
+        if not self.__keys[key]:
+            del self.__keys[key]
+        return item
+
+    def __contains__(self, item):
+        return self.key(item) in self.__keys
+
+
 class FIFOQueue(Queue):
     """A First-In-First-Out Queue implemented with collections.deque
     
     MODIFIED FROM AIMA VERSION
         - Use deque
         - Use an additional dict to track membership
+        - Optionally track membership by key(item) instead of by item
     """
-    def __init__(self):
+    def __init__(self, key=None):
         self.A = deque()
+        self.key = key
         self.__keys = set()
 
     def append(self, item):
         self.A.append(item)
-        self.__keys.add(item)
+        self.__keys.add(item if self.key is None else self.key(item))
 
     def __len__(self):
         return len(self.A)
 
     def pop(self):
-        key = self.A.popleft()
-        self.__keys.discard(key)
-        return key
+        item = self.A.popleft()
+        self.__keys.discard(item if self.key is None else self.key(item))
+        return item
 
     def __contains__(self, item):
-        return item in self.__keys
+        return (item if self.key is None else self.key(item)) in self.__keys
 
 
 class PriorityQueue(Queue):
@@ -389,6 +458,121 @@ class PriorityQueue(Queue):
         if self._A[key] > 0:
             return key
 
+
+class IndexedPriorityQueue(Queue):
+    """A min-priority queue holding at most one item per key, implemented as
+    a binary heap with an index from each key to its position in the heap.
+
+    Items are ordered by f(item), then by tie(item) (if specified), then in
+    FIFO order, so ties are always broken deterministically. Appending an item
+    whose key is already queued replaces the queued item if the new one has
+    a lower priority (decrease-key); both operations take O(log n).
+
+    ADDED TO AIMA VERSION
+        - Replaces the duplicate entries left in PriorityQueue by improved
+          paths to a queued state with an in-place decrease-key
+        - Tracks the peak number of queued items
+    """
+
+    def __init__(self, order=min, f=lambda x: x, key=lambda x: x, tie=None):
+        if order is not min:
+            raise ValueError("IndexedPriorityQueue only supports min ordering")
+        self.heap = []      # entries are [priority, key, item]
+        self.index = {}     # key -> position of its entry in the heap
+        self.f = f
+        self.key = key
+        self.tie = tie
+        self.counter = 0
+        self.peak = 0
+
+    def _priority(self, item):
+        self.counter += 1
+        if self.tie is None:
+            return (self.f(item), self.counter)
+        return (self.f(item), self.tie(item), self.counter)
+
+    def append(self, item):
+        key = self.key(item)
+        priority = self._priority(item)
+        pos = self.index.get(key)
+        if pos is None:
+            self.heap.append([priority, key, item])
+            self.index[key] = len(self.heap) - 1
+            self._sift_up(len(self.heap) - 1)
+            self.peak = max(self.peak, len(self.heap))
+        elif priority < self.heap[pos][0]:
+            self.heap[pos] = [priority, key, item]
+            self._sift_up(pos)
+
+    def pop(self):
+        _, key, item = self.heap[0]
+        self._remove(0)
+        return item
+
+    def peek(self):
+        """Return the item that would be popped next without removing it."""
+        return self.heap[0][2]
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __iter__(self):
+        """Iterate over the queued items in no particular order."""
+        return (entry[2] for entry in self.heap)
+
+    def __contains__(self, item):
+        return self.key(item) in self.index
+
+    def __getitem__(self, item):
+        pos = self.index.get(self.key(item))
+        if pos is not None:
+            return self.heap[pos][2]
+
+    def __delitem__(self, item):
+        self._remove(self.index[self.key(item)])
+
+    def _remove(self, pos):
+        heap = self.heap
+        del self.index[heap[pos][1]]
+        last = heap.pop()
+        if pos < len(heap):
+            heap[pos] = last
+            self.index[last[1]] = pos
+            self._sift_down(self._sift_up(pos))
+
+    def _sift_up(self, pos):
+        heap, index = self.heap, self.index
+        entry = heap[pos]
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if not entry[0] < heap[parent][0]:
+                break
+            heap[pos] = heap[parent]
+            index[heap[pos][1]] = pos
+            pos = parent
+        heap[pos] = entry
+        index[entry[1]] = pos
+        return pos
+
+    def _sift_down(self, pos):
+        heap, index = self.heap, self.index
+        size = len(heap)
+        entry = heap[pos]
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if not heap[child][0] < entry[0]:
+                break
+            heap[pos] = heap[child]
+            index[heap[pos][1]] = pos
+            pos = child
+        heap[pos] = entry
+        index[entry[1]] = pos
+        return pos
+
 # ______________________________________________________________________________
 # Useful Shorthands
 
@@ -1,11 +1,14 @@
 
+import random
+
 from aimacode.planning import Action
-from aimacode.utils import expr
 from _utils import (
-    FluentState, encode_state, decode_state, create_expressions, make_relations
+    FluentState, encode_state, decode_state, create_expressions, make_relations,
+    make_literal, prune_unreachable
 )
 
-from planning_problem import BasePlanningProblem
+from pattern_databases import air_cargo_patterns, load_pattern_databases
+from planning_problem import BasePlanningProblem, cached_heuristic
 
     ##############################################################################
     #                 YOU DO NOT NEED TO MODIFY CODE IN THIS FILE                #
@@ -13,7 +16,7 @@ from planning_problem import BasePlanningProblem
 
 
 class AirCargoProblem(BasePlanningProblem):
-    def __init__(self, cargos, planes, airports, initial, goal):
+    def __init__(self, cargos, planes, airports, initial, goal, **kwargs):
         """
         Parameters
         ----------
@@ -35,12 +38,45 @@ class AirCargoProblem(BasePlanningProblem):
             A collection of literal fluents describing the goal state of
             the problem (each fluent should be an instance of the
             `aimacode.utils.Expr` class)
+
+        kwargs
+            The size and eviction policy of the heuristic cache (cache_size
+            and cache_policy; see BasePlanningProblem)
+
+        Notes
+        -----
+        Actions and fluents that cannot be reached from the initial state
+        (even ignoring delete effects) are dropped before the search starts.
         """
-        super().__init__(initial, goal)
         self.cargos = cargos
         self.planes = planes
         self.airports = airports
-        self.actions_list = self.get_actions()
+        initial, actions = prune_unreachable(initial, goal, self.get_actions())
+        super().__init__(initial, goal, **kwargs)
+        self.actions_list = actions
+        self._pattern_databases = None
+
+    @property
+    def pattern_databases(self):
+        """ The additive pattern databases of the cargos (built on first use, or
+        loaded from the disk cache of earlier runs)
+        """
+        if self._pattern_databases is None:
+            self._pattern_databases = load_pattern_databases(self, air_cargo_patterns(self))
+        return self._pattern_databases
+
+    @cached_heuristic
+    def h_pdb(self, node):
+        """ This heuristic adds the exact distances to the goal of the abstractions
+        that only keep the location of one cargo and the locations of the planes
+        (the flights are only counted in the first abstraction, so the sum is
+        admissible).
+
+        See Also
+        --------
+        pattern_databases.PatternDatabase
+        """
+        return self.pattern_databases.h(node.state)
 
     def get_actions(self):
         """ This method creates concrete actions (no variables) for all actions
@@ -65,13 +101,13 @@ class AirCargoProblem(BasePlanningProblem):
             for c in self.cargos:
                 for p in self.planes:
                     for a in self.airports:
-                        precond_pos = set([expr("At({}, {})".format(c, a)),
-                                       expr("At({}, {})".format(p, a))
-                                       ])
+                        precond_pos = set([make_literal("At", c, a),
+                                           make_literal("At", p, a)
+                                           ])
                         precond_neg = set([])
-                        effect_add = set([expr("In({}, {})".format(c, p))])
-                        effect_rem = set([expr("At({}, {})".format(c, a))])
-                        load = Action(expr("Load({}, {}, {})".format(c, p, a)),
+                        effect_add = set([make_literal("In", c, p)])
+                        effect_rem = set([make_literal("At", c, a)])
+                        load = Action(make_literal("Load", c, p, a),
                                       [precond_pos, precond_neg],
                                       [effect_add, effect_rem])
                         loads.append(load)
@@ -88,13 +124,13 @@ class AirCargoProblem(BasePlanningProblem):
             for c in self.cargos:
                 for p in self.planes:
                     for a in self.airports:
-                        precond_pos = set([expr("In({}, {})".format(c, p)),
-                                       expr("At({}, {})".format(p, a)),
-                                       ])
+                        precond_pos = set([make_literal("In", c, p),
+                                           make_literal("At", p, a),
+                                           ])
                         precond_neg = set([])
-                        effect_add = set([expr("At({}, {})".format(c, a))])
-                        effect_rem = set([expr("In({}, {})".format(c, p))])
-                        unload = Action(expr("Unload({}, {}, {})".format(c, p, a)),
+                        effect_add = set([make_literal("At", c, a)])
+                        effect_rem = set([make_literal("In", c, p)])
+                        unload = Action(make_literal("Unload", c, p, a),
                                       [precond_pos, precond_neg],
                                       [effect_add, effect_rem])
                         unloads.append(unload)
@@ -112,12 +148,12 @@ class AirCargoProblem(BasePlanningProblem):
                 for to in self.airports:
                     if fr != to:
                         for p in self.planes:
-                            precond_pos = set([expr("At({}, {})".format(p, fr)),
-                                           ])
+                            precond_pos = set([make_literal("At", p, fr),
+                                               ])
                             precond_neg = set([])
-                            effect_add = set([expr("At({}, {})".format(p, to))])
-                            effect_rem = set([expr("At({}, {})".format(p, fr))])
-                            fly = Action(expr("Fly({}, {}, {})".format(p, fr, to)),
+                            effect_add = set([make_literal("At", p, to)])
+                            effect_rem = set([make_literal("At", p, fr)])
+                            fly = Action(make_literal("Fly", p, fr, to),
                                          [precond_pos, precond_neg],
                                          [effect_add, effect_rem])
                             flys.append(fly)
@@ -199,3 +235,39 @@ def air_cargo_p4():
     init = FluentState(pos, [r for r in at_relations + in_relations if r not in pos])
     goal = create_expressions(['At(C1, JFK)', 'At(C2, SFO)', 'At(C3, JFK)', 'At(C4, SFO)', 'At(C5, JFK)'])
     return AirCargoProblem(cargos, planes, airports, init, goal)
+
+
+def air_cargo_random(num_cargos, num_planes, num_airports, seed=None):
+    """ Create an air cargo problem of arbitrary size with random initial and
+    goal locations
+
+    Parameters
+    ----------
+    num_cargos, num_planes, num_airports : int
+        The number of cargos (at least one), planes (at least one) and airports
+        (at least two) in the problem
+
+    seed : int, float, str, bytes or None
+        Seed of the random placements (see random.seed); the same arguments
+        always produce the same problem
+
+    Returns
+    -------
+    AirCargoProblem
+        A problem where every cargo and plane starts at a random airport, and
+        every cargo must be delivered to a random airport other than its start
+    """
+    if num_cargos < 1 or num_planes < 1 or num_airports < 2:
+        raise ValueError("Air cargo problems need at least one cargo, one plane and two airports")
+    rng = random.Random(seed)
+    cargos = ['C{}'.format(i + 1) for i in range(num_cargos)]
+    planes = ['P{}'.format(i + 1) for i in range(num_planes)]
+    airports = ['A{}'.format(i + 1) for i in range(num_airports)]
+    at_relations = make_relations('At', cargos + planes, airports)
+    in_relations = make_relations('In', cargos, planes)
+    start = {x: rng.choice(airports) for x in cargos + planes}
+    pos = [make_literal('At', x, start[x]) for x in cargos + planes]
+    positive = set(pos)
+    init = FluentState(pos, [r for r in at_relations + in_relations if r not in positive])
+    goal = [make_literal('At', c, rng.choice([a for a in airports if a != start[c]])) for c in cargos]
+    return AirCargoProblem(cargos, planes, airports, init, goal)
@@ -0,0 +1,119 @@
+
+import argparse
+import csv
+import json
+import os
+
+from collections import defaultdict
+from functools import partial
+
+from air_cargo_problems import air_cargo_random
+from experiments import run_experiments
+from run_search import SEARCHES
+
+
+DEFAULT_SIZES = ['2x2x2', '3x2x3', '4x2x4', '5x3x4', '6x3x5', '8x4x6']
+# searches are named 'SEARCH' or 'SEARCH:HEURISTIC' after their entries in run_search.SEARCHES
+DEFAULT_SEARCHES = ['breadth_first_search', 'greedy_best_first_graph_search:h_unmet_goals',
+                    'astar_search:h_unmet_goals', 'greedy_best_first_graph_search:h_ff',
+                    'astar_search:h_max', 'astar_search:h_ff']
+
+
+def search_label(search):
+    """ Name a [name, search_fn, heuristic] entry of run_search.SEARCHES """
+    name, _, heuristic = search
+    return "{}:{}".format(name, heuristic) if heuristic else name
+
+
+SEARCHES_BY_LABEL = {search_label(search): search for search in SEARCHES}
+
+
+def parse_size(size):
+    """ Convert a 'CARGOSxPLANESxAIRPORTS' string into a tuple of ints """
+    try:
+        cargos, planes, airports = map(int, size.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("sizes must look like CARGOSxPLANESxAIRPORTS, e.g. 3x2x4")
+    return cargos, planes, airports
+
+
+def make_problems(sizes, seeds):
+    """ Return [name, problem_fn] pairs of random air cargo problems for every
+    combination of size and seed (the problem functions can be pickled, so they
+    can be built in worker processes)
+    """
+    return [["Random Air Cargo {}x{}x{} seed {}".format(c, p, a, seed),
+             partial(air_cargo_random, c, p, a, seed)]
+            for c, p, a in sizes for seed in seeds]
+
+
+def plot_results(rows, path):
+    """ Plot expansions and runtime against the number of actions in the problem
+    (on log scales) for every search algorithm & heuristic combination. Runs that
+    timed out or failed are left out of the plot.
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("Install matplotlib to plot the benchmark results")
+        return
+
+    series = defaultdict(list)
+    for row in rows:
+        if row['plan_length'] not in (None, ''):
+            label = "{} {}".format(row['search'], row['heuristic']).strip()
+            series[label].append((int(row['actions']), int(row['expansions']), float(row['time'])))
+
+    fig, (ax_expansions, ax_time) = plt.subplots(1, 2, figsize=(14, 6))
+    for label, points in sorted(series.items()):
+        points.sort()
+        actions, expansions, times = zip(*points)
+        ax_expansions.plot(actions, expansions, marker='o', label=label)
+        ax_time.plot(actions, times, marker='o', label=label)
+    for ax, ylabel in [(ax_expansions, "Expansions"), (ax_time, "Time (seconds)")]:
+        ax.set_xscale('log')
+        ax.set_yscale('log')
+        ax.set_xlabel("Number of actions")
+        ax.set_ylabel(ylabel)
+    ax_time.legend(fontsize='small')
+    fig.tight_layout()
+    fig.savefig(path)
+    print("Saved plot to {}".format(path))
+
+
+def load_rows(path):
+    with open(path, newline='') as f:
+        if path.lower().endswith('.csv'):
+            return list(csv.DictReader(f))
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve randomly generated air cargo problems of " +
+        "increasing size with several search algorithms to find where each of them breaks down.")
+    parser.add_argument('--sizes', nargs='+', type=parse_size, metavar='CxPxA',
+                        default=[parse_size(s) for s in DEFAULT_SIZES],
+                        help="Problem sizes as CARGOSxPLANESxAIRPORTS (default: {})".format(" ".join(DEFAULT_SIZES)))
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0],
+                        help="Seeds of the random problems generated for each size (default: 0)")
+    parser.add_argument('-s', '--searches', nargs='+', metavar='SEARCH[:HEURISTIC]',
+                        choices=sorted(SEARCHES_BY_LABEL), default=DEFAULT_SEARCHES,
+                        help="Names of the search algorithms in run_search.py, with their heuristic if any " +
+                        "(default: {}; choose from: {})".format(" ".join(DEFAULT_SEARCHES),
+                                                               " ".join(sorted(SEARCHES_BY_LABEL))))
+    parser.add_argument('-o', '--output', default='benchmark.csv',
+                        help="Results file; completed experiments are skipped when it is reused (default: benchmark.csv)")
+    parser.add_argument('-j', '--jobs', type=int, help="Number of experiments to run at once (default: CPU count)")
+    parser.add_argument('--time-limit', type=float, default=300, help="Seconds allowed per experiment (default: 300)")
+    parser.add_argument('--memory-limit', type=int, help="Memory limit per experiment in MB")
+    parser.add_argument('--plot', default='benchmark.png', help="Output image (default: benchmark.png)")
+    args = parser.parse_args()
+
+    run_experiments(make_problems(args.sizes, args.seeds),
+                    [SEARCHES_BY_LABEL[label] for label in dict.fromkeys(args.searches)],
+                    args.output, processes=args.jobs, time_limit=args.time_limit,
+                    memory_limit=args.memory_limit)
+    if os.path.exists(args.output):
+        plot_results(load_rows(args.output), args.plot)
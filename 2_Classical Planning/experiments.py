@@ -0,0 +1,339 @@
+
+import csv
+import inspect
+import json
+import multiprocessing
+import os
+import resource
+import signal
+import traceback
+
+from multiprocessing.connection import wait
+from timeit import default_timer as timer
+
+from aimacode.search import InstrumentedProblem, Node
+
+
+RESULT_FIELDS = ['problem', 'search', 'heuristic', 'actions', 'expansions', 'goal_tests',
+                 'new_nodes', 'plan_length', 'time', 'peak_rss_mb', 'timeout', 'error']
+
+
+def cell_key(row):
+    """ Identify an experiment by the names of its problem, search and heuristic """
+    return (row['problem'], row['search'], row['heuristic'] or '')
+
+
+def run_cell(problem_name, problem_fn, search_name, search_fn, heuristic, memory_limit=None):
+    """ Solve one problem with one search and return a row of results
+
+    Parameters
+    ----------
+    problem_name, search_name : str
+        Names used to identify the experiment in the results
+
+    problem_fn : callable
+        A function with no arguments that returns the problem instance
+
+    search_fn : callable
+        A search function taking the problem (and the heuristic, if any)
+
+    heuristic : str
+        The name of a heuristic method of the problem, or an empty string
+
+    memory_limit : int or None
+        The maximum address space of the process in MB (the limit is applied
+        to the current process, so this should run in a worker process)
+
+    Returns
+    -------
+    dict with the keys in RESULT_FIELDS
+    """
+    if memory_limit:
+        limit = int(memory_limit) * 2**20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    row = dict.fromkeys(RESULT_FIELDS)
+    row.update(problem=problem_name, search=search_name, heuristic=heuristic or '', timeout=False)
+    start = timer()
+    try:
+        problem = problem_fn()
+        ip = InstrumentedProblem(problem)
+        if heuristic:
+            node = search_fn(ip, getattr(problem, heuristic))
+        else:
+            node = search_fn(ip)
+        row.update(actions=len(problem.actions_list), expansions=ip.succs,
+                   goal_tests=ip.goal_tests, new_nodes=ip.states,
+                   plan_length=len(node.solution()) if node is not None else None)
+    except MemoryError:
+        row['error'] = 'MemoryError'
+    except Exception:
+        row['error'] = traceback.format_exc(limit=1).strip().splitlines()[-1]
+    row['time'] = timer() - start
+    row['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return row
+
+
+def _worker(conn, args):
+    try:
+        conn.send(run_cell(*args))
+    finally:
+        conn.close()
+
+
+class ResultsFile:
+    """ Append-only store of experiment results in CSV (for files ending in
+    .csv) or JSON lines format, which lets an interrupted experiment resume
+    from the rows already written.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.csv = path.lower().endswith('.csv')
+
+    def completed(self):
+        """ Return the keys of the experiments that already have results """
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline='') as f:
+            if self.csv:
+                rows = list(csv.DictReader(f))
+            else:
+                rows = [json.loads(line) for line in f if line.strip()]
+        return set(cell_key(row) for row in rows)
+
+    def write(self, row):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', newline='') as f:
+            if self.csv:
+                writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(row) + '\n')
+
+
+def run_experiments(problems, searches, output, processes=None, time_limit=None,
+                    memory_limit=None, log=print):
+    """ Solve every problem with every search, running each experiment in its
+    own worker process, and append one row of results per experiment to the
+    output file. Experiments that already have results in the output file
+    are skipped, so an interrupted run can be resumed by running it again.
+
+    Parameters
+    ----------
+    problems : list
+        [name, problem_fn] pairs (see run_search.PROBLEMS)
+
+    searches : list
+        [name, search_fn, heuristic] triples (see run_search.SEARCHES)
+
+    output : str
+        Path of the results file (CSV if it ends in .csv, otherwise JSON lines)
+
+    processes : int or None
+        The maximum number of experiments to run at once (default: CPU count)
+
+    time_limit : float or None
+        The wall-clock limit of each experiment in seconds; experiments that run
+        out of time are killed and recorded with timeout=True
+
+    memory_limit : int or None
+        The address space limit of each experiment in MB
+
+    Returns
+    -------
+    list of the rows written by this call
+    """
+    results = ResultsFile(output)
+    done = results.completed()
+    pending = []
+    for pname, problem_fn in problems:
+        for sname, search_fn, heuristic in searches:
+            if (pname, sname, heuristic or '') in done:
+                log("Skipping {} using {} {} (already completed)".format(pname, sname, heuristic))
+                continue
+            pending.append((pname, problem_fn, sname, search_fn, heuristic, memory_limit))
+    pending.reverse()
+
+    try:
+        ctx = multiprocessing.get_context('fork')
+    except ValueError:
+        ctx = multiprocessing.get_context()
+    processes = processes or os.cpu_count() or 1
+    running = {}  # connection -> (process, args, start time)
+    rows = []
+
+    def finish(row):
+        results.write(row)
+        rows.append(row)
+        log("{problem} using {search} {heuristic}: plan length {plan_length}, "
+            "{expansions} expansions, {time:.2f}s{status}".format(
+                status=" (timeout)" if row['timeout'] else
+                       " ({})".format(row['error']) if row['error'] else "", **row))
+
+    try:
+        while pending or running:
+            while pending and len(running) < processes:
+                args = pending.pop()
+                receiver, sender = ctx.Pipe(duplex=False)
+                process = ctx.Process(target=_worker, args=(sender, args), daemon=True)
+                process.start()
+                sender.close()
+                running[receiver] = (process, args, timer())
+
+            timeout = None
+            if time_limit is not None:
+                timeout = max(0, min(t + time_limit for _, _, t in running.values()) - timer())
+            for conn in wait(list(running), timeout):
+                process, args, _ = running.pop(conn)
+                try:
+                    row = conn.recv()
+                except EOFError:
+                    # the worker died without reporting (e.g., killed by the OS)
+                    process.join()
+                    row = _failed_row(args, 'worker exited with code {}'.format(process.exitcode))
+                conn.close()
+                process.join()
+                finish(row)
+
+            if time_limit is not None:
+                now = timer()
+                for conn, (process, args, start) in list(running.items()):
+                    if now - start >= time_limit:
+                        process.terminate()
+                        process.join()
+                        conn.close()
+                        del running[conn]
+                        row = _failed_row(args, None)
+                        row.update(time=time_limit, timeout=True)
+                        finish(row)
+    finally:
+        for conn, (process, _, _) in running.items():
+            process.terminate()
+            conn.close()
+    return rows
+
+
+def _failed_row(args, error):
+    pname, _, sname, _, heuristic, _ = args
+    row = dict.fromkeys(RESULT_FIELDS)
+    row.update(problem=pname, search=sname, heuristic=heuristic or '', timeout=False, error=error)
+    return row
+
+
+def _exit_on_sigterm(signum, frame):
+    raise SystemExit(1)
+
+
+def _portfolio_worker(conn, problem_fn, search_fn, heuristic):
+    """ Solve the problem and send ('plan', (path cost, action indices),
+    expansions) for each plan found (every improving plan of the generators of
+    anytime searches), and then ('done', error, expansions)
+
+    Terminating the worker raises SystemExit in the search, so the resources it
+    holds are released by their finally clauses (like the worker processes of
+    a HeuristicPool, or the files of an external search).
+    """
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    error, ip = None, None
+    try:
+        problem = problem_fn()
+        index = {action: idx for idx, action in enumerate(problem.actions_list)}
+        ip = InstrumentedProblem(problem)
+        result = search_fn(ip, getattr(problem, heuristic)) if heuristic else search_fn(ip)
+        for node in (result if inspect.isgenerator(result) else [result]):
+            if node is not None:
+                conn.send(('plan', (node.path_cost, [index[action] for action in node.solution()]), ip.succs))
+    except MemoryError:
+        error = 'MemoryError'
+    except Exception:
+        error = traceback.format_exc(limit=1).strip().splitlines()[-1]
+    try:
+        conn.send(('done', error, ip.succs if ip is not None else None))
+    finally:
+        conn.close()
+
+
+def run_portfolio(problem_fn, searches, deadline=None, first=True, log=print):
+    """ Solve a problem with several searches at once, each in its own worker
+    process, and return the first plan found or the cheapest plan found by
+    the deadline; the searches still running at the end are terminated
+
+    Parameters
+    ----------
+    problem_fn : callable
+        A function with no arguments that returns the problem instance (each
+        worker builds its own instance)
+
+    searches : list
+        [name, search_fn, heuristic] triples (see run_search.SEARCHES); search
+        functions that are generators (like anytime_weighted_astar_search)
+        report each plan they yield
+
+    deadline : float or None
+        The number of seconds to wait for plans (None waits until a plan is
+        found, or until every search ends if first is False)
+
+    first : bool
+        Return as soon as a search finds a plan if True; otherwise, wait until
+        the deadline (or until every search ends) and return the cheapest plan
+
+    Returns
+    -------
+    (Node, list) or (None, None)
+        The goal node of the plan (in a new instance of the problem) and the
+        [name, search_fn, heuristic] triple of the search that found it
+    """
+    try:
+        ctx = multiprocessing.get_context('fork')
+    except ValueError:
+        ctx = multiprocessing.get_context()
+    start = timer()
+    running = {}  # connection -> (process, search)
+    best = best_search = None  # (path cost, action indices) of the cheapest plan
+    try:
+        for search in searches:
+            receiver, sender = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=_portfolio_worker, args=(sender, problem_fn, search[1], search[2]),
+                                  daemon=True)
+            process.start()
+            sender.close()
+            running[receiver] = (process, search)
+
+        while running and not (first and best is not None):
+            timeout = None if deadline is None else max(0, start + deadline - timer())
+            ready = wait(list(running), timeout)
+            if not ready:
+                log("Deadline of {}s reached".format(deadline))
+                break
+            for conn in ready:
+                process, (name, _, heuristic) = running[conn]
+                try:
+                    kind, value, expansions = conn.recv()
+                except EOFError:
+                    # the worker died without reporting (e.g., killed by the OS)
+                    process.join()
+                    kind, value, expansions = 'done', 'worker exited with code {}'.format(process.exitcode), None
+                if kind == 'plan':
+                    log("{} {}: plan length {}, cost {}, {} expansions, {:.2f}s".format(
+                        name, heuristic, len(value[1]), value[0], expansions, timer() - start))
+                    if best is None or value[0] < best[0]:
+                        best, best_search = value, running[conn][1]
+                else:
+                    log("{} {}: finished{}".format(name, heuristic, " ({})".format(value) if value else ""))
+                    conn.close()
+                    process.join()
+                    del running[conn]
+    finally:
+        for conn, (process, _) in running.items():
+            process.terminate()
+            process.join()
+            conn.close()
+
+    if best is None:
+        return None, None
+    problem = problem_fn()
+    node = Node(problem.initial)
+    for idx in best[1]:
+        node = node.child_node(problem, problem.actions_list[idx])
+    return node, best_search
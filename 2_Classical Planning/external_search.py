@@ -0,0 +1,168 @@
+
+import heapq
+import mmap
+import os
+import tempfile
+
+from aimacode.search import Node
+from _utils import pack_state
+
+
+# a rough estimate of the memory used by each state buffered in a Python set
+BYTES_PER_BUFFERED_STATE = 120
+
+
+class LayerFile:
+    """ A sorted file of distinct packed states, stored as fixed-width big-endian
+    records so that the order of the bytes is the order of the states
+    """
+    def __init__(self, path, width):
+        self.path = path
+        self.width = width
+
+    @classmethod
+    def write(cls, path, width, states):
+        """ Write the states (sorted and without duplicates) to a new file """
+        with open(path, 'wb') as f:
+            for state in states:
+                f.write(state.to_bytes(width, 'big'))
+        return cls(path, width)
+
+    def __len__(self):
+        return os.path.getsize(self.path) // self.width
+
+    def __iter__(self):
+        """ Yield the states of the file, reading it through a memory map """
+        if len(self) == 0:
+            return
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            width = self.width
+            for offset in range(0, len(data), width):
+                yield int.from_bytes(data[offset:offset + width], 'big')
+
+
+def _unique(states):
+    last = None
+    for state in states:
+        if state != last:
+            yield state
+            last = state
+
+
+def _difference(states, removed):
+    """ Yield the sorted states that are not in the sorted iterable removed """
+    removed = iter(removed)
+    current = next(removed, None)
+    for state in states:
+        while current is not None and current < state:
+            current = next(removed, None)
+        if state != current:
+            yield state
+
+
+def external_breadth_first_search(problem, ram_budget_mb=64, directory=None):
+    """ Breadth-first search that keeps its layers in sorted files on disk
+
+    The states of each layer are read from its file through a memory map and
+    expanded; their successors are buffered in memory until the buffer reaches
+    the RAM budget, and then sorted and written to a run file. Once the layer
+    is expanded, the runs are merged, and the states of the earlier layers are
+    removed by merging against their files (delayed duplicate detection), so
+    the next layer is again a sorted file of new states. Only the successor
+    buffer grows with the size of the problem, so the search can find the
+    optimal plan length of problems whose states do not fit in memory.
+
+    When a goal state is generated, the plan is reconstructed backward: each
+    earlier layer is scanned for a state with an action leading to the state
+    found in the next layer. The layer files are deleted at the end of the
+    search. The number of layers, of states stored on disk and of run files
+    are reported to the problem.
+
+    Parameters
+    ----------
+    problem : BasePlanningProblem
+        A planning problem with packed states (see BasePlanningProblem.make_state)
+
+    ram_budget_mb : float
+        The memory available to buffer the successors of a layer in MB
+
+    directory : str or None
+        The directory of the layer and run files (a new temporary directory if None)
+    """
+    width = max(1, (len(problem.state_map) + 7) // 8)
+    budget = max(1, int(ram_budget_mb * 2**20 / BYTES_PER_BUFFERED_STATE))
+    root = Node(problem.initial)
+    if problem.goal_test(root.state):
+        return root
+
+    workdir = tempfile.TemporaryDirectory(dir=directory)
+    layers = [LayerFile.write(os.path.join(workdir.name, 'layer0'), width, [pack_state(root.state)])]
+    stored = runs = 0
+    goal = None
+    try:
+        while goal is None and len(layers[-1]):
+            depth = len(layers)
+            buffer, run_files = set(), []
+
+            def flush():
+                path = os.path.join(workdir.name, 'layer{}.run{}'.format(depth, len(run_files)))
+                run_files.append(LayerFile.write(path, width, sorted(buffer)))
+                buffer.clear()
+
+            explored = sum(len(layer) for layer in layers)
+            for packed in layers[-1]:
+                state = problem.make_state(packed)
+                problem.expanded(Node(state, path_cost=depth - 1), len(buffer), explored)
+                for action in problem.actions(state):
+                    child = problem.result(state, action)
+                    if problem.goal_test(child):
+                        goal = pack_state(child)
+                        break
+                    buffer.add(pack_state(child))
+                    if len(buffer) >= budget:
+                        flush()
+                if goal is not None:
+                    break
+            if goal is not None:
+                break
+            if buffer or not run_files:
+                flush()
+            runs += len(run_files)
+
+            # merge the runs and remove the states of the earlier layers
+            merged = _unique(heapq.merge(*run_files))
+            if len(layers) > 1:
+                merged = _difference(merged, heapq.merge(*layers[:-1]))
+            merged = _difference(merged, layers[-1])
+            layers.append(LayerFile.write(os.path.join(workdir.name, 'layer{}'.format(depth)), width, merged))
+            stored += len(layers[-1])
+            for run in run_files:
+                os.remove(run.path)
+
+        if goal is None:
+            return None
+        return _reconstruct(problem, layers, goal)
+    finally:
+        problem.report(layers=len(layers), stored_states=stored + 1, run_files=runs)
+        workdir.cleanup()
+
+
+def _reconstruct(problem, layers, goal):
+    """ Return the goal node of a plan through the layers that reaches the goal
+    (a packed state generated from the last layer)
+    """
+    actions, target = [], goal
+    for layer in reversed(layers):
+        for packed in layer:
+            state = problem.make_state(packed)
+            for action in problem.actions(state):
+                if pack_state(problem.result(state, action)) == target:
+                    actions.append(action)
+                    target = packed
+                    break
+            if target == packed:
+                break
+    node = Node(problem.initial)
+    for action in reversed(actions):
+        node = node.child_node(problem, action)
+    return node
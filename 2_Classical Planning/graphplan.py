@@ -0,0 +1,152 @@
+
+from collections import defaultdict
+from itertools import chain, combinations
+
+from aimacode.search import Node
+from my_planning_graph import PlanningGraph
+
+
+class GraphPlan:
+    """ GraphPlan planner that extracts parallel plans backward from a planning graph
+
+    The planning graph is built without serializing the actions, so each step
+    of the plan can contain several actions that are pairwise non-mutex (and
+    may be executed in any order). Once the goals appear in the last literal
+    layer without mutexes between them, a plan is searched for by regression:
+    the goals of each level are assigned to non-mutex supporting actions, and
+    the preconditions of the chosen actions become the goals of the previous
+    level. Goal sets that cannot be achieved at a level are memoized as nogoods.
+
+    When the graph has leveled off, deeper levels are identical to the last
+    layer, so they are not built; they are read from the last layer instead.
+    The problem is unsolvable if the goals never appear without mutexes, or if
+    a failed extraction stage adds no nogoods at the level where the graph
+    leveled off.
+
+    Attributes
+    ----------
+    graph : PlanningGraph
+        The planning graph of the problem from its initial state
+
+    nogoods : dict
+        Mapping from each level to the set of goal sets (frozensets of
+        literals) that cannot be achieved at that level
+
+    See Also
+    --------
+    Blum & Furst, "Fast planning through planning graph analysis" (1997)
+    Russell-Norvig 10.3.2 (3rd Edition)
+    """
+    def __init__(self, problem):
+        self.graph = PlanningGraph(problem, problem.initial, serialize=False)
+        self.goal = frozenset(problem.goal)
+        self.nogoods = defaultdict(set)
+
+    def literal_layer(self, level):
+        layers = self.graph.literal_layers
+        return layers[min(level, len(layers) - 1)]
+
+    def action_layer(self, level):
+        layers = self.graph.action_layers
+        return layers[min(level, len(layers) - 1)]
+
+    def solve(self):
+        """ Extend the planning graph until a plan is extracted
+
+        Returns
+        -------
+        list(list(ActionNode)) or None
+            The actions executed at each level of the plan (including no-op
+            actions), or None if the problem is unsolvable
+        """
+        level = 0
+        nogoods_at_fixpoint = None
+        while True:
+            if self._is_reachable(self.goal, self.literal_layer(level)):
+                plan = self._extract(self.goal, level)
+                if plan is not None:
+                    return plan
+                if self.graph._is_leveled:
+                    fixpoint = len(self.graph.literal_layers) - 1
+                    if len(self.nogoods[fixpoint]) == nogoods_at_fixpoint:
+                        return None
+                    nogoods_at_fixpoint = len(self.nogoods[fixpoint])
+            elif self.graph._is_leveled:
+                return None
+            self.graph._extend()
+            level += 1
+
+    @property
+    def num_levels(self):
+        return len(self.graph.literal_layers)
+
+    def _is_reachable(self, goals, layer):
+        return (all(goal in layer for goal in goals) and
+                not any(layer.is_mutex(a, b) for a, b in combinations(goals, 2)))
+
+    def _extract(self, goals, level):
+        if level == 0:
+            return []
+        if goals in self.nogoods[level]:
+            return None
+        for step in self._assignments(goals, level):
+            preconditions = frozenset(chain.from_iterable(a.preconditions for a in step))
+            plan = self._extract(preconditions, level - 1)
+            if plan is not None:
+                return plan + [step]
+        self.nogoods[level].add(goals)
+        return None
+
+    def _assignments(self, goals, level):
+        """ Yield every set of pairwise non-mutex actions in the action layer before
+        the level that achieves all of the goals (with an explicit stack, so that
+        the depth of the recursion only grows with the number of levels)
+        """
+        literals, actions = self.literal_layer(level), self.action_layer(level - 1)
+        # the most constrained goals are assigned first
+        goals = sorted(goals, key=lambda goal: len(literals.parents[goal]))
+
+        def supporters(goal, chosen):
+            if any(goal in action.effects for action in chosen):
+                return iter([None])
+            # persisting a literal is tried before any real action
+            options = sorted(literals.parents[goal], key=lambda a: (not a.no_op, str(a)))
+            return iter([a for a in options if not any(actions.is_mutex(a, b) for b in chosen)])
+
+        picked = []
+        stack = [supporters(goals[0], picked)]
+        while stack:
+            action = next(stack[-1], False)
+            if action is False:
+                stack.pop()
+                if picked:
+                    picked.pop()
+                continue
+            picked.append(action)
+            chosen = [a for a in picked if a is not None]
+            if len(picked) == len(goals):
+                yield chosen
+                picked.pop()
+            else:
+                stack.append(supporters(goals[len(picked)], chosen))
+
+
+def graphplan_search(problem):
+    """ Solve a planning problem with GraphPlan and return the final node of a
+    sequential plan (the actions of each parallel step are applied in order)
+    """
+    planner = GraphPlan(problem)
+    steps = planner.solve()
+    problem.report(graph_levels=planner.num_levels,
+                   nogoods=sum(len(goals) for goals in planner.nogoods.values()),
+                   parallel_length=None if steps is None else len(steps))
+    if steps is None:
+        return None
+    actions = {str(action): action for action in problem.actions_list}
+    node = Node(problem.initial)
+    for step in steps:
+        for action in sorted(str(a) for a in step if not a.no_op):
+            node = node.child_node(problem, actions[action])
+    if not problem.goal_test(node.state):
+        raise RuntimeError("The plan extracted by GraphPlan does not reach the goal: {}".format(node.solution()))
+    return node
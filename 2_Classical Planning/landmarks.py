@@ -0,0 +1,207 @@
+
+from _utils import pack_state
+
+
+class LandmarkGraph:
+    """ Fact landmarks of a planning problem and the landmark count heuristic
+
+    A landmark is a set of literals (positive or negative, as in the relaxed
+    task) such that one of them is true at some point in every plan. The goals
+    are landmarks, and new landmarks are found by backchaining from them (a
+    simplified version of the RHW procedure used by LAMA): the first achievers
+    of a landmark are the actions that add one of its literals and that are
+    applicable in the delete relaxation before the landmark is first reached,
+    so every precondition shared by all of the first achievers is also a
+    landmark, and so is every set of preconditions with the same predicate
+    that contains a precondition of each first achiever (a disjunctive
+    landmark, e.g., the cargo is in one of the planes). These landmarks must be
+    achieved before the landmark (a greedy-necessary ordering).
+
+    The landmark count of a state is the number of landmarks that are not
+    accepted yet plus the accepted landmarks that are required again. A
+    landmark is accepted in a state when it is true and all the landmarks
+    ordered before it were accepted in the parent state, and it stays accepted
+    along the path; it is required again if it is false, and it is a goal or
+    it must be achieved before a landmark that is not accepted yet. Since the
+    accepted landmarks depend on the path, they are stored by state and
+    intersected over every path that reaches the state. They are scoped to one
+    search: evaluating a root node (a node without a parent) clears them, so
+    the heuristic values of a search do not depend on the searches before it.
+
+    Attributes
+    ----------
+    landmarks : list(frozenset(int))
+        The fact ids (see relaxed_heuristics.RelaxedTask) of the literals of
+        each landmark
+
+    orderings : list(set(int))
+        The indices of the landmarks that must be achieved before each landmark
+
+    Parameters
+    ----------
+    problem : BasePlanningProblem
+
+    max_disjunction : int
+        The largest number of literals in a disjunctive landmark
+
+    See Also
+    --------
+    Richter, Helmert & Westphal, "Landmarks revisited" (2008)
+    Richter & Westphal, "The LAMA planner" (2010)
+    """
+    def __init__(self, problem, max_disjunction=4):
+        self.problem = problem
+        self.task = task = problem.relaxed_task
+        num_fluents = task.num_fluents
+        initial = set(task.facts(problem.initial))
+        achievers = [[] for _ in range(task.num_facts)]
+        for action_id, effects in enumerate(task.effects):
+            for fact in effects:
+                achievers[fact].append(action_id)
+
+        def predicate(fact):
+            return problem.state_map[fact % num_fluents].op, fact < num_fluents
+
+        self.landmarks, self.orderings = [], []
+        index = {}
+        fact_landmarks = set()
+        queue = []
+
+        def add_landmark(facts):
+            if facts not in index:
+                if len(facts) > 1 and facts & fact_landmarks:
+                    return None  # implied by a fact landmark
+                index[facts] = len(self.landmarks)
+                self.landmarks.append(facts)
+                self.orderings.append(set())
+                if len(facts) == 1:
+                    fact_landmarks.update(facts)
+                queue.append(facts)
+            return index[facts]
+
+        for fact in task.goal:
+            add_landmark(frozenset([fact]))
+        while queue:
+            facts = queue.pop(0)
+            if facts & initial:
+                continue
+            candidates = sorted(set(a for fact in facts for a in achievers[fact]))
+            reachable = self._relaxed_reachable(initial, set(candidates))
+            first_achievers = [a for a in candidates
+                               if all(p in reachable for p in task.preconditions[a])]
+            if not first_achievers:
+                continue
+            shared = set(task.preconditions[first_achievers[0]])
+            for action_id in first_achievers[1:]:
+                shared.intersection_update(task.preconditions[action_id])
+            found = [frozenset([fact]) for fact in sorted(shared)]
+            # the other preconditions are grouped by predicate, and every group
+            # with a precondition of each first achiever is a disjunctive landmark
+            groups = None
+            for action_id in first_achievers:
+                grouped = {}
+                for fact in task.preconditions[action_id]:
+                    if fact not in shared:
+                        grouped.setdefault(predicate(fact), set()).add(fact)
+                if groups is None:
+                    groups = grouped
+                else:
+                    groups = {key: groups[key] | grouped[key] for key in groups if key in grouped}
+            found.extend(frozenset(group) for _, group in sorted(groups.items())
+                         if len(group) <= max_disjunction)
+            for landmark in found:
+                before = add_landmark(landmark)
+                if before is not None:
+                    self.orderings[index[facts]].add(before)
+
+        # each landmark is true in a packed state if it has a true positive
+        # fluent or a false negated fluent
+        self._masks = [(sum(1 << f for f in facts if f < num_fluents),
+                        sum(1 << (f - num_fluents) for f in facts if f >= num_fluents))
+                       for facts in self.landmarks]
+        self._order_masks = [sum(1 << i for i in before) for before in self.orderings]
+        self._goal_mask = sum(1 << index[frozenset([fact])] for fact in task.goal)
+        self._before_mask = [0] * len(self.landmarks)  # landmarks that must follow each landmark
+        for idx, before in enumerate(self.orderings):
+            for other in before:
+                self._before_mask[other] |= 1 << idx
+        self._all = (1 << len(self.landmarks)) - 1
+        self.accepted = {}
+
+    def _relaxed_reachable(self, initial, excluded):
+        """ Return the facts reachable from the initial facts in the delete
+        relaxation without applying the excluded actions
+        """
+        task = self.task
+        unsatisfied = [len(pre) for pre in task.preconditions]
+        reached = set(initial)
+        queue = list(initial)
+        for action_id, count in enumerate(unsatisfied):
+            if count == 0 and action_id not in excluded:
+                queue.extend(f for f in task.effects[action_id] if f not in reached)
+                reached.update(task.effects[action_id])
+        while queue:
+            fact = queue.pop()
+            for action_id in task.precondition_of[fact]:
+                unsatisfied[action_id] -= 1
+                if unsatisfied[action_id] == 0 and action_id not in excluded:
+                    for effect in task.effects[action_id]:
+                        if effect not in reached:
+                            reached.add(effect)
+                            queue.append(effect)
+        return reached
+
+    def true_landmarks(self, state):
+        """ Return the bit mask of the landmarks that are true in the state """
+        packed = pack_state(state)
+        mask = 0
+        for idx, (pos, neg) in enumerate(self._masks):
+            if packed & pos or ~packed & neg:
+                mask |= 1 << idx
+        return mask
+
+    def accepted_landmarks(self, node):
+        """ Return the bit mask of the landmarks accepted on the path to the node
+        (intersected with the landmarks accepted on the other paths to its state)
+        """
+        key = pack_state  # not problem.state_key, which can identify symmetric states
+        if node.parent is None:
+            self.accepted.clear()  # a new search starts
+        path = []
+        while node is not None and (not path or key(node.state) not in self.accepted):
+            path.append(node)
+            node = node.parent
+        parent_accepted = None if node is None else self.accepted[key(node.state)]
+        for node in reversed(path):
+            true = self.true_landmarks(node.state)
+            if parent_accepted is None:
+                accepted = true
+            else:
+                accepted = parent_accepted
+                for idx in range(len(self.landmarks)):
+                    bit = 1 << idx
+                    if true & bit and not accepted & bit and not self._order_masks[idx] & ~parent_accepted:
+                        accepted |= bit
+            k = key(node.state)
+            if k in self.accepted:
+                accepted &= self.accepted[k]
+            self.accepted[k] = parent_accepted = accepted
+        return parent_accepted
+
+    def landmark_count(self, node):
+        """ Return the number of landmarks that are not accepted or that are
+        required again in the state of the node
+        """
+        if self.problem.goal_test(node.state):
+            return 0
+        accepted = self.accepted_landmarks(node)
+        unaccepted = self._all & ~accepted
+        required = 0
+        false_accepted = accepted & ~self.true_landmarks(node.state)
+        idx = 0
+        while false_accepted >> idx:
+            if false_accepted >> idx & 1:
+                if self._goal_mask >> idx & 1 or self._before_mask[idx] & unaccepted:
+                    required += 1
+            idx += 1
+        return bin(unaccepted).count('1') + required
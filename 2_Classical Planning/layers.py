@@ -2,7 +2,8 @@
 from copy import deepcopy
 from functools import lru_cache
 from itertools import combinations
-from collections import defaultdict, MutableSet
+from collections import defaultdict
+from collections.abc import MutableSet
 
 from aimacode.planning import Action
 from aimacode.utils import expr, Expr
@@ -114,6 +115,16 @@ class BaseLayer(MutableSet):
         If _ignore_mutexes is True then _dynamic_ mutexes will be ignored (static
         mutexes are *always* enforced). For example, a literal X is always mutex
         with ~X, but "competing needs" or "inconsistent support" can be skipped
+
+    num_new_items : int
+        The number of items added to the layer after it was constructed (i.e.,
+        the items in this layer that were not copied from the previous layer)
+
+    num_mutexes : int
+        The number of distinct mutex pairs in the layer. Items and mutexes are
+        monotonic in a planning graph (items are never removed and mutexes are
+        never restored), so comparing these counters between two successive
+        layers is enough to detect when the graph has leveled off.
     """
     def __init__(self, items=[], parent_layer=None, ignore_mutexes=False):
         """
@@ -135,6 +146,8 @@ class BaseLayer(MutableSet):
         self._mutexes = defaultdict(set)
         self.parent_layer = parent_layer
         self._ignore_mutexes = ignore_mutexes
+        self.num_new_items = 0
+        self.num_mutexes = 0
 
     def __contains__(self, item):
         return item in self.__store
@@ -151,7 +164,9 @@ class BaseLayer(MutableSet):
             0 == len(self ^ other) and self._mutexes == other._mutexes)
 
     def add(self, item):
-        self.__store.add(item)
+        if item not in self.__store:
+            self.__store.add(item)
+            self.num_new_items += 1
 
     def discard(self, item):
         try:
@@ -160,6 +175,8 @@ class BaseLayer(MutableSet):
             pass
 
     def set_mutex(self, itemA, itemB):
+        if itemB not in self._mutexes[itemA]:
+            self.num_mutexes += 1
         self._mutexes[itemA].add(itemB)
         self._mutexes[itemB].add(itemA)
 
@@ -197,8 +214,9 @@ class BaseActionLayer(BaseLayer):
 
 
 class BaseLiteralLayer(BaseLayer):
-    def __init__(self, literals=[], parent_layer=None, ignore_mutexes=False):
+    def __init__(self, literals=[], parent_layer=None, ignore_mutexes=False, static_mutexes=None):
         super().__init__(literals, parent_layer, ignore_mutexes)
+        self._static_mutexes = static_mutexes or {}
         if isinstance(literals, BaseLiteralLayer):
             self.parents.update({k: set(v) for k, v in literals.parents.items()})
             self.children.update({k: set(v) for k, v in literals.children.items()})
@@ -207,6 +225,8 @@ class BaseLiteralLayer(BaseLayer):
         for literalA, literalB in combinations(iter(self), 2):
             if self._negation(literalA, literalB):
                 self.set_mutex(literalA, literalB)
+            elif literalB in self._static_mutexes.get(literalA, ()):
+                self.set_mutex(literalA, literalB)
             elif self._ignore_mutexes:
                 continue
             elif len(self.parent_layer) and self._inconsistent_support(literalA, literalB):
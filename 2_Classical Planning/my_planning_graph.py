@@ -131,7 +131,7 @@ class LiteralLayer(BaseLiteralLayer):
 
 
 class PlanningGraph:
-    def __init__(self, problem, state, serialize=True, ignore_mutexes=False):
+    def __init__(self, problem, state, serialize=True, ignore_mutexes=False, static_mutexes=None):
         """
         Parameters
         ----------
@@ -147,10 +147,16 @@ class PlanningGraph:
             should NOT be serialized for regression search (e.g., GraphPlan), and
             _should_ be serialized if the planning graph is being used to estimate
             a heuristic
+
+        static_mutexes : dict or None
+            A mapping from fluents to the fluents that can never be true at the
+            same time (e.g., problem.static_mutexes); these positive literals
+            are mutex in every literal layer, even if mutexes are ignored
         """
         self._serialize = serialize
         self._is_leveled = False
         self._ignore_mutexes = ignore_mutexes
+        self._static_mutexes = static_mutexes
         self.goal = set(problem.goal)
 
         # make no-op actions that persist every literal to the next layer
@@ -160,7 +166,7 @@ class PlanningGraph:
         # initialize the planning graph by finding the literals that are in the
         # first layer and finding the actions they they should be connected to
         literals = [s if f else ~s for f, s in zip(state, problem.state_map)]
-        layer = LiteralLayer(literals, ActionLayer(), self._ignore_mutexes)
+        layer = LiteralLayer(literals, ActionLayer(), self._ignore_mutexes, self._static_mutexes)
         layer.update_mutexes()
         self.literal_layers = [layer]
         self.action_layers = []
@@ -400,7 +406,7 @@ class PlanningGraph:
         parent_literals = self.literal_layers[-1]
         parent_actions = parent_literals.parent_layer
         action_layer = ActionLayer(parent_actions, parent_literals, self._serialize, self._ignore_mutexes)
-        literal_layer = LiteralLayer(parent_literals, action_layer, self._ignore_mutexes)
+        literal_layer = LiteralLayer(parent_literals, action_layer, self._ignore_mutexes, self._static_mutexes)
 
         for action in self._actionNodes:
             # actions in the parent layer are skipped because are added monotonically to planning graphs,
@@ -421,4 +427,7 @@ class PlanningGraph:
         literal_layer.update_mutexes()
         self.action_layers.append(action_layer)
         self.literal_layers.append(literal_layer)
-        self._is_leveled = literal_layer == action_layer.parent_layer
+        # the literal layer is a copy of its parent extended by the new action effects,
+        # so the graph is leveled when no literals were added and no mutexes were removed
+        self._is_leveled = (literal_layer.num_new_items == 0 and
+                            literal_layer.num_mutexes == parent_literals.num_mutexes)
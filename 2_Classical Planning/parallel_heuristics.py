@@ -0,0 +1,155 @@
+
+import multiprocessing
+import os
+
+from aimacode.search import Node, infinity
+from aimacode.utils import IndexedPriorityQueue
+
+
+_heuristic = None  # the heuristic of each worker process (see _init_worker)
+
+
+def _init_worker(h):
+    global _heuristic
+    _heuristic = h
+
+
+def _evaluate(state):
+    return _heuristic(Node(state))
+
+
+class HeuristicPool:
+    """ Pool of worker processes that evaluate a heuristic on batches of states
+
+    Every worker holds its own copy of the problem (and of the structures the
+    heuristic builds on first use, like the relaxed task or the caches), so
+    only the states and the heuristic values are sent between processes. The
+    heuristic must only depend on the state of the node (path-dependent
+    heuristics like h_landmark_count would lose their path).
+
+    Workers are forked when the platform supports it, so the heuristic does not
+    need to be picklable. Processes that cannot have children (like the worker
+    processes of experiments.run_experiments) evaluate the heuristic in-process.
+
+    Parameters
+    ----------
+    h : callable
+        The heuristic (a function of a node, e.g., problem.h_pg_setlevel)
+
+    processes : int or None
+        The number of worker processes (default: CPU count); the heuristic is
+        evaluated in the calling process if processes is 0
+
+    chunksize : int or None
+        The number of states sent to a worker at a time (default: a few chunks
+        per worker for each batch)
+    """
+    def __init__(self, h, processes=None, chunksize=None):
+        self.h = h
+        self.chunksize = chunksize
+        self.evaluations = self.batches = 0
+        if multiprocessing.current_process().daemon:
+            processes = 0
+        self.pool = None
+        if processes != 0:
+            try:
+                ctx = multiprocessing.get_context('fork')
+            except ValueError:
+                ctx = multiprocessing.get_context()
+            self.processes = processes if processes is not None else os.cpu_count() or 1
+            self.pool = ctx.Pool(self.processes, initializer=_init_worker, initargs=(h,))
+        else:
+            self.processes = 0
+
+    def evaluate(self, states):
+        """ Return the heuristic values of a list of states (in the same order) """
+        states = list(states)
+        self.evaluations += len(states)
+        self.batches += 1
+        if self.pool is None or len(states) < 2:
+            return [self.h(Node(state)) for state in states]
+        chunksize = self.chunksize or max(1, len(states) // (4 * self.processes))
+        return self.pool.map(_evaluate, states, chunksize)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parallel_astar_search(problem, h=None, processes=None, batch_size=1, pool=None):
+    """ A* search that evaluates the heuristic of all the children of an
+    expansion (or of batch_size expansions) at once in a HeuristicPool
+
+    With batch_size > 1 the nodes of a batch are expanded together, so some of
+    them may be expanded before a cheaper path to their state is found; such
+    states are reopened. A batch only takes the nodes with the smallest f value
+    of the frontier, so a goal in a batch is as cheap as any plan through the
+    other nodes of the batch, and the search stays optimal with admissible
+    heuristics. The number of heuristic batches is reported to the problem.
+
+    Parameters
+    ----------
+    problem : Problem
+
+    h : callable or None
+        The heuristic (problem.h if None)
+
+    processes : int or None
+        The number of worker processes of the pool (see HeuristicPool)
+
+    batch_size : int
+        The largest number of nodes popped and expanded before the heuristic
+        values of their children are computed
+
+    pool : HeuristicPool or None
+        A pool created by the caller for the heuristic (kept open at the end of
+        the search), so several searches can share the worker processes
+    """
+    h = h or problem.h
+    own_pool = pool is None
+    if own_pool:
+        pool = HeuristicPool(h, processes)
+    key = problem.state_key
+    root = Node(problem.initial)
+    root.f = root.path_cost + pool.evaluate([root.state])[0]
+    # as in astar_search, the deepest nodes are preferred among nodes with equal f
+    frontier = IndexedPriorityQueue(min, lambda node: node.f, key=lambda node: key(node.state),
+                                    tie=lambda node: -node.path_cost)
+    frontier.append(root)
+    best_cost = {key(root.state): root.path_cost}
+    reopened = 0
+    try:
+        while frontier:
+            batch = []
+            while frontier and len(batch) < batch_size and (not batch or frontier.peek().f <= batch[0].f):
+                node = frontier.pop()
+                if problem.goal_test(node.state):
+                    return node
+                batch.append(node)
+            children = {}
+            for node in batch:
+                problem.expanded(node, len(frontier), len(best_cost))
+                for child in node.expand(problem):
+                    k = key(child.state)
+                    if child.path_cost < best_cost.get(k, infinity):
+                        if k in best_cost and child not in frontier and k not in children:
+                            reopened += 1
+                        best_cost[k] = child.path_cost
+                        children[k] = child
+            values = pool.evaluate([child.state for child in children.values()])
+            for child, value in zip(children.values(), values):
+                child.f = child.path_cost + value
+                frontier.append(child)
+        return None
+    finally:
+        problem.report(max_frontier=frontier.peak, heuristic_batches=pool.batches, reopened=reopened)
+        if own_pool:
+            pool.close()
@@ -0,0 +1,302 @@
+
+import hashlib
+import os
+import tempfile
+
+from array import array
+from collections import deque
+
+from aimacode.search import infinity
+from _utils import pack_state
+from sas_translation import finite_domain_variables
+
+
+# change this whenever the tables change, so that stale caches are ignored
+CACHE_VERSION = b'pdb-2'
+
+# distances are stored in one byte, and this value marks the abstract states
+# from which the abstract goal cannot be reached
+UNREACHABLE = 255
+
+
+class PatternDatabase:
+    """ Exact goal distances of an abstraction of a planning problem
+
+    The abstraction projects every state onto the fluents of a pattern (a
+    subset of problem.state_map), and the preconditions and effects of the
+    actions onto the same fluents. The abstract states reachable from the
+    abstract initial state are found by a forward breadth-first search, and
+    their distances to the abstract goal (the goal fluents in the pattern) by
+    a backward breadth-first search over the reversed transitions. The
+    pattern fluents are covered by finite-domain variables (see
+    sas_translation.finite_domain_variables), and the abstract states that
+    break a mutex group are pruned, since no state of the problem projects
+    onto them. The distances are stored in a byte array indexed by the rank
+    of the values of the variables (a perfect hash), so the table has one
+    entry per combination of values and evaluating the heuristic is a table
+    lookup.
+
+    An action only costs 1 in the abstraction if it changes one of the owned
+    fluents of the pattern (all of them by default), and 0 otherwise. Several
+    pattern databases can be added without overestimating the cost of a plan
+    when no action changes owned fluents of two of them (a cost partitioning).
+
+    Parameters
+    ----------
+    problem : BasePlanningProblem
+
+    pattern : iterable
+        The fluents of the pattern (literals from problem.state_map)
+
+    owned : iterable or None
+        The fluents of the pattern whose changes are counted (the pattern if None)
+
+    table : array or None
+        The distances of a previous run (for the same problem and pattern)
+
+    Attributes
+    ----------
+    positions : list(int)
+        The bit positions of the pattern fluents in a packed state
+
+    variables : list(list)
+        The values of the variables of the pattern (see
+        sas_translation.finite_domain_variables)
+
+    size : int
+        The number of entries of the table (the product of the domain sizes)
+
+    table : array('B')
+        The distance to the abstract goal from every abstract state
+    """
+    def __init__(self, problem, pattern, owned=None, table=None):
+        index = {fluent: idx for idx, fluent in enumerate(problem.state_map)}
+        self.positions = sorted(set(index[fluent] for fluent in pattern))
+        self.pattern = [problem.state_map[pos] for pos in self.positions]
+        owned = self.pattern if owned is None else owned
+        self.owned = [fluent for fluent in self.pattern if fluent in set(owned)]
+        self.variables = finite_domain_variables(self.pattern, problem.mutex_groups)
+
+        # the rank of an abstract state is the sum of the weights of its true
+        # fluents, where the weight of the value of a variable is its index
+        # times the product of the domain sizes of the previous variables
+        self.size = 1
+        self._weights, self._groups = [], []
+        for values in self.variables:
+            for code, fluent in enumerate(values):
+                if fluent is not None and code:
+                    self._weights.append((index[fluent], code * self.size))
+            group = self._bits(sum(1 << index[fluent] for fluent in values if fluent is not None))
+            self._groups.append((group, values[0] is not None))
+            self.size *= len(values)
+        self.table = table if table is not None else self._build(problem)
+
+    def project(self, packed):
+        """ Return the abstract state (the index in the table) of a packed state """
+        return sum(weight for pos, weight in self._weights if packed >> pos & 1)
+
+    def h(self, state):
+        distance = self.table[self.project(pack_state(state))]
+        return infinity if distance == UNREACHABLE else distance
+
+    def _bits(self, packed):
+        """ Return the bits of the pattern fluents of a packed state """
+        abstract = 0
+        for bit, pos in enumerate(self.positions):
+            if packed >> pos & 1:
+                abstract |= 1 << bit
+        return abstract
+
+    def _rank(self, bits):
+        """ Return the index in the table of the bits of the pattern fluents """
+        return self.project(sum(1 << pos for bit, pos in enumerate(self.positions) if bits >> bit & 1))
+
+    def _consistent(self, bits):
+        """ Return True if the bits of the pattern fluents respect every group """
+        for group, exactly_one in self._groups:
+            true = bits & group
+            if true & (true - 1) or (exactly_one and not true):
+                return False
+        return True
+
+    def _build(self, problem):
+        unknown = 1 << len(problem.state_map)
+        owned = self._bits(sum(1 << problem.state_map.index(f) for f in self.owned))
+        transitions = {}
+        for action in problem.actions_list:
+            pos, neg, add, rem = problem._masks(action)
+            if pos & unknown:
+                continue  # never applicable
+            add, rem = self._bits(add), self._bits(rem)
+            if not add | rem:
+                continue  # a self loop in the abstraction
+            key = (self._bits(pos), self._bits(neg), add, rem & ~add)
+            cost = 1 if (add | rem) & owned else 0
+            transitions[key] = min(cost, transitions.get(key, cost))
+
+        # forward reachability, recording the reversed transitions
+        initial = self._bits(pack_state(problem.initial))
+        predecessors = {initial: []}
+        queue = deque([initial])
+        while queue:
+            state = queue.popleft()
+            for (pos, neg, add, rem), cost in transitions.items():
+                if state & pos == pos and not state & neg:
+                    successor = (state & ~rem) | add
+                    if successor == state or not self._consistent(successor):
+                        continue
+                    if successor not in predecessors:
+                        predecessors[successor] = []
+                        queue.append(successor)
+                    predecessors[successor].append((state, cost))
+
+        # backward 0-1 breadth-first search from the abstract goal states
+        goal = self._bits(problem._goal_mask)
+        distances = {}
+        queue = deque()
+        for state in predecessors:
+            if state & goal == goal:
+                distances[state] = 0
+                queue.append(state)
+        while queue:
+            state = queue.popleft()
+            distance = distances[state]
+            for predecessor, cost in predecessors[state]:
+                if distance + cost < min(distances.get(predecessor, UNREACHABLE), UNREACHABLE):
+                    distances[predecessor] = distance + cost
+                    if cost:
+                        queue.append(predecessor)
+                    else:
+                        queue.appendleft(predecessor)
+        table = array('B', [UNREACHABLE]) * self.size
+        for state, distance in distances.items():
+            table[self._rank(state)] = distance
+        return table
+
+    def digest(self, problem):
+        """ Return a digest of the problem and the pattern that identifies the table """
+        description = [CACHE_VERSION, repr(self.variables).encode(), repr(self.owned).encode(),
+                       repr(problem.state_map).encode(), repr(pack_state(problem.initial)).encode(),
+                       repr(sorted(map(str, problem.goal))).encode()]
+        description.extend(repr((str(action),) + problem._masks(action)).encode()
+                           for action in problem.actions_list)
+        return hashlib.sha256(b'\0'.join(description)).hexdigest()
+
+
+class PatternDatabases:
+    """ Heuristic that combines several pattern databases
+
+    Parameters
+    ----------
+    databases : list(PatternDatabase)
+
+    combine : str
+        'sum' to add the distances of the databases (admissible if no action
+        changes owned fluents of two of them), or 'max' to take the largest
+    """
+    def __init__(self, databases, combine='sum'):
+        if combine not in ('sum', 'max'):
+            raise ValueError("Unknown combination {!r} (choose 'sum' or 'max')".format(combine))
+        self.databases = databases
+        self.combine = sum if combine == 'sum' else max
+
+    def h(self, state):
+        return self.combine(database.h(state) for database in self.databases)
+
+
+def air_cargo_patterns(problem, additive=True):
+    """ Return one pattern for each cargo of an AirCargoProblem: the location of
+    the cargo and the locations of the planes
+
+    If additive is True, the plane locations are only owned by the first
+    pattern, so the pattern databases can be added.
+
+    Returns
+    -------
+    list(tuple(list, list))
+        The fluents and owned fluents of each pattern
+    """
+    def fluents_of(names):
+        return [f for f in problem.state_map if f.args and str(f.args[0]) in names]
+
+    planes = fluents_of(set(problem.planes))
+    patterns = []
+    for idx, cargo in enumerate(problem.cargos):
+        cargo_fluents = fluents_of({cargo})
+        if additive:
+            owned = cargo_fluents + (planes if idx == 0 else [])
+        else:
+            owned = cargo_fluents + planes
+        patterns.append((cargo_fluents + planes, owned))
+    return patterns
+
+
+def default_cache_dir():
+    """ Return the default directory of the table cache: pattern_databases in
+    the user cache directory ($XDG_CACHE_HOME or ~/.cache), or in the
+    temporary directory if the user has no home directory
+    """
+    base = os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        home = os.path.expanduser('~')
+        base = os.path.join(home, '.cache') if home != '~' else tempfile.gettempdir()
+    return os.path.join(base, 'pattern_databases')
+
+
+def load_pattern_databases(problem, patterns, combine='sum', cache_dir=None, use_cache=True, max_size=2**24):
+    """ Build the pattern databases of a problem, or load them from a disk cache
+
+    Each table is stored in cache_dir (see default_cache_dir) under the
+    SHA-256 digest of the problem and the pattern, so later runs on the same
+    instance only read the tables.
+
+    Parameters
+    ----------
+    problem : BasePlanningProblem
+
+    patterns : list(tuple(list, list))
+        The fluents and owned fluents of each pattern (see air_cargo_patterns)
+
+    combine : str
+        How the distances are combined (see PatternDatabases)
+
+    cache_dir : str or None
+        The directory of the table cache
+
+    use_cache : bool
+        If False, the tables are always built and the cache is not updated
+
+    max_size : int
+        The largest number of entries of a table (the product of the domain
+        sizes of the variables of its pattern)
+
+    Returns
+    -------
+    PatternDatabases
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    databases = []
+    for pattern, owned in patterns:
+        database = PatternDatabase(problem, pattern, owned, table=array('B'))
+        if database.size > max_size:
+            raise ValueError("The table of the pattern has {} entries (at most {} are allowed)".format(
+                database.size, max_size))
+        path = os.path.join(cache_dir, database.digest(problem) + '.pdb')
+        size = database.size
+        if use_cache:
+            try:
+                with open(path, 'rb') as f:
+                    database.table.fromfile(f, size)
+            except (OSError, EOFError):
+                database.table = array('B')
+        if len(database.table) != size:
+            database.table = database._build(problem)
+            if use_cache:
+                os.makedirs(cache_dir, exist_ok=True)
+                temp_path = '{}.{}.tmp'.format(path, os.getpid())
+                with open(temp_path, 'wb') as f:
+                    database.table.tofile(f)
+                os.replace(temp_path, path)
+        databases.append(database)
+    return PatternDatabases(databases, combine)
@@ -0,0 +1,320 @@
+
+import hashlib
+import os
+import pickle
+import re
+
+from itertools import product
+
+from aimacode.planning import Action
+from _utils import FluentState, make_literal, prune_unreachable
+from planning_problem import BasePlanningProblem
+
+
+# change this whenever the compiled problems change, so that stale caches are ignored
+CACHE_VERSION = b'pddl-2'
+
+
+class PddlProblem(BasePlanningProblem):
+    def __init__(self, initial, goal, actions, name=None, **kwargs):
+        """
+        Parameters
+        ----------
+        initial : FluentState
+            A representation of the initial problem state as a collection
+            of positive and negative literals (each literal fluent should
+            be an `aimacode.utils.Expr` instance)
+
+        goal : iterable
+            A collection of literal fluents describing the goal state of
+            the problem (each fluent should be an instance of the
+            `aimacode.utils.Expr` class)
+
+        actions : list
+            The grounded Action objects of the problem
+
+        name : str
+            The name of the problem in its PDDL file
+
+        kwargs
+            The size and eviction policy of the heuristic cache (cache_size
+            and cache_policy; see BasePlanningProblem)
+        """
+        super().__init__(initial, goal, **kwargs)
+        self.actions_list = actions
+        self.name = name
+
+
+def parse_sexp(text):
+    """ Parse the s-expressions in a PDDL string into nested lists of strings
+
+    Example
+    -------
+
+    >>> parse_sexp("(define (domain cargo)) ; comment")
+
+        [['define', ['domain', 'cargo']]]
+    """
+    tokens = re.findall(r'\(|\)|[^\s()]+', re.sub(r';[^\n]*', '', text))
+    stack = [[]]
+    for token in tokens:
+        if token == '(':
+            stack.append([])
+        elif token == ')':
+            if len(stack) == 1:
+                raise ValueError("Unbalanced ')' in PDDL")
+            expression = stack.pop()
+            stack[-1].append(expression)
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1:
+        raise ValueError("Unbalanced '(' in PDDL")
+    return stack[0]
+
+
+def compile_pddl(domain_text, problem_text):
+    """ Ground a STRIPS planning problem written in PDDL
+
+    The supported subset of PDDL is STRIPS with typing, negative preconditions
+    and equality: preconditions are conjunctions of (possibly negated) atoms
+    and equalities, effects are conjunctions of add and delete effects, and
+    goals are conjunctions of atoms.
+
+    Predicates that no action changes are static: their atoms are evaluated
+    against the initial state while grounding, and only the actions whose
+    static preconditions hold are kept. The static goals that hold in the
+    initial state are dropped, and a static goal that does not hold makes the
+    problem unsolvable, so it raises a ValueError. Actions and fluents that
+    cannot be reached from the initial state are then dropped (see
+    prune_unreachable).
+
+    Parameters
+    ----------
+    domain_text, problem_text : str
+        The contents of the PDDL domain and problem files
+
+    Returns
+    -------
+    PddlProblem
+    """
+    return PddlProblem(*_ground(domain_text, problem_text))
+
+
+def _ground(domain_text, problem_text):
+    """ Return the initial state, goal, actions and name of the grounded
+    problem (see compile_pddl)
+    """
+    domain = _Domain(_definition(domain_text, 'domain'))
+    problem = _definition(problem_text, 'problem')
+
+    name, objects, init, goal = problem['name'], dict(domain.constants), set(), []
+    for section in problem['sections']:
+        keyword = section[0].lower()
+        if keyword == ':objects':
+            objects.update(_typed_list(section[1:]))
+        elif keyword == ':init':
+            init.update(_atom(atom) for atom in section[1:])
+        elif keyword == ':goal':
+            literals, equalities = _conjunction(section[1] if len(section) > 1 else [])
+            if equalities or not all(positive for positive, _ in literals):
+                raise ValueError("Only conjunctions of atoms are supported as PDDL goals")
+            goal = [atom for _, atom in literals]
+
+    fluent_predicates = set(p for schema in domain.actions for _, (p, _) in schema['effects'])
+    static = set(atom for atom in init if atom[0] not in fluent_predicates)
+    for atom in goal:
+        if atom[0] not in fluent_predicates and atom not in static:
+            raise ValueError("The static goal {} is false in the initial state".format(_literal(atom)))
+    goal = [atom for atom in goal if atom[0] in fluent_predicates]
+    actions = []
+    for schema in domain.actions:
+        names = [param for param, _ in schema['parameters']]
+        candidates = [[obj for obj, obj_type in objects.items() if domain.is_subtype(obj_type, param_type)]
+                      for _, param_type in schema['parameters']]
+        for binding in product(*candidates):
+            values = dict(zip(names, binding))
+            ground = lambda atom: (atom[0], tuple(values.get(arg, arg) for arg in atom[1]))
+            if any((values.get(a, a) == values.get(b, b)) != equal for equal, a, b in schema['equalities']):
+                continue
+            preconditions = [(positive, ground(atom)) for positive, atom in schema['preconditions']]
+            if any((atom in static) != positive for positive, atom in preconditions if atom[0] not in fluent_predicates):
+                continue
+            precond_pos = [_literal(atom) for positive, atom in preconditions if positive and atom[0] in fluent_predicates]
+            precond_neg = [_literal(atom) for positive, atom in preconditions
+                           if not positive and atom[0] in fluent_predicates]
+            effect_add = [_literal(ground(atom)) for positive, atom in schema['effects'] if positive]
+            effect_rem = [_literal(ground(atom)) for positive, atom in schema['effects'] if not positive]
+            actions.append(Action(make_literal(schema['name'], *binding),
+                                  [precond_pos, precond_neg], [effect_add, effect_rem]))
+
+    pos = [_literal(atom) for atom in sorted(init) if atom[0] in fluent_predicates]
+    goal = [_literal(atom) for atom in goal]
+    known = set(pos)
+    neg = {}
+    for literal in goal + [l for a in actions for l in (a.precond_pos | a.precond_neg | a.effect_add | a.effect_rem)]:
+        if literal not in known:
+            neg[literal] = None
+    initial, actions = prune_unreachable(FluentState(pos, list(neg)), goal, actions)
+    return initial, goal, actions, name
+
+
+def load_pddl(domain_file, problem_file, cache_dir=None, use_cache=True, **kwargs):
+    """ Load a planning problem from PDDL domain and problem files
+
+    The grounded tasks (the initial state, goal, actions and name) are pickled
+    in cache_dir (a __pddlcache__ directory next to the problem file by default)
+    under the SHA-256 digest of the contents of both files, so loading the same
+    files again skips parsing and grounding.
+
+    Parameters
+    ----------
+    domain_file, problem_file : str
+        Paths of the PDDL domain and problem files
+
+    cache_dir : str or None
+        The directory of the compiled problem cache
+
+    use_cache : bool
+        If False, the problem is always compiled and the cache is not updated
+
+    kwargs
+        The size and eviction policy of the heuristic cache of the problem
+        (see BasePlanningProblem)
+
+    Returns
+    -------
+    PddlProblem
+    """
+    with open(domain_file, 'rb') as f:
+        domain_bytes = f.read()
+    with open(problem_file, 'rb') as f:
+        problem_bytes = f.read()
+    if not use_cache:
+        return PddlProblem(*_ground(domain_bytes.decode(), problem_bytes.decode()), **kwargs)
+
+    digest = hashlib.sha256(b'\0'.join([CACHE_VERSION, domain_bytes, problem_bytes])).hexdigest()
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(problem_file)), '__pddlcache__')
+    path = os.path.join(cache_dir, digest + '.pickle')
+    try:
+        with open(path, 'rb') as f:
+            task = pickle.load(f)
+        return PddlProblem(*task, **kwargs)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        pass
+
+    task = _ground(domain_bytes.decode(), problem_bytes.decode())
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        pickle.dump(task, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    return PddlProblem(*task, **kwargs)
+
+
+class _Domain:
+    """ The types, constants and action schemas of a PDDL domain """
+    def __init__(self, definition):
+        self.name = definition['name']
+        self.parents = {}
+        self.constants = {}
+        self.actions = []
+        for section in definition['sections']:
+            keyword = section[0].lower()
+            if keyword == ':types':
+                for child, parent in _typed_list(section[1:]).items():
+                    self.parents[child] = parent
+            elif keyword == ':constants':
+                self.constants.update(_typed_list(section[1:]))
+            elif keyword == ':action':
+                self.actions.append(self._action(section))
+            elif keyword not in (':requirements', ':predicates'):
+                raise ValueError("Unsupported PDDL domain section {}".format(section[0]))
+
+    def is_subtype(self, obj_type, param_type):
+        types = param_type if isinstance(param_type, tuple) else (param_type,)
+        seen = set()
+        while obj_type not in seen:
+            if obj_type in types or 'object' in types:
+                return True
+            seen.add(obj_type)
+            obj_type = self.parents.get(obj_type, 'object')
+        return False
+
+    def _action(self, section):
+        fields = {section[i].lower(): section[i + 1] for i in range(2, len(section) - 1, 2)}
+        preconditions, equalities = _conjunction(fields.get(':precondition', []))
+        effects, effect_equalities = _conjunction(fields.get(':effect', []))
+        if effect_equalities:
+            raise ValueError("Equalities are not valid PDDL effects")
+        return {'name': section[1],
+                'parameters': list(_typed_list(fields.get(':parameters', [])).items()),
+                'preconditions': preconditions,
+                'equalities': equalities,
+                'effects': effects}
+
+
+def _definition(text, kind):
+    expressions = parse_sexp(text)
+    if (len(expressions) != 1 or len(expressions[0]) < 2 or expressions[0][0].lower() != 'define'
+            or expressions[0][1][0].lower() != kind):
+        raise ValueError("Expected a single PDDL {} definition".format(kind))
+    return {'name': expressions[0][1][1], 'sections': expressions[0][2:]}
+
+
+def _typed_list(tokens):
+    """ Map each name in a PDDL typed list (e.g., "?c - cargo ?p1 ?p2 - plane")
+    to its type ('object' if the type is not specified, or a tuple of types for
+    "(either t1 t2)")
+    """
+    typed, names, idx = {}, [], 0
+    while idx < len(tokens):
+        token = tokens[idx]
+        if token == '-':
+            type_name = tokens[idx + 1]
+            if isinstance(type_name, list):
+                type_name = tuple(type_name[1:])
+            typed.update((name, type_name) for name in names)
+            names, idx = [], idx + 2
+        else:
+            names.append(token)
+            idx += 1
+    typed.update((name, 'object') for name in names)
+    return typed
+
+
+def _conjunction(formula):
+    """ Split a conjunction of literals into a list of (positive, atom) pairs and
+    a list of (equal, lhs, rhs) equality constraints
+    """
+    if not formula:
+        return [], []
+    if isinstance(formula, str):
+        raise ValueError("Invalid PDDL formula {}".format(formula))
+    head = formula[0].lower() if isinstance(formula[0], str) else None
+    if head == 'and':
+        literals, equalities = [], []
+        for part in formula[1:]:
+            part_literals, part_equalities = _conjunction(part)
+            literals += part_literals
+            equalities += part_equalities
+        return literals, equalities
+    if head == 'not':
+        literals, equalities = _conjunction(formula[1])
+        if len(literals) + len(equalities) != 1 or formula[1][0].lower() == 'and':
+            raise ValueError("Only atoms can be negated in STRIPS PDDL")
+        return ([(not positive, atom) for positive, atom in literals],
+                [(not equal, a, b) for equal, a, b in equalities])
+    if head == '=':
+        return [], [(True, formula[1], formula[2])]
+    if head in ('or', 'imply', 'exists', 'forall', 'when'):
+        raise ValueError("Unsupported PDDL formula ({} ...)".format(head))
+    return [(True, _atom(formula))], []
+
+
+def _atom(expression):
+    return (expression[0], tuple(expression[1:]))
+
+
+def _literal(atom):
+    return make_literal(atom[0], *atom[1])
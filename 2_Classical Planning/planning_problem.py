@@ -1,33 +1,193 @@
 
-from functools import lru_cache
+import random
+
+from functools import wraps
 
 from aimacode.logic import PropKB
 from aimacode.search import Node, Problem
 
-from _utils import encode_state, decode_state
+from _utils import encode_state, pack_state, HeuristicCache, ZobristState
 from my_planning_graph import PlanningGraph
+from landmarks import LandmarkGraph
+from relaxed_heuristics import RelaxedTask
+from sas_translation import synthesize_mutex_groups
+from stubborn_sets import StubbornSets
+from symmetries import ObjectSymmetries
 
     ##############################################################################
     #                 YOU DO NOT NEED TO MODIFY CODE IN THIS FILE                #
     ##############################################################################
 
 
+def cached_heuristic(heuristic):
+    """ Cache the values of a heuristic method in the heuristic_cache of the
+    problem, keyed by the packed state of the node rather than by the node
+    """
+    name = heuristic.__name__
+
+    @wraps(heuristic)
+    def cached(self, node):
+        key = (name, self.state_key(node.state))
+        value = self.heuristic_cache.get(key)
+        if value is None:
+            value = heuristic(self, node)
+            self.heuristic_cache.put(key, value)
+        return value
+    return cached
+
+
 class BasePlanningProblem(Problem):
-    def __init__(self, initial, goal):
+    def __init__(self, initial, goal, cache_size=2**18, cache_policy='lru'):
+        """
+        Parameters
+        ----------
+        initial : FluentState
+            The initial state of the problem
+
+        goal : iterable
+            The goal literals of the problem
+
+        cache_size : int or None
+            The number of heuristic values kept by heuristic_cache (None keeps
+            every value; see _utils.HeuristicCache)
+
+        cache_policy : str
+            The eviction policy of heuristic_cache ('lru' or 'fifo')
+        """
         self.state_map = sorted(initial.pos + initial.neg, key=str)
-        self.initial_state_TF = encode_state(initial, self.state_map)
+        # Zobrist keys are drawn from a fixed seed, so equal states of different
+        # instances of the same problem have equal hashes (63 bits fit in a hash value)
+        rng = random.Random(0)
+        self._zobrist_keys = [rng.getrandbits(63) for _ in self.state_map]
+        self._fluent_bits = {fluent: 1 << idx for idx, fluent in enumerate(self.state_map)}
+        self._goal_mask = self._mask(goal) & ~(1 << len(self.state_map))
+        self._action_masks = {}
+        self._applicable = None
+        self.initial_state_TF = self.make_state(pack_state(encode_state(initial, self.state_map)))
         super().__init__(self.initial_state_TF, goal=goal)
+        self.heuristic_cache = HeuristicCache(cache_size, cache_policy)
+        self._relaxed_task = None
+        self._landmark_graph = None
+        # set to True to prune the actions of each state with strong stubborn sets
+        self.use_stubborn_sets = False
+        self._stubborn_sets = None
+        # set to True to identify the states that only differ by interchangeable objects
+        self.use_symmetries = False
+        self._symmetries = None
+        # set to True to add the mutexes of the mutex groups to the planning graphs of h_pg_setlevel
+        self.use_static_mutexes = False
+        self._mutex_groups = None
+        self._static_mutexes = None
+
+    def make_state(self, packed):
+        """ Return the ZobristState with the fluent values in the bits of packed
+        (bit i is the value of fluent i in state_map)
+        """
+        hash_value, bits = 0, packed
+        while bits:
+            low = bits & -bits
+            hash_value ^= self._zobrist_keys[low.bit_length() - 1]
+            bits ^= low
+        return ZobristState(packed, len(self.state_map), hash_value)
+
+    def state_key(self, state):
+        """ Return a compact hashable key for the state
+
+        ZobristStates are their own keys (their hashes are precomputed); any other
+        sequence of True/False values is keyed by its packed bits. If
+        use_symmetries is True, symmetric states share the packed bits of their
+        canonical state as key (see symmetries.ObjectSymmetries), so searches
+        only explore one state of each set of symmetric states, and the
+        heuristic values cached by state are shared by symmetric states (the
+        cached heuristics only depend on the state, so they are invariant under
+        the symmetries; h_landmark_count is path-dependent and is not cached).
+        """
+        if self.use_symmetries:
+            return self.symmetries.canonical(pack_state(state))
+        return state if isinstance(state, ZobristState) else pack_state(state)
+
+    def _mask(self, literals):
+        # fluents missing from state_map set a bit above every fluent, which no state has
+        unknown = 1 << len(self.state_map)
+        mask = 0
+        for literal in literals:
+            mask |= self._fluent_bits.get(literal, unknown)
+        return mask
+
+    def _masks(self, action):
+        """ Return the bit masks of the preconditions and effects of an action """
+        masks = self._action_masks.get(action)
+        if masks is None:
+            unknown = 1 << len(self.state_map)
+            precond_neg = self._mask(action.precond_neg)
+            masks = self._action_masks[action] = (
+                self._mask(action.precond_pos) | (unknown if precond_neg & unknown else 0),
+                precond_neg & ~unknown,
+                self._mask(action.effect_add) & ~unknown,
+                self._mask(action.effect_rem) & ~unknown)
+        return masks
+
+    @property
+    def relaxed_task(self):
+        """ The delete relaxation of the problem (built on first use because
+        subclasses only create their actions after this constructor returns)
+        """
+        if self._relaxed_task is None:
+            self._relaxed_task = RelaxedTask(self)
+        return self._relaxed_task
+
+    @property
+    def landmark_graph(self):
+        """ The fact landmarks of the problem and their orderings (built on first use) """
+        if self._landmark_graph is None:
+            self._landmark_graph = LandmarkGraph(self)
+        return self._landmark_graph
+
+    @property
+    def symmetries(self):
+        """ The object symmetries of the problem (found on first use) """
+        if self._symmetries is None:
+            self._symmetries = ObjectSymmetries(self)
+        return self._symmetries
+
+    @property
+    def mutex_groups(self):
+        """ The groups of fluents of which at most one is true in every reachable
+        state (see sas_translation.synthesize_mutex_groups; found on first use)
+        """
+        if self._mutex_groups is None:
+            self._mutex_groups = synthesize_mutex_groups(self)
+        return self._mutex_groups
+
+    @property
+    def static_mutexes(self):
+        """ Map each fluent of a mutex group to the fluents that are mutex with it
+        in every state
+        """
+        if self._static_mutexes is None:
+            self._static_mutexes = {}
+            for fluents, _ in self.mutex_groups:
+                for fluent in fluents:
+                    self._static_mutexes.setdefault(fluent, set()).update(f for f in fluents if f != fluent)
+        return self._static_mutexes
+
+    @property
+    def stubborn_sets(self):
+        """ The strong stubborn sets of the problem (built on first use) """
+        if self._stubborn_sets is None:
+            self._stubborn_sets = StubbornSets(self)
+        return self._stubborn_sets
 
-    @lru_cache()
+    @cached_heuristic
     def h_unmet_goals(self, node):
         """ This heuristic estimates the minimum number of actions that must be
         carried out from the current state in order to satisfy all of the goal
         conditions by ignoring the preconditions required for an action to be
         executed.
         """
-        return sum(1 for i, f in enumerate(self.state_map) if not node.state[i] and f in self.goal)
+        return bin(self._goal_mask & ~pack_state(node.state)).count('1')
 
-    @lru_cache()
+    @cached_heuristic
     def h_pg_levelsum(self, node):
         """ This heuristic uses a planning graph representation of the problem
         state space to estimate the sum of the number of actions that must be
@@ -42,7 +202,7 @@ class BasePlanningProblem(Problem):
         score = pg.h_levelsum()
         return score
 
-    @lru_cache()
+    @cached_heuristic
     def h_pg_maxlevel(self, node):
         """ This heuristic uses a planning graph representation of the problem
         to estimate the maximum level cost out of all the individual goal literals.
@@ -57,7 +217,7 @@ class BasePlanningProblem(Problem):
         score = pg.h_maxlevel()
         return score
 
-    @lru_cache()
+    @cached_heuristic
     def h_pg_setlevel(self, node):
         """ This heuristic uses a planning graph representation of the problem
         to estimate the level cost in the planning graph to achieve all of the
@@ -67,37 +227,106 @@ class BasePlanningProblem(Problem):
         --------
         Russell-Norvig 10.3.1 (3rd Edition)
         """
-        pg = PlanningGraph(self, node.state, serialize=True)
+        static_mutexes = self.static_mutexes if self.use_static_mutexes else None
+        pg = PlanningGraph(self, node.state, serialize=True, static_mutexes=static_mutexes)
         score = pg.h_setlevel()
         return score
 
+    @cached_heuristic
+    def h_max(self, node):
+        """ This heuristic estimates the cost of the most expensive goal literal
+        in the delete relaxation of the problem, where the cost of an action is
+        one plus the maximum cost of its preconditions. It is admissible.
+
+        See Also
+        --------
+        relaxed_heuristics.RelaxedTask
+        """
+        return self.relaxed_task.h_max(node.state)
+
+    @cached_heuristic
+    def h_add(self, node):
+        """ This heuristic estimates the sum of the costs of the goal literals in
+        the delete relaxation of the problem, where the cost of an action is one
+        plus the sum of the costs of its preconditions.
+
+        See Also
+        --------
+        relaxed_heuristics.RelaxedTask
+        """
+        return self.relaxed_task.h_add(node.state)
+
+    @cached_heuristic
+    def h_ff(self, node):
+        """ This heuristic counts the actions in a relaxed plan (a plan for the
+        problem that ignores delete effects) extracted backwards from the goals
+        using the best supporters found while computing h_add.
+
+        See Also
+        --------
+        relaxed_heuristics.RelaxedTask
+        """
+        return self.relaxed_task.h_ff(node.state)
+
+    @cached_heuristic
+    def preferred_ff(self, node):
+        """ Return the actions of the relaxed plan of h_ff that are applicable in
+        the state of the node, i.e., the preferred operators for the node (see
+        aimacode.search.lazy_greedy_best_first_search). The h_ff value of the
+        state is cached at the same time, so it is not computed twice.
+        """
+        value, helpful = self.relaxed_task.helpful_actions(node.state)
+        self.heuristic_cache.put(('h_ff', self.state_key(node.state)), value)
+        return frozenset(helpful)
+
+    def h_landmark_count(self, node):
+        """ This heuristic counts the landmarks (literals that are true at some
+        point of every plan) that are not accepted on the path to the node, plus
+        the accepted landmarks that are required again.
+
+        The landmarks accepted by a state depend on the path that reached it, so
+        this heuristic is not cached by state; the accepted landmarks are stored
+        by the landmark graph instead, and updated incrementally from the parent
+        of each node.
+
+        See Also
+        --------
+        landmarks.LandmarkGraph
+        """
+        return self.landmark_graph.landmark_count(node)
+
     def actions(self, state):
-        """ Return the actions that can be executed in the given state. """
-        possible_actions = []
-        fluent = decode_state(state, self.state_map)
-        for action in self.actions_list:
-            is_possible = True
-            for clause in action.precond_pos:
-                if clause not in fluent.pos:
-                    is_possible = False
-                    break
-            if not is_possible: continue
-            for clause in action.precond_neg:
-                if clause not in fluent.neg:
-                    is_possible = False
-                    break
-            if is_possible: possible_actions.append(action)
-        return possible_actions
+        """ Return the actions that can be executed in the given state (only
+        those of a strong stubborn set if use_stubborn_sets is True)
+        """
+        if self._applicable is None:
+            self._applicable = [(action,) + self._masks(action)[:2] for action in self.actions_list]
+        packed = pack_state(state)
+        applicable = [action for action, pos, neg in self._applicable
+                      if packed & pos == pos and not packed & neg]
+        if self.use_stubborn_sets:
+            return self.stubborn_sets.prune(packed, applicable)
+        return applicable
 
     def result(self, state, action):
         """ Return the state that results from executing the given action in the
         given state. The action must be one of self.actions(state).
+
+        The hash of the new state is updated from the hash of the state by
+        toggling the Zobrist keys of the fluents changed by the action.
         """
-        return tuple([
-            (f and s not in action.effect_rem) or (s in action.effect_add)
-            for f, s in zip(state, self.state_map)
-        ])
+        _, _, add, rem = self._masks(action)
+        packed = pack_state(state)
+        new_packed = (packed & ~rem) | add
+        if not isinstance(state, ZobristState):
+            return self.make_state(new_packed)
+        hash_value, changed = state._hash, packed ^ new_packed
+        while changed:
+            low = changed & -changed
+            hash_value ^= self._zobrist_keys[low.bit_length() - 1]
+            changed ^= low
+        return ZobristState(new_packed, state.size, hash_value)
 
     def goal_test(self, state: str) -> bool:
         """ Test the state to see if goal is reached """
-        return all(f for f, c in zip(state, self.state_map) if c in self.goal)
+        return pack_state(state) & self._goal_mask == self._goal_mask
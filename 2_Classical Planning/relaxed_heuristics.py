@@ -0,0 +1,187 @@
+
+from heapq import heappop, heappush
+
+from aimacode.search import infinity
+
+
+class RelaxedTask:
+    """ Delete relaxation of a planning problem for fast heuristic estimates
+
+    The relaxed task is grounded once per problem. Every literal (positive AND
+    negative, matching the planning graph semantics in layers.make_node) is
+    mapped to an integer fact id, and every action is reduced to the lists of
+    fact ids in its preconditions and effects. Heuristic values are computed
+    by a generalized Dijkstra search over the facts where each action keeps a
+    counter of its unsatisfied preconditions, so no planning graph layers or
+    mutexes are ever constructed.
+
+    Attributes
+    ----------
+    actions : list
+        The actions of the problem domain (the index of each action is its id)
+
+    preconditions : list(tuple(int))
+        Fact ids of the preconditions of each action
+
+    effects : list(tuple(int))
+        Fact ids of the effects of each action
+
+    precondition_of : list(list(int))
+        Mapping from each fact id to the ids of the actions that require it
+
+    goal : tuple(int)
+        Fact ids of the goal literals
+
+    See Also
+    --------
+    Bonet & Geffner, "Planning as heuristic search" (2001)
+    Hoffmann & Nebel, "The FF planning system" (2001)
+    """
+    def __init__(self, problem):
+        num_fluents = len(problem.state_map)
+        self.num_fluents = num_fluents
+        self.num_facts = 2 * num_fluents
+        self.fact_index = {}
+        for idx, fluent in enumerate(problem.state_map):
+            self.fact_index[fluent] = idx
+            self.fact_index[~fluent] = idx + num_fluents
+
+        self.actions = list(problem.actions_list)
+        self.preconditions = []
+        self.effects = []
+        self.precondition_of = [[] for _ in range(self.num_facts)]
+        for action_id, action in enumerate(self.actions):
+            pre = ([self.fact_index[p] for p in action.precond_pos] +
+                   [self.fact_index[~p] for p in action.precond_neg])
+            eff = ([self.fact_index[e] for e in action.effect_add] +
+                   [self.fact_index[~e] for e in action.effect_rem])
+            self.preconditions.append(tuple(sorted(set(pre))))
+            self.effects.append(tuple(sorted(set(eff))))
+            for fact in self.preconditions[-1]:
+                self.precondition_of[fact].append(action_id)
+        self.goal = tuple(sorted(set(self.fact_index[g] for g in problem.goal)))
+
+    def facts(self, state):
+        """ Return the fact ids that are true in a state (a sequence of True/False
+        values ordered by problem.state_map)
+        """
+        offset = self.num_fluents
+        return [idx if value else idx + offset for idx, value in enumerate(state)]
+
+    def propagate(self, state, additive=True):
+        """ Compute the relaxed cost of the facts reachable from the state
+
+        The propagation stops as soon as the cost of every goal literal is known,
+        so the costs of facts that are more expensive than all of the goals may
+        be left as overestimates.
+
+        Parameters
+        ----------
+        state : tuple(bool)
+            An ordered sequence of True/False values indicating the literal value
+            of the corresponding fluent in problem.state_map
+
+        additive : bool
+            If True, the cost of an action is one plus the sum of the costs of its
+            preconditions (h_add); otherwise it is one plus their maximum (h_max)
+
+        Returns
+        -------
+        (list, list)
+            The cost of each fact id (infinity if unreachable) and the id of the
+            action that achieved each fact at that cost (None for facts in state)
+        """
+        cost = [infinity] * self.num_facts
+        supporter = [None] * self.num_facts
+        unsatisfied = [len(pre) for pre in self.preconditions]
+        action_cost = [0] * len(self.actions)
+        goals_left = set(self.goal)
+        queue = []
+
+        for fact in self.facts(state):
+            cost[fact] = 0
+            heappush(queue, (0, fact))
+        for action_id, count in enumerate(unsatisfied):
+            if count == 0:
+                self._apply(action_id, 1, cost, supporter, queue)
+
+        while queue and goals_left:
+            fact_cost, fact = heappop(queue)
+            if fact_cost > cost[fact]:
+                continue
+            goals_left.discard(fact)
+            for action_id in self.precondition_of[fact]:
+                if additive:
+                    action_cost[action_id] += fact_cost
+                elif fact_cost > action_cost[action_id]:
+                    action_cost[action_id] = fact_cost
+                unsatisfied[action_id] -= 1
+                if unsatisfied[action_id] == 0:
+                    self._apply(action_id, action_cost[action_id] + 1, cost, supporter, queue)
+        return cost, supporter
+
+    def _apply(self, action_id, new_cost, cost, supporter, queue):
+        for fact in self.effects[action_id]:
+            if new_cost < cost[fact]:
+                cost[fact] = new_cost
+                supporter[fact] = action_id
+                heappush(queue, (new_cost, fact))
+
+    def h_max(self, state):
+        """ The maximum relaxed cost of any single goal literal (admissible) """
+        cost, _ = self.propagate(state, additive=False)
+        return max((cost[g] for g in self.goal), default=0)
+
+    def h_add(self, state):
+        """ The sum of the relaxed costs of the goal literals (assumes that the
+        goals are achieved independently, so it is not admissible)
+        """
+        cost, _ = self.propagate(state, additive=True)
+        return sum(cost[g] for g in self.goal)
+
+    def relaxed_plan(self, state):
+        """ Extract a relaxed plan by backchaining from the goals over the best
+        supporters found by the h_add propagation
+
+        Returns
+        -------
+        set(int) or None
+            The ids of the actions in the relaxed plan, or None if some goal is
+            unreachable even in the relaxed task
+        """
+        return self._relaxed_plan(state)[0]
+
+    def _relaxed_plan(self, state):
+        cost, supporter = self.propagate(state, additive=True)
+        if any(cost[g] == infinity for g in self.goal):
+            return None, cost
+        plan = set()
+        open_facts = [g for g in self.goal if cost[g] > 0]
+        marked = set(open_facts)
+        while open_facts:
+            action_id = supporter[open_facts.pop()]
+            if action_id in plan:
+                continue
+            plan.add(action_id)
+            for fact in self.preconditions[action_id]:
+                if cost[fact] > 0 and fact not in marked:
+                    marked.add(fact)
+                    open_facts.append(fact)
+        return plan, cost
+
+    def helpful_actions(self, state):
+        """ Return the number of actions in the relaxed plan (as h_ff) and the
+        actions of the relaxed plan that are applicable in the state (the helpful
+        actions of FF, or preferred operators of Fast Downward)
+        """
+        plan, cost = self._relaxed_plan(state)
+        if plan is None:
+            return infinity, []
+        helpful = [self.actions[a] for a in sorted(plan)
+                   if all(cost[fact] == 0 for fact in self.preconditions[a])]
+        return len(plan), helpful
+
+    def h_ff(self, state):
+        """ The number of actions in the relaxed plan """
+        plan = self.relaxed_plan(state)
+        return infinity if plan is None else len(plan)
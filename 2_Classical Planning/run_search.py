@@ -1,13 +1,25 @@
 
 import argparse
+import os
+
+from functools import partial
 
 from aimacode.search import (breadth_first_search, astar_search,
     breadth_first_tree_search, depth_first_graph_search, uniform_cost_search,
     greedy_best_first_graph_search, depth_limited_search,
-    recursive_best_first_search)
+    recursive_best_first_search, iterative_deepening_astar_search, sma_star_search,
+    anytime_astar_search, anytime_weighted_astar_search, lazy_greedy_best_first_search)
 from air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_p3, air_cargo_p4
+from external_search import external_breadth_first_search
+from graphplan import graphplan_search
+from parallel_heuristics import parallel_astar_search
+from pddl import load_pddl
+from sas_translation import FiniteDomainProblem
+
+from timeit import default_timer as timer
 
-from _utils import run_search
+from _utils import HeuristicCache, run_search, show_solution
+from experiments import run_experiments, run_portfolio
 
     ##############################################################################
     #                 YOU DO NOT NEED TO MODIFY CODE IN THIS FILE                #
@@ -30,6 +42,44 @@ You must either use the -m flag to run in manual mode, or use both the -p and
 choices for each include:
 """
 
+def lazy_greedy_ff_search(problem, h):
+    """ Lazy greedy best first search with the preferred operators of h_ff """
+    return lazy_greedy_best_first_search(problem, h, preferred=problem.preferred_ff)
+
+
+def with_heuristic_cache(problem_fn, maxsize, policy):
+    """ Build a problem with a heuristic cache of the given size and eviction policy """
+    problem = problem_fn()
+    problem.heuristic_cache = HeuristicCache(maxsize, policy)
+    return problem
+
+
+def with_stubborn_sets(problem_fn):
+    """ Build a problem that prunes its actions with strong stubborn sets """
+    problem = problem_fn()
+    problem.use_stubborn_sets = True
+    return problem
+
+
+def with_symmetries(problem_fn):
+    """ Build a problem that identifies the states with symmetric objects """
+    problem = problem_fn()
+    problem.use_symmetries = True
+    return problem
+
+
+def with_static_mutexes(problem_fn):
+    """ Build a problem that adds its mutex groups to the planning graphs of h_pg_setlevel """
+    problem = problem_fn()
+    problem.use_static_mutexes = True
+    return problem
+
+
+def with_sas_translation(problem_fn):
+    """ Build a problem and translate it to finite-domain variables """
+    return FiniteDomainProblem(problem_fn())
+
+
 PROBLEMS = [["Air Cargo Problem 1", air_cargo_p1],
             ["Air Cargo Problem 2", air_cargo_p2],
             ["Air Cargo Problem 3", air_cargo_p3],
@@ -44,8 +94,28 @@ SEARCHES = [["breadth_first_search", breadth_first_search, ""],
             ['astar_search', astar_search, 'h_unmet_goals'],
             ['astar_search', astar_search, 'h_pg_levelsum'],
             ['astar_search', astar_search, 'h_pg_maxlevel'],
-            ['astar_search', astar_search, 'h_pg_setlevel']
+            ['astar_search', astar_search, 'h_pg_setlevel'],
+            ['greedy_best_first_graph_search', greedy_best_first_graph_search, 'h_max'],
+            ['greedy_best_first_graph_search', greedy_best_first_graph_search, 'h_add'],
+            ['greedy_best_first_graph_search', greedy_best_first_graph_search, 'h_ff'],
+            ['astar_search', astar_search, 'h_max'],
+            ['astar_search', astar_search, 'h_add'],
+            ['astar_search', astar_search, 'h_ff'],
+            ['graphplan_search', graphplan_search, ""],
+            ['iterative_deepening_astar_search', iterative_deepening_astar_search, 'h_max'],
+            ['sma_star_search', sma_star_search, 'h_max'],
+            ['anytime_astar_search', anytime_astar_search, 'h_unmet_goals'],
+            ['greedy_best_first_graph_search', greedy_best_first_graph_search, 'h_landmark_count'],
+            ['astar_search', astar_search, 'h_landmark_count'],
+            ['astar_search', astar_search, 'h_pdb'],
+            ['parallel_astar_search', parallel_astar_search, 'h_pg_levelsum'],
+            ['lazy_greedy_best_first_search', lazy_greedy_ff_search, 'h_ff'],
+            ['external_breadth_first_search', external_breadth_first_search, ""]
             ]
+# the default searches of --portfolio (anytime weighted A* reports every plan it improves)
+PORTFOLIO = [['greedy_best_first_graph_search', greedy_best_first_graph_search, 'h_unmet_goals'],
+             ['astar_search', astar_search, 'h_pg_levelsum'],
+             ['anytime_weighted_astar_search', anytime_weighted_astar_search, 'h_unmet_goals']]
 
 
 def manual():
@@ -66,18 +136,38 @@ def manual():
         __file__, " ".join(p_choices), " ".join(s_choices)))
 
 
-def main(p_choices, s_choices):
+def main(p_choices, s_choices, progress=None, interval=1.0):
     problems = [PROBLEMS[i-1] for i in map(int, p_choices)]
     searches = [SEARCHES[i-1] for i in map(int, s_choices)]
 
     for pname, problem_fn in problems:
+        # the problem is shared by every search so that they share its heuristic cache
+        problem_instance = problem_fn()
         for sname, search_fn, heuristic in searches:
             hstring = heuristic if not heuristic else " with {}".format(heuristic)
             print("\nSolving {} using {}{}...".format(pname, sname, hstring))
 
-            problem_instance = problem_fn()
             heuristic_fn = None if not heuristic else getattr(problem_instance, heuristic)
-            run_search(problem_instance, search_fn, heuristic_fn)
+            labels = {'problem': pname, 'search': sname, 'heuristic': heuristic}
+            run_search(problem_instance, search_fn, heuristic_fn, progress, interval, labels)
+
+
+def portfolio(p_choices, searches, deadline=None):
+    """ Solve each problem with all of the searches at once and show the first
+    plan found (or the shortest plan found by the deadline, if any)
+    """
+    for pname, problem_fn in [PROBLEMS[i-1] for i in map(int, p_choices)]:
+        print("\nSolving {} with a portfolio of {} searches...".format(pname, len(searches)))
+        start = timer()
+        node, search = run_portfolio(problem_fn, searches, deadline, first=deadline is None)
+        elapsed = timer() - start
+        if node is None:
+            print("No plan found")
+            continue
+        sname, _, heuristic = search
+        print("\nBest plan found by {}{}".format(sname, heuristic and " with {}".format(heuristic)))
+        show_solution(node, elapsed)
+        print()
 
 
 if __name__=="__main__":
@@ -90,12 +180,90 @@ if __name__=="__main__":
                         help="Specify the indices of the problems to solve as a list of space separated values. Choose from: {!s}".format(list(range(1, len(PROBLEMS)+1))))
     parser.add_argument('-s', '--searches', nargs="+", choices=range(1, len(SEARCHES)+1), type=int, metavar='',
                         help="Specify the indices of the search algorithms to use as a list of space separated values. Choose from: {!s}".format(list(range(1, len(SEARCHES)+1))))
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help="Run the selected problems and searches in parallel worker processes and " +
+                        "append the results to FILE (CSV if FILE ends in .csv, otherwise JSON lines). " +
+                        "Experiments that already have results in FILE are skipped.")
+    parser.add_argument('-j', '--jobs', type=int, metavar='N',
+                        help="The number of experiments to run at once with --output (default: CPU count)")
+    parser.add_argument('--time-limit', type=float, metavar='SECONDS',
+                        help="Wall-clock limit of each experiment run with --output")
+    parser.add_argument('--memory-limit', type=int, metavar='MB',
+                        help="Memory limit of each experiment run with --output")
+    parser.add_argument('--progress', metavar='FILE',
+                        help="Append the progress of each search to FILE as JSON lines while it runs")
+    parser.add_argument('--progress-interval', type=float, default=1.0, metavar='SECONDS',
+                        help="The number of seconds between progress records (default: 1)")
+    parser.add_argument('--pddl', nargs="+", metavar='FILE',
+                        help="Also solve the problems in PDDL problem files (the first FILE is the PDDL " +
+                        "domain file); compiled problems are cached in a __pddlcache__ directory")
+    parser.add_argument('--cache-size', type=int, default=2**18, metavar='N',
+                        help="The number of heuristic values cached by each problem (0 keeps every value; " +
+                        "default: 2**18)")
+    parser.add_argument('--cache-policy', choices=HeuristicCache.POLICIES, default='lru',
+                        help="The eviction policy of the heuristic cache (default: lru)")
+    parser.add_argument('--stubborn-sets', action="store_true",
+                        help="Prune the actions expanded in each state with strong stubborn sets " +
+                        "(partial-order reduction)")
+    parser.add_argument('--symmetries', action="store_true",
+                        help="Only search one of the states that differ by interchangeable objects " +
+                        "(e.g., planes that no goal mentions)")
+    parser.add_argument('--static-mutexes', action="store_true",
+                        help="Add the mutex groups of each problem (e.g., a cargo is at one airport or in " +
+                        "one plane) to the planning graphs of h_pg_setlevel")
+    parser.add_argument('--sas', action="store_true",
+                        help="Search the problems translated to finite-domain variables built from their " +
+                        "mutex groups (only with the heuristics {}; graphplan and the external ".format(
+                            ", ".join(FiniteDomainProblem.HEURISTICS)) +
+                        "breadth-first search are not supported)")
+    parser.add_argument('--portfolio', action="store_true",
+                        help="Run the searches (or a default portfolio of greedy best-first search, A* and " +
+                        "weighted A* if no searches are selected) at once in separate processes on each " +
+                        "problem, and show the first plan found")
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help="With --portfolio, wait up to SECONDS and show the shortest plan found")
     args = parser.parse_args()
 
+    if args.pddl:
+        if len(args.pddl) < 2:
+            parser.error("--pddl needs a domain file and at least one problem file")
+        domain_file = args.pddl[0]
+        for problem_file in args.pddl[1:]:
+            PROBLEMS.append([os.path.basename(problem_file), partial(load_pddl, domain_file, problem_file)])
+        args.problems = (args.problems or []) + list(range(len(PROBLEMS) - len(args.pddl) + 2, len(PROBLEMS) + 1))
+
+    selected = [SEARCHES[i-1] for i in args.searches] if args.searches else PORTFOLIO if args.portfolio else []
+    if args.pddl and any(heuristic == 'h_pdb' for _, _, heuristic in selected):
+        parser.error("h_pdb is only defined for the air cargo problems (not for --pddl problems)")
+
+    if args.cache_size != 2**18 or args.cache_policy != 'lru':
+        PROBLEMS[:] = [[name, partial(with_heuristic_cache, problem_fn, args.cache_size or None, args.cache_policy)]
+                       for name, problem_fn in PROBLEMS]
+    if args.stubborn_sets:
+        PROBLEMS[:] = [[name, partial(with_stubborn_sets, problem_fn)] for name, problem_fn in PROBLEMS]
+    if args.symmetries:
+        PROBLEMS[:] = [[name, partial(with_symmetries, problem_fn)] for name, problem_fn in PROBLEMS]
+    if args.static_mutexes:
+        PROBLEMS[:] = [[name, partial(with_static_mutexes, problem_fn)] for name, problem_fn in PROBLEMS]
+    if args.sas:
+        unsupported = sorted({h for _, _, h in selected if h and h not in FiniteDomainProblem.HEURISTICS})
+        if unsupported:
+            parser.error("--sas does not support the heuristics {}".format(", ".join(unsupported)))
+        PROBLEMS[:] = [[name, partial(with_sas_translation, problem_fn)] for name, problem_fn in PROBLEMS]
+
     if args.manual:
         manual()
+    elif args.problems and args.portfolio:
+        searches = [SEARCHES[i-1] for i in sorted(set(args.searches))] if args.searches else PORTFOLIO
+        portfolio(list(sorted(set(args.problems))), searches, args.deadline)
+    elif args.problems and args.searches and args.output:
+        run_experiments([PROBLEMS[i-1] for i in sorted(set(args.problems))],
+                        [SEARCHES[i-1] for i in sorted(set(args.searches))],
+                        args.output, processes=args.jobs, time_limit=args.time_limit,
+                        memory_limit=args.memory_limit)
     elif args.problems and args.searches:
-        main(list(sorted(set(args.problems))), list(sorted(set((args.searches)))))
+        main(list(sorted(set(args.problems))), list(sorted(set((args.searches)))),
+             args.progress, args.progress_interval)
     else:
         print()
         parser.print_help()
@@ -0,0 +1,436 @@
+
+from collections import deque, defaultdict
+
+from aimacode.search import Problem
+from _utils import HeuristicCache, pack_state
+from relaxed_heuristics import RelaxedTask
+
+
+def _ids(mask):
+    return {idx for idx, bit in enumerate(reversed(bin(mask)[2:])) if bit == '1'}
+
+
+def _groups(fluents, candidate):
+    """ Return the groups of fluent ids of a candidate invariant, keyed by the
+    arguments of each fluent that are not counted by the invariant
+    """
+    positions = dict(candidate)
+    groups = defaultdict(list)
+    for idx, fluent in enumerate(fluents):
+        position = positions.get(fluent.op)
+        if position is not None and position < len(fluent.args):
+            groups[fluent.args[:position] + fluent.args[position + 1:]].append(idx)
+    return groups
+
+
+def synthesize_mutex_groups(problem, max_candidates=1000):
+    """ Find groups of fluents of which at most one is true in every reachable
+    state (e.g., a cargo is At one airport or In one plane)
+
+    Candidate invariants are sets of (predicate, argument position) pairs: the
+    fluents of the predicates with the same arguments at every other position
+    form a group that should have at most one true fluent. A candidate is an
+    invariant if no group has more than one true fluent in the initial state,
+    and every action that makes a fluent of a group true requires and deletes
+    another fluent of the group (or requires the fluent itself, or requires
+    every other fluent of the group to be false). The search starts with one
+    predicate per candidate, and each candidate that fails because an action
+    adds a fluent without deleting one is refined with the predicates of the
+    deleted preconditions of the action (a grounded version of the monotonicity
+    analysis of the Fast Downward translator).
+
+    Parameters
+    ----------
+    problem : BasePlanningProblem
+
+    max_candidates : int
+        The largest number of candidate invariants to check
+
+    Returns
+    -------
+    list(tuple(tuple(Expr), bool))
+        The fluents of each group with at least two fluents (in the order of
+        problem.state_map), and whether exactly one of them is true in every
+        reachable state
+
+    See Also
+    --------
+    Helmert, "Concise finite-domain representations for PDDL planning tasks" (2009)
+    """
+    fluents = problem.state_map
+    initial = _ids(pack_state(problem.initial))
+    unknown = 1 << len(fluents)
+    actions = []
+    for action in problem.actions_list:
+        pos, neg, add, rem = problem._masks(action)
+        if not pos & unknown:
+            actions.append((action, _ids(pos), _ids(neg), _ids(add), _ids(rem & ~add)))
+
+    def violation(candidate):
+        """ Return None if the candidate is an invariant, or the action (None
+        for the initial state) and the key of a group that breaks it
+        """
+        groups = _groups(fluents, candidate)
+        group_of = {idx: key for key, ids in groups.items() for idx in ids}
+        for key, ids in groups.items():
+            if len(initial.intersection(ids)) > 1:
+                return None, key
+        for action, pos, neg, add, rem in actions:
+            keys = [group_of[idx] for idx in add if idx in group_of]
+            if len(set(keys)) < len(keys):
+                return action, keys[0]
+            for idx in add:
+                key = group_of.get(idx)
+                if key is None or idx in pos:
+                    continue
+                if any(group_of.get(other) == key for other in pos & rem):
+                    continue
+                if all(other in neg for other in groups[key] if other != idx):
+                    continue
+                return action, key
+        return None
+
+    singles = sorted({(fluent.op, position) for fluent in fluents for position in range(len(fluent.args))})
+    queue = deque(frozenset([single]) for single in singles)
+    seen = set(queue)
+    invariants = []
+    while queue:
+        candidate = queue.popleft()
+        failure = violation(candidate)
+        if failure is None:
+            invariants.append(candidate)
+            continue
+        action, key = failure
+        if action is None:
+            continue
+        # refine the candidate with a predicate of a precondition deleted by the action
+        predicates = {op for op, _ in candidate}
+        for fluent in action.precond_pos & (action.effect_rem - action.effect_add):
+            if fluent.op in predicates:
+                continue
+            for position in range(len(fluent.args)):
+                refined = candidate | {(fluent.op, position)}
+                if fluent.args[:position] + fluent.args[position + 1:] == key and refined not in seen:
+                    if len(seen) < max_candidates:
+                        seen.add(refined)
+                        queue.append(refined)
+
+    mutex_groups = {}
+    for candidate in invariants:
+        for ids in _groups(fluents, candidate).values():
+            if len(ids) < 2:
+                continue
+            members = set(ids)
+            exactly_one = len(initial & members) == 1 and all(
+                add & members for _, _, _, add, rem in actions if rem & members)
+            mutex_groups[tuple(ids)] = exactly_one
+    return [(tuple(fluents[idx] for idx in ids), exactly_one) for ids, exactly_one in sorted(mutex_groups.items())]
+
+
+def finite_domain_variables(fluents, mutex_groups):
+    """ Cover the fluents with finite-domain variables, using the largest
+    mutex groups first
+
+    Parameters
+    ----------
+    fluents : list(Expr)
+        The fluents to cover (e.g., problem.state_map or a subset of it)
+
+    mutex_groups : list(tuple(tuple(Expr), bool))
+        The mutex groups of the problem (see synthesize_mutex_groups); only
+        their fluents in the list are used
+
+    Returns
+    -------
+    list(list)
+        The values of each variable: a fluent, or None for the value where
+        none of the fluents of the variable is true (unless exactly one of
+        them is true in every reachable state). The fluents that are not in
+        any group are binary variables.
+    """
+    uncovered = set(fluents)
+    variables = []
+    while True:
+        best = max(mutex_groups, key=lambda group: len(uncovered.intersection(group[0])), default=None)
+        group = [fluent for fluent in best[0] if fluent in uncovered] if best else []
+        if len(group) < 2:
+            break
+        exactly_one = best[1] and len(group) == len(best[0])
+        variables.append(([] if exactly_one else [None]) + group)
+        uncovered.difference_update(group)
+    variables.extend([None, fluent] for fluent in fluents if fluent in uncovered)
+    return variables
+
+
+class FiniteDomainProblem(Problem):
+    """ A planning problem translated to finite-domain (SAS+) variables
+
+    Each variable is a group of fluents of which at most one is true (see
+    finite_domain_variables), and its value is the index of the true fluent
+    in the group, so a group of k fluents takes the bits of k - 1 values
+    instead of k bits (the value 0 means that none of the fluents is true
+    when the group can have no true fluent). The fluents that are not in any
+    group are binary variables. The values are packed in the bits of an int,
+    so states are small ints that are hashed and compared directly, and the
+    preconditions, goals and effects of the actions are masks over the
+    packed values.
+
+    The plans use the actions of the original problem. The heuristics in
+    HEURISTICS (and preferred_ff) are computed on the packed values, the
+    relaxed ones with the delete relaxation of the variables (see
+    FiniteDomainRelaxedTask), and cached in a heuristic cache of the same size
+    and policy as the one of the problem. The other heuristics of the problem
+    are not available, since they would have to decode every state.
+
+    Parameters
+    ----------
+    problem : BasePlanningProblem
+
+    mutex_groups : list or None
+        The mutex groups of the problem (problem.mutex_groups if None)
+
+    Attributes
+    ----------
+    variables : list(list)
+        The values of each variable: a fluent of the problem, or None for the
+        value where none of the fluents of the variable is true
+
+    state_bits : int
+        The number of bits of the packed states
+    """
+    HEURISTICS = ('h_unmet_goals', 'h_max', 'h_add', 'h_ff')
+
+    def __init__(self, problem, mutex_groups=None):
+        self.problem = problem
+        self.heuristic_cache = HeuristicCache(problem.heuristic_cache.maxsize, problem.heuristic_cache.policy)
+        self._relaxed_task = None
+        if mutex_groups is None:
+            mutex_groups = problem.mutex_groups
+        fluents = problem.state_map
+        self._fluent_ids = {fluent: idx for idx, fluent in enumerate(fluents)}
+
+        self.variables = finite_domain_variables(fluents, mutex_groups)
+
+        self._layout, self._value_of = [], {}
+        shift = 0
+        for var, values in enumerate(self.variables):
+            bits = max(1, (len(values) - 1).bit_length())
+            self._layout.append((shift, ((1 << bits) - 1) << shift))
+            for code, fluent in enumerate(values):
+                if fluent is not None:
+                    self._value_of[fluent] = (var, code)
+            shift += bits
+        self.state_bits = shift
+
+        self._goals = []
+        goal_mask = goal_value = 0
+        for fluent in problem.goal:
+            if fluent in self._value_of:
+                mask, value = self._code(*self._value_of[fluent])
+                self._goals.append((mask, value))
+            else:
+                # the goal is unreachable, so it needs a bit that no state has
+                mask = value = 1 << self.state_bits
+            goal_mask |= mask
+            goal_value |= value
+        self._goal_mask, self._goal_value = goal_mask, goal_value
+
+        self._operators, self._effects = [], {}
+        for action in problem.actions_list:
+            operator = self._translate(action)
+            if operator is not None:
+                self._operators.append(operator[:4])
+                self._effects[action] = operator[4:]
+        self.actions_list = [operator[0] for operator in self._operators]
+        super().__init__(self.encode(problem.initial), problem.goal)
+
+    def _code(self, var, code):
+        shift, mask = self._layout[var]
+        return mask, code << shift
+
+    def _translate(self, action):
+        """ Return the masks of the preconditions and effects of an action on
+        the variables, or None if the action can never be applied
+        """
+        pre, effects = {}, {}
+        forbidden, deletes = [], []
+        for fluent in action.precond_pos:
+            if fluent not in self._value_of:
+                return None
+            var, code = self._value_of[fluent]
+            if pre.setdefault(var, code) != code:
+                return None  # the preconditions are mutex
+        for fluent in action.precond_neg:
+            if fluent not in self._value_of:
+                continue
+            var, code = self._value_of[fluent]
+            if var in pre:
+                if pre[var] == code:
+                    return None
+            elif len(self.variables[var]) == 2 and self.variables[var][0] is None:
+                pre[var] = 0
+            else:
+                forbidden.append(self._code(var, code))
+        for fluent in action.effect_add:
+            var, code = self._value_of[fluent]
+            if effects.setdefault(var, code) != code:
+                raise ValueError("{} adds two values of a variable".format(action))
+        for fluent in action.effect_rem - action.effect_add:
+            if fluent not in self._value_of:
+                continue
+            var, code = self._value_of[fluent]
+            if var in effects or pre.get(var, code) != code:
+                continue  # the fluent is replaced by another value, or is already false
+            if self.variables[var][0] is not None:
+                raise ValueError("{} deletes a value of a variable that always has a value".format(action))
+            if var in pre:
+                effects[var] = 0
+            else:
+                deletes.append(self._code(var, code))
+        pre_mask = pre_value = effect_mask = effect_value = 0
+        for var, code in pre.items():
+            mask, value = self._code(var, code)
+            pre_mask, pre_value = pre_mask | mask, pre_value | value
+        for var, code in effects.items():
+            mask, value = self._code(var, code)
+            effect_mask, effect_value = effect_mask | mask, effect_value | value
+        return action, pre_mask, pre_value, tuple(forbidden), effect_mask, effect_value, tuple(deletes)
+
+    def encode(self, state):
+        """ Return the packed values of the variables in a state of the problem """
+        packed = pack_state(state)
+        encoded = 0
+        for var, values in enumerate(self.variables):
+            code = None
+            for value, fluent in enumerate(values):
+                if fluent is not None and packed >> self._fluent_ids[fluent] & 1:
+                    if code is not None:
+                        raise ValueError("The state has two true fluents of the group {}".format(values))
+                    code = value
+            if code is None:
+                if values[0] is not None:
+                    raise ValueError("The state has no true fluent of the group {}".format(values))
+                code = 0
+            encoded |= self._code(var, code)[1]
+        return encoded
+
+    def decode(self, encoded):
+        """ Return the state of the problem with the packed values of the variables """
+        packed = 0
+        for (shift, mask), values in zip(self._layout, self.variables):
+            fluent = values[(encoded & mask) >> shift]
+            if fluent is not None:
+                packed |= 1 << self._fluent_ids[fluent]
+        return self.problem.make_state(packed)
+
+    def actions(self, state):
+        return [action for action, pre_mask, pre_value, forbidden in self._operators
+                if state & pre_mask == pre_value and not any(state & mask == value for mask, value in forbidden)]
+
+    def result(self, state, action):
+        effect_mask, effect_value, deletes = self._effects[action]
+        new_state = (state & ~effect_mask) | effect_value
+        for mask, value in deletes:
+            if state & mask == value:
+                new_state &= ~mask
+        return new_state
+
+    def goal_test(self, state):
+        return state & self._goal_mask == self._goal_value
+
+    @property
+    def relaxed_task(self):
+        """ The delete relaxation of the variables (built on first use) """
+        if self._relaxed_task is None:
+            self._relaxed_task = FiniteDomainRelaxedTask(self)
+        return self._relaxed_task
+
+    def _cached(self, name, node, heuristic):
+        key = (name, node.state)
+        value = self.heuristic_cache.get(key)
+        if value is None:
+            value = heuristic(node.state)
+            self.heuristic_cache.put(key, value)
+        return value
+
+    def h_unmet_goals(self, node):
+        """ The number of goal values that the variables do not have """
+        return sum(node.state & mask != value for mask, value in self._goals)
+
+    def h_max(self, node):
+        """ The h_max heuristic of the delete relaxation of the variables """
+        return self._cached('h_max', node, self.relaxed_task.h_max)
+
+    def h_add(self, node):
+        """ The h_add heuristic of the delete relaxation of the variables """
+        return self._cached('h_add', node, self.relaxed_task.h_add)
+
+    def h_ff(self, node):
+        """ The h_ff heuristic of the delete relaxation of the variables """
+        return self._cached('h_ff', node, self.relaxed_task.h_ff)
+
+    def preferred_ff(self, node):
+        """ The helpful actions of the relaxed plan of h_ff (see
+        BasePlanningProblem.preferred_ff); the h_ff value is cached at the same time
+        """
+        def helpful(state):
+            value, actions = self.relaxed_task.helpful_actions(state)
+            self.heuristic_cache.put(('h_ff', state), value)
+            return frozenset(actions)
+        return self._cached('preferred_ff', node, helpful)
+
+
+class FiniteDomainRelaxedTask(RelaxedTask):
+    """ Delete relaxation of a FiniteDomainProblem
+
+    The facts are the values of the variables (one fact id per value), so the
+    facts of a packed state are read from its bits without decoding it. The
+    preconditions that forbid a value of a variable with more than two values
+    are dropped (a relaxation), and the deletes of a value that set a variable
+    to None achieve the None value.
+
+    Parameters
+    ----------
+    problem : FiniteDomainProblem
+    """
+    def __init__(self, problem):
+        self.offsets = []
+        self.num_facts = 0
+        for values in problem.variables:
+            self.offsets.append(self.num_facts)
+            self.num_facts += len(values)
+        # a fact that no action achieves, for the goals that no variable has
+        unreachable = self.num_facts
+        self.num_facts += 1
+        self._layout = problem._layout
+
+        def fact(fluent, var_code=None):
+            var, code = var_code or problem._value_of[fluent]
+            return self.offsets[var] + code
+
+        self.actions = list(problem.actions_list)
+        self.preconditions = []
+        self.effects = []
+        self.precondition_of = [[] for _ in range(self.num_facts)]
+        for action_id, action in enumerate(self.actions):
+            pre = [fact(p) for p in action.precond_pos]
+            for p in action.precond_neg:
+                var, _ = problem._value_of.get(p, (None, None))
+                if var is not None and len(problem.variables[var]) == 2 and problem.variables[var][0] is None:
+                    pre.append(fact(None, (var, 0)))
+            eff = [fact(e) for e in action.effect_add]
+            added = {problem._value_of[e][0] for e in action.effect_add}
+            for e in action.effect_rem - action.effect_add:
+                var, _ = problem._value_of.get(e, (None, None))
+                if var is not None and var not in added and problem.variables[var][0] is None:
+                    eff.append(fact(None, (var, 0)))
+            self.preconditions.append(tuple(sorted(set(pre))))
+            self.effects.append(tuple(sorted(set(eff))))
+            for f in self.preconditions[-1]:
+                self.precondition_of[f].append(action_id)
+        self.goal = tuple(sorted(set(fact(g) if g in problem._value_of else unreachable
+                                     for g in problem.problem.goal)))
+
+    def facts(self, state):
+        """ Return the fact ids of the values of the variables in a packed state """
+        return [offset + ((state & mask) >> shift) for offset, (shift, mask) in zip(self.offsets, self._layout)]
@@ -0,0 +1,126 @@
+
+import json
+import os
+import resource
+
+from timeit import default_timer as timer
+
+
+def current_rss_mb():
+    """ Return the resident memory of the current process in MB (the peak
+    resident memory on platforms without /proc)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class SearchMonitor:
+    """ Observer of the expansions of a search that streams its progress to a
+    JSON lines file while the search runs
+
+    Every `interval` seconds (and once more when the monitor is closed) one
+    record is appended to the file with the elapsed time, the number of
+    expansions and the expansion rate since the last record, the current and
+    peak sizes of the frontier and explored set, the depth and path cost of
+    the last expanded node, the time spent evaluating the heuristic and
+    generating successors, and the resident memory of the process.
+
+    Example
+    -------
+
+    >>> ip = InstrumentedProblem(problem)
+    >>> with SearchMonitor(ip, 'progress.jsonl', labels={'search': 'astar'}) as monitor:
+    ...     node = astar_search(ip, ip.timed(problem.h_ff))
+    >>> monitor.summary()
+
+    Parameters
+    ----------
+    problem : InstrumentedProblem
+        The instrumented problem given to the search (the monitor registers
+        itself as an observer of the problem)
+
+    path : str or None
+        The file that receives the progress records (records are only kept
+        in memory if path is None)
+
+    interval : float
+        The number of seconds between progress records
+
+    labels : dict
+        Extra fields added to every record (e.g., the problem and search names)
+    """
+    def __init__(self, problem, path=None, interval=1.0, labels=None):
+        self.problem = problem
+        self.interval = interval
+        self.labels = dict(labels or {})
+        self.file = open(path, 'a') if path is not None else None
+        self.records = []
+        self.expansions = self.frontier_size = self.explored_size = 0
+        self.peak_frontier = self.peak_explored = 0
+        self.node = None
+        self.start = self._last_time = timer()
+        self._last_expansions = 0
+        problem.add_observer(self)
+
+    def expanded(self, node, frontier_size, explored_size):
+        self.expansions += 1
+        self.node = node
+        self.frontier_size, self.explored_size = frontier_size, explored_size
+        if frontier_size > self.peak_frontier:
+            self.peak_frontier = frontier_size
+        if explored_size > self.peak_explored:
+            self.peak_explored = explored_size
+        now = timer()
+        if now - self._last_time >= self.interval:
+            self._record(now)
+
+    def _record(self, now, final=False):
+        elapsed = now - self._last_time
+        record = dict(self.labels)
+        record.update(
+            time=now - self.start,
+            expansions=self.expansions,
+            expansions_per_sec=(self.expansions - self._last_expansions) / elapsed if elapsed > 0 else 0.0,
+            frontier=self.frontier_size,
+            explored=self.explored_size,
+            peak_frontier=self.peak_frontier,
+            peak_explored=self.peak_explored,
+            depth=None if self.node is None else self.node.depth,
+            path_cost=None if self.node is None else self.node.path_cost,
+            heuristic_time=self.problem.heuristic_time,
+            successor_time=self.problem.successor_time,
+            rss_mb=current_rss_mb())
+        if final:
+            record['final'] = True
+        self.records.append(record)
+        if self.file is not None:
+            self.file.write(json.dumps(record) + '\n')
+            self.file.flush()
+        self._last_time, self._last_expansions = now, self.expansions
+
+    def summary(self):
+        """ Return the metrics of the whole search (the last record, with the
+        average expansion rate and the peak memory of all records)
+        """
+        if not self.records:
+            return {}
+        summary = dict(self.records[-1])
+        summary['expansions_per_sec'] = summary['expansions'] / summary['time'] if summary['time'] > 0 else 0.0
+        summary['peak_rss_mb'] = max(record['rss_mb'] for record in self.records)
+        return summary
+
+    def close(self):
+        """ Write the final record and close the progress file """
+        if self.file is None or not self.file.closed:
+            self._record(timer(), final=True)
+        if self.file is not None:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
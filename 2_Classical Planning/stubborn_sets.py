@@ -0,0 +1,162 @@
+
+from _utils import pack_state
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _reachable_pairs(pre_pos, add, rem, initial):
+    """ Return, for each fluent, the mask of the fluents that can be true together
+    with it in a reachable state (the h^2 reachability of pairs of fluents; the
+    negative preconditions are ignored, so the pairs are overestimated)
+    """
+    size = max([initial.bit_length()] + [mask.bit_length() for mask in pre_pos + add])
+    pairs = [initial if initial >> bit & 1 else 0 for bit in range(size)]
+    changed = True
+    while changed:
+        changed = False
+        reachable = 0
+        for bit in range(size):
+            if pairs[bit] >> bit & 1:
+                reachable |= 1 << bit
+        for pos, add_mask, rem_mask in zip(pre_pos, add, rem):
+            if pos & ~reachable:
+                continue
+            compatible = reachable
+            for bit in _bits(pos):
+                compatible &= pairs[bit]
+            if compatible & pos != pos:
+                continue
+            # the added fluents are true together, and with every fluent that can
+            # be true with all the preconditions and is not deleted
+            kept = compatible & ~rem_mask & ~add_mask
+            for bit in _bits(add_mask):
+                new = pairs[bit] | add_mask | kept
+                if new != pairs[bit]:
+                    pairs[bit] = new
+                    changed = True
+            for bit in _bits(kept):
+                new = pairs[bit] | add_mask
+                if new != pairs[bit]:
+                    pairs[bit] = new
+                    changed = True
+    return pairs
+
+
+class StubbornSets:
+    """ Partial-order reduction of the applicable actions with strong stubborn sets
+
+    A strong stubborn set of a (non-goal) state is a set of actions that
+    contains the achievers of one of the unsatisfied goals, the achievers of
+    one unsatisfied precondition of each inapplicable action in the set, and
+    every action that interferes with each applicable action in the set. Only
+    the applicable actions of the set need to be expanded: the other actions
+    are independent of them, so they can be applied later in the same order
+    without losing any plan. At least one optimal plan is preserved, so search
+    algorithms stay complete (and optimal if they were).
+
+    Two actions interfere if one deletes a precondition of the other or adds a
+    literal that the other requires to be false, or if one adds a fluent that
+    the other deletes (the effects are taken as applied by result(), where add
+    effects win over delete effects).
+
+    Attributes
+    ----------
+    applicable, expanded : int
+        The total numbers of applicable actions and of actions left after
+        pruning (over every state given to prune)
+
+    See Also
+    --------
+    Valmari, "Stubborn sets for reduced state space generation" (1989)
+    Wehrle & Helmert, "Efficient stubborn sets: generalized algorithms and
+    selection strategies" (2014)
+    """
+    def __init__(self, problem):
+        self.actions = list(problem.actions_list)
+        self.index = {action: idx for idx, action in enumerate(self.actions)}
+        masks = [problem._masks(action) for action in self.actions]
+        self.pre_pos = [pos for pos, _, _, _ in masks]
+        self.pre_neg = [neg for _, neg, _, _ in masks]
+        self.add = [add for _, _, add, _ in masks]
+        self.rem = [rem & ~add for _, _, add, rem in masks]
+        self.goal = problem._goal_mask
+
+        # the actions that require, add and delete each fluent (the extra bit
+        # marks preconditions that are not fluents of the problem)
+        size = len(problem.state_map) + 1
+        self.requires_true = [[] for _ in range(size)]
+        self.requires_false = [[] for _ in range(size)]
+        self.adders = [[] for _ in range(size)]
+        self.removers = [[] for _ in range(size)]
+        for idx in range(len(self.actions)):
+            for lists, mask in [(self.requires_true, self.pre_pos[idx]), (self.requires_false, self.pre_neg[idx]),
+                                (self.adders, self.add[idx]), (self.removers, self.rem[idx])]:
+                for bit in _bits(mask):
+                    lists[bit].append(idx)
+        self.reachable_pairs = _reachable_pairs(self.pre_pos, self.add, self.rem, pack_state(problem.initial))
+        self._interference = {}
+        self.applicable = self.expanded = 0
+
+    def interfering(self, idx):
+        """ Return the ids of the actions that interfere with an action """
+        result = self._interference.get(idx)
+        if result is None:
+            result = set()
+            for bit in _bits(self.rem[idx]):
+                result.update(self.requires_true[bit])
+                result.update(self.adders[bit])
+            for bit in _bits(self.add[idx]):
+                result.update(self.requires_false[bit])
+                result.update(self.removers[bit])
+            for bit in _bits(self.pre_pos[idx]):
+                result.update(self.removers[bit])
+            for bit in _bits(self.pre_neg[idx]):
+                result.update(self.adders[bit])
+            result.discard(idx)
+            result = self._interference[idx] = tuple(other for other in result if not self.exclusive(idx, other))
+        return result
+
+    def exclusive(self, first, second):
+        """ Return True if two actions are never applicable in the same state
+        (their preconditions contradict, or are a mutex pair of fluents)
+        """
+        if self.pre_pos[first] & self.pre_neg[second] or self.pre_neg[first] & self.pre_pos[second]:
+            return True
+        required = self.pre_pos[first] | self.pre_pos[second]
+        return any(required & ~self.reachable_pairs[bit] for bit in _bits(required))
+
+    def _fewest(self, achievers, mask):
+        """ Return the shortest list of achievers of the fluents in the mask """
+        return min((achievers[bit] for bit in _bits(mask)), key=len)
+
+    def prune(self, packed, applicable):
+        """ Return the actions of a strong stubborn set of the packed state that
+        are in the list of applicable actions (in the same order)
+        """
+        self.applicable += len(applicable)
+        unsatisfied = self.goal & ~packed
+        if not unsatisfied or len(applicable) < 2:
+            self.expanded += len(applicable)
+            return applicable
+        queue = list(self._fewest(self.adders, unsatisfied))
+        stubborn = set(queue)
+        while queue:
+            idx = queue.pop()
+            missing = self.pre_pos[idx] & ~packed
+            forbidden = self.pre_neg[idx] & packed
+            if missing or forbidden:
+                new = self._fewest(self.adders, missing) if missing else self._fewest(self.removers, forbidden)
+            else:
+                new = self.interfering(idx)
+            for other in new:
+                if other not in stubborn:
+                    stubborn.add(other)
+                    queue.append(other)
+        pruned = [action for action in applicable if self.index[action] in stubborn]
+        self.expanded += len(pruned)
+        return pruned
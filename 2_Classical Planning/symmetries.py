@@ -0,0 +1,131 @@
+
+from collections import defaultdict
+from itertools import combinations
+
+from aimacode.utils import Expr
+from _utils import HeuristicCache
+
+
+class ObjectSymmetries:
+    """ Symmetries of a planning problem that permute interchangeable objects
+
+    Two objects are interchangeable if swapping their names everywhere maps the
+    fluents, the actions and the goal of the problem onto themselves (e.g., the
+    planes of an air cargo problem, which no goal mentions). Swaps of
+    interchangeable objects generate a group of permutations of the fluents
+    that maps every state onto states with the same distance to the goal, so a
+    search only needs to visit one state of each orbit of the group.
+
+    States are mapped to a canonical representative by greedily applying the
+    swaps that make the packed state smaller until none does (the result is
+    always a state symmetric to the original one, but symmetric states are not
+    guaranteed to have the same representative, so some duplicates can be left).
+    The initial state does not need to be symmetric: it is canonicalized like
+    any other state. The representatives of the most recently canonicalized
+    states are kept in a bounded cache.
+
+    Since the swaps map the actions and the goal onto themselves, the heuristics
+    of the problem that only depend on the state (the relaxed and planning graph
+    heuristics) have the same value on symmetric states, so their cached values
+    can be keyed by canonical states (see BasePlanningProblem.state_key).
+    Path-dependent heuristics (h_landmark_count) are not keyed by state.
+
+    Parameters
+    ----------
+    problem : BasePlanningProblem
+
+    cache_size : int or None
+        The number of canonical states kept (None keeps every state)
+
+    Attributes
+    ----------
+    classes : list(list(str))
+        The sets of interchangeable objects (with at least two objects)
+
+    generators : list(list(int))
+        The permutation of the fluent positions of each swap of two objects
+
+    See Also
+    --------
+    Pochter, Zohar & Rosenschein, "Exploiting problem symmetries in state-based
+    planners" (2011)
+    Domshlak, Katz & Shleyfman, "Enhanced symmetry breaking in cost-optimal
+    planning as forward search" (2012)
+    """
+    def __init__(self, problem, cache_size=2**16):
+        fluents = list(problem.state_map)
+        position = {fluent: idx for idx, fluent in enumerate(fluents)}
+        goal = frozenset(problem.goal)
+        actions = frozenset(_signature(action) for action in problem.actions_list)
+
+        # only objects that appear in the same argument positions can be swapped
+        roles = defaultdict(set)
+        for literal in fluents + [Expr(action.name, *action.args) for action in problem.actions_list]:
+            for idx, arg in enumerate(literal.args):
+                roles[arg].add((literal.op, idx))
+        candidates = defaultdict(list)
+        for obj, obj_roles in roles.items():
+            candidates[frozenset(obj_roles)].append(obj)
+
+        parent = {}
+
+        def find(obj):
+            while parent.get(obj, obj) != obj:
+                obj = parent[obj]
+            return obj
+
+        for objects in candidates.values():
+            for a, b in combinations(sorted(objects, key=str), 2):
+                if find(a) == find(b):
+                    continue  # the swap is generated by the swaps already found
+                swap = {a: b, b: a}
+                if (all(_rename(f, swap) in position for f in fluents)
+                        and frozenset(_rename(g, swap) for g in goal) == goal
+                        and all(_signature(action, swap) in actions for action in problem.actions_list)):
+                    parent[find(b)] = find(a)
+
+        members = defaultdict(set)
+        for obj, root in parent.items():
+            members[find(obj)].update([obj, root])
+        self.classes = sorted(sorted(map(str, objects)) for objects in members.values())
+        self.generators = []
+        for objects in members.values():
+            for a, b in combinations(sorted(objects, key=str), 2):
+                swap = {a: b, b: a}
+                self.generators.append([position[_rename(f, swap)] for f in fluents])
+        self._canonical = HeuristicCache(cache_size)
+
+    def canonical(self, packed):
+        """ Return the canonical representative of a packed state """
+        result = self._canonical.get(packed)
+        if result is None:
+            result = packed
+            improved = True
+            while improved:
+                improved = False
+                for permutation in self.generators:
+                    image = _permute(result, permutation)
+                    if image < result:
+                        result, improved = image, True
+            self._canonical.put(packed, result)
+        return result
+
+
+def _permute(packed, permutation):
+    image = 0
+    while packed:
+        low = packed & -packed
+        image |= 1 << permutation[low.bit_length() - 1]
+        packed ^= low
+    return image
+
+
+def _rename(literal, swap):
+    return Expr(literal.op, *[swap.get(arg, arg) for arg in literal.args])
+
+
+def _signature(action, swap=None):
+    swap = swap or {}
+    return (action.name, tuple(swap.get(arg, arg) for arg in action.args)) + tuple(
+        frozenset(_rename(literal, swap) for literal in literals)
+        for literals in [action.precond_pos, action.precond_neg, action.effect_add, action.effect_rem])
@@ -0,0 +1,112 @@
+
+import os
+import tempfile
+import unittest
+
+from timeit import default_timer as timer
+
+from aimacode.search import (Problem, breadth_first_search, astar_search, anytime_weighted_astar_search,
+    depth_first_graph_search, greedy_best_first_graph_search, uniform_cost_search)
+from air_cargo_problems import air_cargo_p1
+from example_have_cake import have_cake
+from experiments import run_experiments, run_portfolio, ResultsFile
+
+
+def spin(problem):
+    while True:
+        pass
+
+
+def fail(problem):
+    raise ValueError("no plan")
+
+
+class DetourProblem(Problem):
+    """ Go from A to B directly for a cost of 10, or through C for a cost of 2 """
+    actions_list = [('A', 'B'), ('A', 'C'), ('C', 'B')]
+
+    def __init__(self):
+        super().__init__('A', 'B')
+
+    def actions(self, state):
+        return [action for action in self.actions_list if action[0] == state]
+
+    def result(self, state, action):
+        return action[1]
+
+    def path_cost(self, c, state1, action, state2):
+        return c + (10 if action == ('A', 'B') else 1)
+
+
+class Test_1_Experiments(unittest.TestCase):
+    def setUp(self):
+        self.problems = [["Cake", have_cake], ["Air Cargo Problem 1", air_cargo_p1]]
+        self.searches = [["breadth_first_search", breadth_first_search, ""],
+                         ["astar_search", astar_search, "h_unmet_goals"]]
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_1_resume(self):
+        for ext in ['csv', 'jsonl']:
+            path = os.path.join(self.tmpdir.name, 'results.' + ext)
+            rows = run_experiments(self.problems, self.searches, path, processes=2, log=lambda msg: None)
+            self.assertEqual(len(rows), 4)
+            lengths = {(r['problem'], r['search']): r['plan_length'] for r in rows}
+            self.assertEqual(lengths[("Air Cargo Problem 1", "astar_search")], 6)
+            self.assertEqual(lengths[("Cake", "breadth_first_search")], 2)
+            self.assertEqual(len(ResultsFile(path).completed()), 4)
+
+            # a rerun only solves the new experiments
+            searches = self.searches + [["depth_first_graph_search", depth_first_graph_search, ""]]
+            rows = run_experiments(self.problems, searches, path, processes=2, log=lambda msg: None)
+            self.assertEqual(len(rows), 2)
+            self.assertEqual(len(ResultsFile(path).completed()), 6)
+
+    def test_2_time_limit(self):
+        path = os.path.join(self.tmpdir.name, 'results.jsonl')
+        rows = run_experiments(self.problems[:1], [["spin", spin, ""]], path,
+                               time_limit=0.5, log=lambda msg: None)
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0]['timeout'])
+        self.assertIsNone(rows[0]['plan_length'])
+
+
+class Test_2_Portfolio(unittest.TestCase):
+    def test_1_first_plan(self):
+        start = timer()
+        node, search = run_portfolio(air_cargo_p1, [["spin", spin, ""], ["fail", fail, ""],
+                                                    ["breadth_first_search", breadth_first_search, ""]],
+                                     log=lambda msg: None)
+        # the search that never ends is terminated
+        self.assertLess(timer() - start, 10)
+        self.assertEqual(search[0], "breadth_first_search")
+        self.assertEqual(len(node.solution()), 6)
+
+    def test_2_best_plan_by_deadline(self):
+        searches = [["spin", spin, ""],
+                    ["greedy_best_first_graph_search", greedy_best_first_graph_search, "h_unmet_goals"],
+                    ["anytime_weighted_astar_search", anytime_weighted_astar_search, "h_unmet_goals"]]
+        node, search = run_portfolio(air_cargo_p1, searches, deadline=1.0, first=False, log=lambda msg: None)
+        self.assertEqual(len(node.solution()), 6)
+        # the plan is rebuilt from the initial state of a new instance of the problem
+        self.assertTrue(air_cargo_p1().goal_test(node.state))
+        self.assertNotEqual(search[0], "spin")
+
+    def test_3_no_plan(self):
+        self.assertEqual(run_portfolio(have_cake, [["spin", spin, ""]], deadline=0.5, log=lambda msg: None),
+                         (None, None))
+
+    def test_4_cheapest_plan(self):
+        # the longer plan is cheaper
+        searches = [["breadth_first_search", breadth_first_search, ""],
+                    ["uniform_cost_search", uniform_cost_search, ""]]
+        node, search = run_portfolio(DetourProblem, searches, first=False, log=lambda msg: None)
+        self.assertEqual(search[0], "uniform_cost_search")
+        self.assertEqual(node.solution(), [('A', 'C'), ('C', 'B')])
+        self.assertEqual(node.path_cost, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+
+import os
+import tempfile
+import unittest
+
+from aimacode.planning import Action
+from aimacode.search import InstrumentedProblem, breadth_first_search
+from _utils import FluentState, make_literal
+from air_cargo_problems import air_cargo_p1, air_cargo_p2
+from external_search import LayerFile, external_breadth_first_search
+from pddl import PddlProblem
+
+
+class Test_1_ExternalSearch(unittest.TestCase):
+    def test_1_layer_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            layer = LayerFile.write(os.path.join(directory, 'layer'), 2, [1, 255, 256, 40000])
+            self.assertEqual(len(layer), 4)
+            self.assertEqual(list(layer), [1, 255, 256, 40000])
+            self.assertEqual(list(LayerFile.write(os.path.join(directory, 'empty'), 2, [])), [])
+
+    def test_2_optimal_plans(self):
+        for problem_fn in [air_cargo_p1, air_cargo_p2]:
+            expected = len(breadth_first_search(problem_fn()).solution())
+            run_files = []
+            for budget in [64, 0.001]:
+                problem = InstrumentedProblem(problem_fn())
+                with tempfile.TemporaryDirectory() as directory:
+                    node = external_breadth_first_search(problem, budget, directory)
+                    self.assertEqual(os.listdir(directory), [])
+                self.assertTrue(problem.goal_test(node.state))
+                self.assertEqual(len(node.solution()), expected)
+                self.assertEqual(problem.search_stats['layers'], expected)
+                run_files.append(problem.search_stats['run_files'])
+            # a small budget splits the successors of a layer into several sorted runs
+            self.assertLess(run_files[0], run_files[1])
+
+    def test_3_unsolvable(self):
+        have, eaten = make_literal('Have', 'Cake'), make_literal('Eaten', 'Cake')
+        eat = Action(make_literal('Eat', 'Cake'), [{have}, set()], [{eaten}, {have}])
+        problem = InstrumentedProblem(PddlProblem(FluentState([have], [eaten]), [have, eaten], [eat]))
+        self.assertIsNone(external_breadth_first_search(problem))
+        self.assertEqual(problem.search_stats['stored_states'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
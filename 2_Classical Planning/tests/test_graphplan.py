@@ -0,0 +1,51 @@
+
+import unittest
+
+from aimacode.search import InstrumentedProblem
+from aimacode.planning import Action
+from _utils import FluentState, make_literal
+from air_cargo_problems import AirCargoProblem, air_cargo_p1, air_cargo_p2
+from example_have_cake import have_cake
+from graphplan import GraphPlan, graphplan_search
+from pddl import PddlProblem
+
+
+class Test_1_GraphPlan(unittest.TestCase):
+    def test_1_parallel_plans(self):
+        for problem_fn, length, steps in [(have_cake, 2, 2), (air_cargo_p1, 6, 3), (air_cargo_p2, 9, 3)]:
+            problem = InstrumentedProblem(problem_fn())
+            node = graphplan_search(problem)
+            self.assertTrue(problem.goal_test(node.state))
+            self.assertEqual(len(node.solution()), length)
+            self.assertEqual(problem.search_stats['parallel_length'], steps)
+
+    def test_2_parallel_steps_are_not_mutex(self):
+        planner = GraphPlan(air_cargo_p1())
+        steps = planner.solve()
+        for level, step in enumerate(steps):
+            layer = planner.action_layer(level)
+            self.assertTrue(all(action in layer for action in step))
+            self.assertFalse(any(layer.is_mutex(a, b) for a in step for b in step if a != b))
+
+    def test_3_unsolvable(self):
+        at = lambda *args: make_literal('At', *args)
+        initial = FluentState([at('C1', 'SFO'), at('P1', 'SFO')],
+                              [at('C1', 'JFK'), at('P1', 'JFK'), make_literal('In', 'C1', 'P1')])
+        problem = AirCargoProblem(['C1'], ['P1'], ['SFO', 'JFK'], initial, [at('C1', 'SFO'), at('C1', 'JFK')])
+        self.assertIsNone(graphplan_search(problem))
+
+    def test_4_unsolvable_at_fixpoint(self):
+        # every pair of A, B and C can be true at once, but never all three
+        a, b, c = (make_literal(name) for name in 'ABC')
+        actions = [Action(make_literal('Make', *map(str, adds)), [set(), set()], [set(adds), {deleted}])
+                   for adds, deleted in [((a, b), c), ((b, c), a), ((a, c), b)]]
+        planner = GraphPlan(PddlProblem(FluentState([], [a, b, c]), [a, b, c], actions))
+        self.assertIsNone(planner.solve())
+        # the goals are reachable without mutexes, so the search only ends when the nogoods stop growing
+        self.assertTrue(planner.graph._is_leveled)
+        self.assertTrue(planner._is_reachable(planner.goal, planner.literal_layer(planner.num_levels - 1)))
+        self.assertGreater(len(planner.nogoods[planner.num_levels - 1]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+
+import unittest
+
+from aimacode.search import Node, astar_search, greedy_best_first_graph_search
+from _utils import make_literal
+from air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_p4
+from example_have_cake import have_cake
+
+
+class Test_1_LandmarkGraph(unittest.TestCase):
+    def landmarks(self, problem):
+        fact_index = problem.relaxed_task.fact_index
+        graph = problem.landmark_graph
+        literals = {fact: literal for literal, fact in fact_index.items()}
+        return [frozenset(literals[fact] for fact in facts) for facts in graph.landmarks]
+
+    def test_1_fact_landmarks(self):
+        problem = have_cake()
+        landmarks = self.landmarks(problem)
+        have, eaten = make_literal('Have', 'Cake'), make_literal('Eaten', 'Cake')
+        self.assertEqual(set(landmarks), {frozenset([have]), frozenset([eaten])})
+        # the cake must be had before it is eaten
+        graph = problem.landmark_graph
+        self.assertEqual(graph.orderings[landmarks.index(frozenset([eaten]))],
+                         {landmarks.index(frozenset([have]))})
+
+    def test_2_disjunctive_landmarks(self):
+        problem = air_cargo_p1()
+        landmarks = self.landmarks(problem)
+        goal = frozenset([make_literal('At', 'C1', 'JFK')])
+        in_plane = frozenset([make_literal('In', 'C1', 'P1'), make_literal('In', 'C1', 'P2')])
+        self.assertIn(goal, landmarks)
+        self.assertIn(in_plane, landmarks)
+        self.assertIn(landmarks.index(in_plane), problem.landmark_graph.orderings[landmarks.index(goal)])
+
+
+class Test_2_LandmarkCount(unittest.TestCase):
+    def test_1_accepted_along_path(self):
+        problem = air_cargo_p1()
+        root = Node(problem.initial)
+        self.assertEqual(problem.h_landmark_count(root), 4)
+        load = [a for a in problem.actions(root.state) if str(a) == 'Load(C1, P1, SFO)'][0]
+        child = root.child_node(problem, load)
+        self.assertEqual(problem.h_landmark_count(child), 3)
+        # unloading the cargo returns to the initial state, and the landmarks
+        # accepted by a state are those accepted on every path that reaches it
+        unload = [a for a in problem.actions(child.state) if str(a) == 'Unload(C1, P1, SFO)'][0]
+        self.assertEqual(problem.h_landmark_count(child.child_node(problem, unload)), 4)
+        # the heuristic does not use the cache of state heuristics
+        self.assertEqual(problem.heuristic_cache.misses, 0)
+
+    def test_2_searches(self):
+        for problem_fn, length in [(have_cake, 2), (air_cargo_p1, 6), (air_cargo_p2, 9)]:
+            problem = problem_fn()
+            node = astar_search(problem, problem.h_landmark_count)
+            self.assertEqual(len(node.solution()), length)
+            self.assertEqual(problem.h_landmark_count(node), 0)
+
+        problem = air_cargo_p4()
+        node = greedy_best_first_graph_search(problem, problem.h_landmark_count)
+        self.assertTrue(problem.goal_test(node.state))
+
+    def test_3_reproducible_across_searches(self):
+        # the accepted landmarks of a search do not depend on the searches before it
+        fresh, reused = air_cargo_p2(), air_cargo_p2()
+        astar_search(reused, reused.h_landmark_count)
+        values = []
+        for problem in [fresh, reused]:
+            h = problem.h_landmark_count
+            node = greedy_best_first_graph_search(problem, lambda n: values.append(h(n)) or values[-1])
+            self.assertTrue(problem.goal_test(node.state))
+        self.assertEqual(values[:len(values) // 2], values[len(values) // 2:])
+        # and only the states of the last search keep their accepted landmarks
+        self.assertEqual(len(reused.landmark_graph.accepted), len(fresh.landmark_graph.accepted))
+
+
+if __name__ == '__main__':
+    unittest.main()
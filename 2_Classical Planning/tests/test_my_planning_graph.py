@@ -262,5 +262,23 @@ class Test_2_PlanningGraphHeuristics(unittest.TestCase):
         self.assertEqual(self.ac_problem_4.h_pg_setlevel(self.ac_node_4), 6, self.msg)
 
 
+class Test_3_PlanningGraphLeveling(unittest.TestCase):
+    def setUp(self):
+        self.problems = [have_cake(), air_cargo_p1(), air_cargo_p2()]
+
+    def test_9_leveled_off(self):
+        # the growth counters must agree with a full comparison of the layers
+        for problem in self.problems:
+            for serialize, ignore_mutexes in [(True, False), (False, False), (True, True)]:
+                pg = PlanningGraph(problem, problem.initial, serialize, ignore_mutexes).fill()
+                layers = pg.literal_layers
+                self.assertEqual(layers[-1], layers[-2])
+                for idx in range(len(layers) - 2):
+                    self.assertNotEqual(layers[idx], layers[idx + 1],
+                        "The planning graph leveled off late at layer {}".format(len(layers) - 1))
+                self.assertEqual(layers[-1].num_new_items, 0)
+                self.assertEqual(layers[-1].num_mutexes, layers[-2].num_mutexes)
+
+
 if __name__ == '__main__':
     unittest.main()
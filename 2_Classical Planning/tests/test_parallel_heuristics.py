@@ -0,0 +1,70 @@
+
+import unittest
+
+from aimacode.search import InstrumentedProblem, Node, Problem, astar_search
+from air_cargo_problems import air_cargo_p1, air_cargo_p2
+from parallel_heuristics import HeuristicPool, parallel_astar_search
+
+
+class GraphProblem(Problem):
+    """ Move along the edges of a graph to one of the goal vertices """
+    def __init__(self, edges, goals, h):
+        super().__init__(0, goals)
+        self.edges, self.heuristic = edges, h
+
+    def actions(self, state):
+        return self.edges.get(state, [])
+
+    def result(self, state, action):
+        return action
+
+    def goal_test(self, state):
+        return state in self.goal
+
+    def h(self, node):
+        return self.heuristic.get(node.state, 0)
+
+
+class Test_1_HeuristicPool(unittest.TestCase):
+    def test_1_evaluate(self):
+        problem = air_cargo_p1()
+        states = [problem.result(problem.initial, a) for a in problem.actions(problem.initial)]
+        expected = [problem.h_pg_levelsum(Node(state)) for state in states]
+        with HeuristicPool(problem.h_pg_levelsum, processes=2) as pool:
+            self.assertEqual(pool.processes, 2)
+            self.assertEqual(pool.evaluate(states), expected)
+            self.assertEqual(pool.evaluate([]), [])
+        self.assertEqual(HeuristicPool(problem.h_pg_levelsum, processes=0).evaluate(states), expected)
+
+
+class Test_2_ParallelAstar(unittest.TestCase):
+    def test_1_same_as_astar(self):
+        problem = air_cargo_p2()
+        serial = InstrumentedProblem(problem)
+        node = astar_search(serial, problem.h_max)
+        parallel = InstrumentedProblem(problem)
+        with HeuristicPool(problem.h_max, processes=2) as pool:
+            parallel_node = parallel_astar_search(parallel, problem.h_max, pool=pool)
+            self.assertIsNotNone(pool.pool)  # the pool of the caller is kept open
+        self.assertEqual(parallel_node.solution(), node.solution())
+        self.assertEqual(parallel.succs, serial.succs)
+        self.assertEqual(parallel.search_stats['heuristic_batches'], serial.succs + 1)
+
+    def test_2_batches(self):
+        problem = InstrumentedProblem(air_cargo_p2())
+        node = parallel_astar_search(problem, problem.problem.h_max, processes=2, batch_size=8)
+        self.assertEqual(len(node.solution()), 9)
+        self.assertLess(problem.search_stats['heuristic_batches'], problem.succs / 4)
+
+    def test_3_optimal_batches(self):
+        # a goal popped after cheaper nodes of a batch must not end the search
+        # before the children of those nodes are generated
+        problem = GraphProblem({0: [1, 2, 3], 1: [4], 2: [5], 4: [6], 3: [7]}, {6, 7}, {0: 1, 3: 1})
+        self.assertEqual(astar_search(problem, problem.h).solution(), [3, 7])
+        for batch_size in [2, 3, 8]:
+            node = parallel_astar_search(problem, problem.h, processes=0, batch_size=batch_size)
+            self.assertEqual(node.solution(), [3, 7])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+
+import os
+import tempfile
+import unittest
+
+from aimacode.search import Node, astar_search
+from air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_p3, air_cargo_random
+from pattern_databases import (
+    UNREACHABLE, PatternDatabase, air_cargo_patterns, load_pattern_databases
+)
+
+
+class Test_1_PatternDatabases(unittest.TestCase):
+    def test_1_tables(self):
+        problem = air_cargo_p1()
+        pattern, owned = air_cargo_patterns(problem)[0]
+        database = PatternDatabase(problem, pattern, owned)
+        # At(C1, *), In(C1, *) and At(P*, *) with two planes and two airports: the
+        # cargo has four locations and each plane has two
+        self.assertEqual(len(database.positions), 8)
+        self.assertEqual([len(values) for values in database.variables], [4, 2, 2])
+        self.assertEqual(database.table.typecode, 'B')
+        self.assertEqual(len(database.table), 4 * 2 * 2)
+        self.assertEqual(database.h(problem.initial), 3)
+        # every combination of values is reachable, so no entry is wasted
+        self.assertNotIn(UNREACHABLE, database.table)
+
+    def test_2_admissible_combinations(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for problem_fn, length in [(air_cargo_p1, 6), (air_cargo_p2, 9), (air_cargo_p3, 12)]:
+                problem = problem_fn()
+                additive = load_pattern_databases(problem, air_cargo_patterns(problem), 'sum', cache_dir)
+                maximum = load_pattern_databases(problem, air_cargo_patterns(problem, additive=False),
+                                                 'max', cache_dir)
+                self.assertLessEqual(maximum.h(problem.initial), additive.h(problem.initial))
+                for pdbs in [additive, maximum]:
+                    node = astar_search(problem, lambda n: pdbs.h(n.state))
+                    self.assertEqual(len(node.solution()), length)
+                    self.assertEqual(pdbs.h(node.state), 0)
+            with self.assertRaises(ValueError):
+                load_pattern_databases(problem, air_cargo_patterns(problem), 'min', cache_dir)
+            with self.assertRaises(ValueError):
+                load_pattern_databases(problem, air_cargo_patterns(problem), max_size=4, cache_dir=cache_dir)
+
+    def test_3_cache(self):
+        problem = air_cargo_p2()
+        patterns = air_cargo_patterns(problem)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            built = load_pattern_databases(problem, patterns, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), len(problem.cargos))
+            cached = load_pattern_databases(air_cargo_p2(), patterns, cache_dir=cache_dir)
+            self.assertEqual([d.table for d in cached.databases], [d.table for d in built.databases])
+
+            # truncated tables are built again
+            path = os.path.join(cache_dir, sorted(os.listdir(cache_dir))[0])
+            with open(path, 'r+b') as f:
+                f.truncate(10)
+            rebuilt = load_pattern_databases(problem, patterns, cache_dir=cache_dir)
+            self.assertEqual([d.table for d in rebuilt.databases], [d.table for d in built.databases])
+            self.assertEqual(os.path.getsize(path), len(built.databases[0].table))
+
+    def test_4_heuristic(self):
+        problem = air_cargo_p1()
+        problem._pattern_databases = load_pattern_databases(problem, air_cargo_patterns(problem), use_cache=False)
+        self.assertEqual(problem.h_pdb(Node(problem.initial)), 5)
+
+    def test_5_ranked_tables(self):
+        # 23 pattern fluents, but 8 cargo locations and 5 airports for each of 3 planes
+        problem = air_cargo_random(2, 3, 5, seed=1)
+        databases = load_pattern_databases(problem, air_cargo_patterns(problem), use_cache=False)
+        self.assertEqual([len(d.positions) for d in databases.databases], [23, 23])
+        self.assertEqual([len(d.table) for d in databases.databases], [8 * 5 ** 3] * 2)
+        node = astar_search(problem, lambda n: databases.h(n.state))
+        self.assertEqual(len(node.solution()), len(astar_search(problem, problem.h_max).solution()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+
+import os
+import pickle
+import tempfile
+import unittest
+
+from aimacode.search import astar_search
+from _utils import make_literal
+from air_cargo_problems import air_cargo_p1
+from pddl import compile_pddl, load_pddl, parse_sexp
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pddl_examples')
+
+ROADS_DOMAIN = """
+(define (domain roads)
+  (:requirements :strips :negative-preconditions)
+  (:predicates (road ?a ?b) (at ?a) (visited ?a))
+  (:action drive
+    :parameters (?from ?to)
+    :precondition (and (at ?from) (road ?from ?to) (not (visited ?to)))
+    :effect (and (at ?to) (visited ?to) (not (at ?from)))))
+"""
+
+ROADS_PROBLEM = """
+(define (problem three-towns)
+  (:domain roads)
+  (:objects a b c)
+  (:init (at a) (visited a) (road a b) (road b c))
+  (:goal (and (at c))))
+"""
+
+
+class Test_1_PddlFrontEnd(unittest.TestCase):
+    def test_1_parse_sexp(self):
+        self.assertEqual(parse_sexp("(define (domain d)) ; comment\n"), [['define', ['domain', 'd']]])
+        with self.assertRaises(ValueError):
+            parse_sexp("(define (domain d)")
+
+    def test_2_air_cargo(self):
+        expected = air_cargo_p1()
+        problem = load_pddl(os.path.join(EXAMPLES, 'air_cargo_domain.pddl'),
+                            os.path.join(EXAMPLES, 'air_cargo_p1.pddl'), use_cache=False)
+        self.assertEqual(problem.state_map, expected.state_map)
+        self.assertEqual(problem.initial, expected.initial)
+        self.assertEqual(set(problem.goal), set(expected.goal))
+        self.assertEqual(sorted(map(str, problem.actions_list)), sorted(map(str, expected.actions_list)))
+        self.assertEqual(len(astar_search(problem, problem.h_ff).solution()), 6)
+
+    def test_3_static_predicates(self):
+        problem = compile_pddl(ROADS_DOMAIN, ROADS_PROBLEM)
+        # road is static, so only the drives along roads are grounded and road is not a fluent
+        self.assertEqual([str(a) for a in problem.actions_list], ['drive(a, b)', 'drive(b, c)'])
+        self.assertNotIn(make_literal('road', 'a', 'b'), problem.state_map)
+        self.assertEqual([a.name for a in astar_search(problem, problem.h_max).solution()], ['drive', 'drive'])
+        with self.assertRaises(ValueError):
+            compile_pddl(ROADS_DOMAIN, ROADS_PROBLEM.replace("(and (at c))", "(or (at c) (at b))"))
+        # static goals that hold are dropped, and a static goal that does not hold is unsolvable
+        problem = compile_pddl(ROADS_DOMAIN, ROADS_PROBLEM.replace("(and (at c))", "(and (at c) (road a b))"))
+        self.assertEqual(problem.goal, [make_literal('at', 'c')])
+        self.assertEqual(len(astar_search(problem, problem.h_max).solution()), 2)
+        with self.assertRaises(ValueError):
+            compile_pddl(ROADS_DOMAIN, ROADS_PROBLEM.replace("(and (at c))", "(and (at c) (road c a))"))
+
+    def test_4_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            args = (os.path.join(EXAMPLES, 'air_cargo_domain.pddl'), os.path.join(EXAMPLES, 'air_cargo_p2.pddl'))
+            compiled = load_pddl(*args, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            cached = load_pddl(*args, cache_dir=cache_dir)
+            self.assertIsNot(cached, compiled)
+            self.assertEqual(cached.initial, compiled.initial)
+            self.assertEqual([str(a) for a in cached.actions(cached.initial)],
+                             [str(a) for a in compiled.actions(compiled.initial)])
+            self.assertEqual(len(astar_search(cached, cached.h_ff).solution()), 9)
+            # only the grounded task is pickled, not the heuristic cache of the problem
+            with open(os.path.join(cache_dir, os.listdir(cache_dir)[0]), 'rb') as f:
+                task = pickle.load(f)
+            self.assertIsInstance(task, tuple)
+            self.assertEqual(len(load_pddl(*args, cache_dir=cache_dir).heuristic_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+
+import unittest
+
+from aimacode.planning import Action
+from aimacode.search import Node, astar_search, greedy_best_first_graph_search
+from aimacode.utils import expr
+from _utils import FluentState, HeuristicCache, ZobristState, make_literal, prune_unreachable, pack_state, decode_state
+from example_have_cake import have_cake
+from pddl import PddlProblem
+from air_cargo_problems import (
+    air_cargo_p1, air_cargo_p2, air_cargo_p3, air_cargo_p4, air_cargo_random
+)
+
+
+class Test_1_RelaxedHeuristics(unittest.TestCase):
+    def setUp(self):
+        self.problems = [have_cake(), air_cargo_p1(), air_cargo_p2(), air_cargo_p3(), air_cargo_p4()]
+        self.nodes = [Node(p.initial) for p in self.problems]
+
+    def test_1_hmax(self):
+        expected = [1, 2, 2, 3, 3]
+        self.assertEqual([p.h_max(n) for p, n in zip(self.problems, self.nodes)], expected)
+        # h_max is the relaxed counterpart of the maxlevel heuristic
+        self.assertEqual(expected, [p.h_pg_maxlevel(n) for p, n in zip(self.problems, self.nodes)])
+
+    def test_2_hadd(self):
+        expected = [1, 6, 9, 12, 15]
+        self.assertEqual([p.h_add(n) for p, n in zip(self.problems, self.nodes)], expected)
+
+    def test_3_hff(self):
+        expected = [1, 6, 9, 12, 15]
+        self.assertEqual([p.h_ff(n) for p, n in zip(self.problems, self.nodes)], expected)
+        for problem, node in zip(self.problems, self.nodes):
+            self.assertLessEqual(problem.h_max(node), problem.h_ff(node))
+
+    def test_4_goal_state(self):
+        problem = have_cake()
+        eat, bake = problem.actions_list
+        goal_state = problem.result(problem.result(problem.initial, eat), bake)
+        self.assertTrue(problem.goal_test(goal_state))
+        for h in [problem.h_max, problem.h_add, problem.h_ff]:
+            self.assertEqual(h(Node(goal_state)), 0)
+
+    def test_5_helpful_actions(self):
+        problem = air_cargo_p1()
+        value, helpful = problem.relaxed_task.helpful_actions(problem.initial)
+        self.assertEqual(value, problem.h_ff(Node(problem.initial)))
+        self.assertEqual(sorted(map(str, helpful)),
+                         ['Fly(P1, SFO, JFK)', 'Fly(P2, JFK, SFO)', 'Load(C1, P1, SFO)', 'Load(C2, P2, JFK)'])
+        self.assertTrue(set(helpful) <= set(problem.actions(problem.initial)))
+        self.assertEqual(problem.preferred_ff(Node(problem.initial)), frozenset(helpful))
+
+
+class Test_2_HeuristicCache(unittest.TestCase):
+    def test_1_eviction(self):
+        lru, fifo = HeuristicCache(maxsize=2), HeuristicCache(maxsize=2, policy='fifo')
+        for cache in [lru, fifo]:
+            cache.put('a', 1)
+            cache.put('b', 2)
+            self.assertEqual(cache.get('a'), 1)
+            cache.put('c', 3)
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.evictions, 1)
+        # the lookup of 'a' protects it from eviction only with the LRU policy
+        self.assertEqual((lru.get('a'), lru.get('b')), (1, None))
+        self.assertEqual((fifo.get('a'), fifo.get('b')), (None, 2))
+        self.assertEqual(lru.stats(), {'hits': 2, 'misses': 1, 'evictions': 1, 'size': 2})
+        with self.assertRaises(ValueError):
+            HeuristicCache(policy='random')
+
+    def test_2_keyed_by_state(self):
+        problem = air_cargo_p1()
+        self.assertEqual(problem.h_ff(Node(problem.initial)), 6)
+        self.assertEqual(problem.h_ff(Node(problem.initial, path_cost=3)), 6)
+        self.assertEqual((problem.heuristic_cache.hits, problem.heuristic_cache.misses), (1, 1))
+
+        # the cache is shared by every search on the problem
+        node = astar_search(problem, problem.h_ff)
+        misses = problem.heuristic_cache.misses
+        self.assertEqual(astar_search(problem, problem.h_ff).solution(), node.solution())
+        self.assertEqual(problem.heuristic_cache.misses, misses)
+
+    def test_3_cache_size(self):
+        have, eaten = expr('Have(Cake)'), expr('Eaten(Cake)')
+        eat = Action(expr('Eat(Cake)'), [{have}, set()], [{eaten}, {have}])
+        problem = PddlProblem(FluentState([have], [eaten]), [eaten], [eat], cache_size=1, cache_policy='fifo')
+        self.assertEqual((problem.heuristic_cache.maxsize, problem.heuristic_cache.policy), (1, 'fifo'))
+        self.assertEqual(len(astar_search(problem, problem.h_unmet_goals).solution()), 1)
+        self.assertEqual(len(problem.heuristic_cache), 1)
+        self.assertEqual(problem.heuristic_cache.evictions, 1)
+
+
+class Test_3_RandomProblems(unittest.TestCase):
+    def test_1_air_cargo_random(self):
+        problem = air_cargo_random(4, 3, 5, seed=7)
+        self.assertEqual((len(problem.cargos), len(problem.planes), len(problem.airports)), (4, 3, 5))
+        self.assertEqual(len(problem.actions_list), 2 * 4 * 3 * 5 + 3 * 5 * 4)
+        self.assertEqual(len(problem.goal), 4)
+        self.assertFalse(problem.goal_test(problem.initial))
+        same = air_cargo_random(4, 3, 5, seed=7)
+        self.assertEqual((same.initial, same.goal), (problem.initial, problem.goal))
+
+        node = greedy_best_first_graph_search(problem, problem.h_ff)
+        self.assertTrue(problem.goal_test(node.state))
+        with self.assertRaises(ValueError):
+            air_cargo_random(2, 2, 1)
+
+
+class Test_4_Grounding(unittest.TestCase):
+    def test_1_make_literal(self):
+        literal = make_literal('At', 'C1', 'SFO')
+        self.assertEqual(literal, expr('At(C1, SFO)'))
+        self.assertIs(literal, make_literal('At', 'C1', 'SFO'))
+
+    def test_2_prune_unreachable(self):
+        have, eaten, wish = expr('Have(Cake)'), expr('Eaten(Cake)'), expr('Wish(Cake)')
+        eat = Action(expr('Eat(Cake)'), [{have}, set()], [{eaten}, {have}])
+        bake = Action(expr('Bake(Cake)'), [set(), {have, wish}], [{have}, set()])
+        wished = Action(expr('Share(Cake)'), [{wish}, set()], [{eaten}, set()])
+        initial, actions = prune_unreachable(FluentState([have], [eaten, wish]), [eaten], [eat, bake, wished])
+        self.assertEqual((initial.pos, initial.neg), ([have], [eaten]))
+        self.assertEqual([a.name for a in actions], ['Eat', 'Bake'])
+        self.assertEqual(actions[1].precond_neg, {have})
+
+        # every action of the air cargo problems is reachable
+        expected = [20, 72, 88, 104]
+        self.assertEqual([len(p().actions_list) for p in [air_cargo_p1, air_cargo_p2, air_cargo_p3, air_cargo_p4]],
+                         expected)
+
+
+class Test_5_ZobristStates(unittest.TestCase):
+    def test_1_incremental_hashing(self):
+        problem = air_cargo_p2()
+        state = problem.initial
+        self.assertIsInstance(state, ZobristState)
+        for _ in range(6):
+            action = problem.actions(state)[-1]
+            state = problem.result(state, action)
+            fresh = problem.make_state(state.packed)
+            self.assertEqual(hash(state), hash(fresh))
+            self.assertEqual(state, fresh)
+            self.assertIs(problem.state_key(state), state)
+            self.assertEqual(pack_state(tuple(state)), state.packed)
+
+        # states behave like the tuples of booleans used by the heuristics
+        values = tuple(state)
+        self.assertEqual(len(state), len(problem.state_map))
+        self.assertEqual([state[i] for i in range(len(state))], list(values))
+        self.assertEqual(state[-1], values[-1])
+        self.assertEqual(state[:3], values[:3])
+
+    def test_2_masks_match_fluents(self):
+        problem = air_cargo_p1()
+        state = problem.initial
+        fluents = decode_state(state, problem.state_map)
+        expected = [a for a in problem.actions_list
+                    if a.precond_pos <= set(fluents.pos) and a.precond_neg <= set(fluents.neg)]
+        self.assertEqual(problem.actions(state), expected)
+        self.assertEqual(problem.actions(tuple(state)), expected)
+        self.assertIsInstance(problem.result(tuple(state), expected[0]), ZobristState)
+        self.assertFalse(problem.goal_test(state))
+        self.assertTrue(problem.goal_test(astar_search(problem, problem.h_unmet_goals).state))
+
+
+if __name__ == '__main__':
+    unittest.main()
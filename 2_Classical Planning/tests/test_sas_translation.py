@@ -0,0 +1,120 @@
+
+import unittest
+
+from aimacode.planning import Action
+from aimacode.search import (
+    InstrumentedProblem, Node, astar_search, breadth_first_search, lazy_greedy_best_first_search
+)
+from _utils import FluentState, make_literal
+from air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_random
+from example_have_cake import have_cake
+from my_planning_graph import PlanningGraph
+from pddl import PddlProblem
+from sas_translation import FiniteDomainProblem, synthesize_mutex_groups
+
+
+def crane():
+    """ A crane that moves between two places and can lift itself off the ground """
+    at_a, at_b, lifted = make_literal('At', 'R', 'A'), make_literal('At', 'R', 'B'), make_literal('Lifted', 'R')
+    actions = [Action(make_literal('Move', 'R', 'A', 'B'), [{at_a}, set()], [{at_b}, {at_a}]),
+               Action(make_literal('Move', 'R', 'B', 'A'), [{at_b}, set()], [{at_a}, {at_b}]),
+               Action(make_literal('Lift', 'R'), [set(), {lifted}], [{lifted}, {at_a, at_b}])]
+    return PddlProblem(FluentState([at_a], [at_b, lifted]), [lifted], actions)
+
+
+class Test_1_MutexGroups(unittest.TestCase):
+    def test_1_air_cargo(self):
+        groups = dict(synthesize_mutex_groups(air_cargo_p1()))
+        self.assertEqual(len(groups), 4)
+        cargo = tuple(make_literal(*args) for args in [('At', 'C1', 'JFK'), ('At', 'C1', 'SFO'),
+                                                       ('In', 'C1', 'P1'), ('In', 'C1', 'P2')])
+        self.assertTrue(groups[cargo])
+        self.assertTrue(groups[(make_literal('At', 'P1', 'JFK'), make_literal('At', 'P1', 'SFO'))])
+
+    def test_2_no_groups(self):
+        # a cake can be had and eaten at the same time
+        self.assertEqual(synthesize_mutex_groups(have_cake()), [])
+        # the crane is at most at one place, but it can leave the ground
+        self.assertEqual(synthesize_mutex_groups(crane()),
+                         [((make_literal('At', 'R', 'A'), make_literal('At', 'R', 'B')), False)])
+
+
+class Test_2_FiniteDomainProblem(unittest.TestCase):
+    def assertSameTransitions(self, problem):
+        translated = FiniteDomainProblem(problem)
+        states, queue = {problem.initial}, [problem.initial]
+        while queue:
+            state = queue.pop()
+            encoded = translated.encode(state)
+            self.assertEqual(translated.decode(encoded), state)
+            self.assertEqual(translated.goal_test(encoded), problem.goal_test(state))
+            self.assertEqual(set(translated.actions(encoded)), set(problem.actions(state)))
+            for action in problem.actions(state):
+                child = problem.result(state, action)
+                self.assertEqual(translated.decode(translated.result(encoded, action)), child)
+                if child not in states:
+                    states.add(child)
+                    queue.append(child)
+        return translated
+
+    def test_1_encoding(self):
+        translated = self.assertSameTransitions(air_cargo_p1())
+        # two cargo variables with four values and two plane variables with two values
+        self.assertEqual([len(values) for values in translated.variables], [4, 4, 2, 2])
+        self.assertEqual(translated.state_bits, 6)
+        self.assertEqual(len(air_cargo_p2().state_map), 27)
+        self.assertEqual(FiniteDomainProblem(air_cargo_p2()).state_bits, 15)
+
+    def test_2_negative_preconditions_and_deletes(self):
+        self.assertSameTransitions(have_cake())
+        translated = self.assertSameTransitions(crane())
+        self.assertEqual(translated.variables[0][0], None)
+
+    def test_3_searches(self):
+        for problem_fn in [air_cargo_p2, lambda: air_cargo_random(3, 2, 3, seed=1)]:
+            problem = problem_fn()
+            translated = InstrumentedProblem(FiniteDomainProblem(problem))
+            node = astar_search(translated, translated.h_unmet_goals)
+            self.assertEqual(len(node.solution()), len(breadth_first_search(problem).solution()))
+            self.assertEqual(translated.h_ff(Node(translated.initial)), problem.h_ff(Node(problem.initial)))
+            # the plan is made of actions of the original problem
+            state = problem.initial
+            for action in node.solution():
+                self.assertIn(action, problem.actions(state))
+                state = problem.result(state, action)
+            self.assertTrue(problem.goal_test(state))
+
+    def test_4_relaxed_heuristics(self):
+        problem = air_cargo_p2()
+        translated = FiniteDomainProblem(problem)
+        states = [problem.initial] + [problem.result(problem.initial, a) for a in problem.actions(problem.initial)]
+        for state in states:
+            node, encoded = Node(state), Node(translated.encode(state))
+            for name in ['h_max', 'h_add', 'h_ff']:
+                self.assertEqual(getattr(translated, name)(encoded), getattr(problem, name)(node))
+            self.assertEqual(translated.preferred_ff(encoded), problem.preferred_ff(node))
+        # the heuristics are computed on the packed values, with a cache of their own
+        self.assertIsNot(translated.heuristic_cache, problem.heuristic_cache)
+        self.assertIsInstance(next(iter(translated.heuristic_cache._store))[1], int)
+        self.assertFalse(hasattr(translated, 'h_pg_levelsum'))
+        node = lazy_greedy_best_first_search(translated, translated.h_ff, preferred=translated.preferred_ff)
+        self.assertTrue(translated.goal_test(node.state))
+
+
+class Test_3_StaticMutexes(unittest.TestCase):
+    def test_1_planning_graph(self):
+        problem = air_cargo_p1()
+        at, loaded = make_literal('At', 'C1', 'SFO'), make_literal('In', 'C1', 'P1')
+        self.assertIn(loaded, problem.static_mutexes[at])
+        plain = PlanningGraph(problem, problem.initial, ignore_mutexes=True).fill()
+        static = PlanningGraph(problem, problem.initial, ignore_mutexes=True,
+                               static_mutexes=problem.static_mutexes).fill()
+        self.assertFalse(plain.literal_layers[-1].is_mutex(at, loaded))
+        self.assertTrue(static.literal_layers[-1].is_mutex(at, loaded))
+
+        problem.use_static_mutexes = True
+        self.assertEqual(problem.h_pg_setlevel(Node(problem.initial)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
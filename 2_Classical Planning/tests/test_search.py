@@ -0,0 +1,146 @@
+
+import unittest
+
+from aimacode.search import (
+    Node, InstrumentedProblem, breadth_first_search, uniform_cost_search, astar_search, depth_first_graph_search,
+    graph_search, iterative_deepening_astar_search, sma_star_search, anytime_weighted_astar_search,
+    anytime_astar_search, greedy_best_first_graph_search, lazy_greedy_best_first_search
+)
+from aimacode.utils import IndexedPriorityQueue, IndexedStack, Stack, FIFOQueue, memoize
+from air_cargo_problems import air_cargo_p1, air_cargo_random
+
+
+class Test_1_Frontiers(unittest.TestCase):
+    def test_1_indexed_priority_queue(self):
+        # items are (name, priority) pairs keyed by name
+        queue = IndexedPriorityQueue(min, f=lambda x: x[1], key=lambda x: x[0])
+        for item in [('a', 5), ('b', 3), ('c', 3), ('d', 7), ('e', 1)]:
+            queue.append(item)
+        queue.append(('d', 2))      # decrease-key
+        queue.append(('a', 9))      # worse priority; keep the incumbent
+        self.assertEqual(len(queue), 5)
+        self.assertEqual(queue[('a', None)], ('a', 5))
+        self.assertIn(('c', None), queue)
+        del queue[('e', None)]
+        self.assertNotIn(('e', None), queue)
+        # equal priorities are popped first-in first-out
+        self.assertEqual([queue.pop() for _ in range(len(queue))],
+                         [('d', 2), ('b', 3), ('c', 3), ('a', 5)])
+        self.assertEqual(queue.peak, 5)
+
+    def test_2_tie_breaking(self):
+        queue = IndexedPriorityQueue(min, f=lambda x: x[1], key=lambda x: x[0], tie=lambda x: -len(x[0]))
+        for item in [('a', 1), ('bb', 1), ('ccc', 0)]:
+            queue.append(item)
+        self.assertEqual([queue.pop()[0] for _ in range(3)], ['ccc', 'bb', 'a'])
+
+    def test_3_indexed_stack(self):
+        stack = IndexedStack(key=str.lower)
+        stack.extend(['a', 'B', 'b'])
+        self.assertIn('A', stack)
+        self.assertEqual(stack.pop(), 'b')
+        self.assertIn('b', stack)
+        self.assertEqual(stack.pop(), 'B')
+        self.assertNotIn('b', stack)
+        self.assertEqual((len(stack), stack.peak), (1, 3))
+
+    def test_4_keyed_fifo_queue(self):
+        queue = FIFOQueue(key=str.lower)
+        queue.extend(['a', 'B'])
+        self.assertIn('b', queue)
+        self.assertEqual(queue.pop(), 'a')
+        self.assertNotIn('A', queue)
+
+
+class Test_2_Searches(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_p1()
+
+    def test_1_best_first_graph_search(self):
+        for search, args in [(uniform_cost_search, ()), (astar_search, (self.problem.h_unmet_goals,))]:
+            ip = InstrumentedProblem(self.problem)
+            node = search(ip, *args)
+            self.assertTrue(self.problem.goal_test(node.state))
+            self.assertEqual(len(node.solution()), 6)
+            self.assertGreater(ip.search_stats['max_frontier'], 0)
+
+    def test_2_depth_first_graph_search(self):
+        # the hashed frontier must visit exactly the same nodes as the list-based one
+        expected = graph_search(self.problem, Stack())
+        node = depth_first_graph_search(self.problem)
+        self.assertEqual(node.solution(), expected.solution())
+        self.assertTrue(self.problem.goal_test(node.state))
+
+    def test_3_memory_bounded_searches(self):
+        ip = InstrumentedProblem(self.problem)
+        node = iterative_deepening_astar_search(ip, self.problem.h_max)
+        self.assertEqual(len(node.solution()), 6)
+        self.assertGreater(ip.search_stats['iterations'], 1)
+        self.assertGreater(ip.search_stats['reexpansions'], 0)
+        ip = InstrumentedProblem(self.problem)
+        node = iterative_deepening_astar_search(ip, self.problem.h_max, table_size=10)
+        self.assertEqual(len(node.solution()), 6)
+        self.assertEqual(ip.search_stats['max_table'], 10)
+
+        for max_nodes in [1000, 25]:
+            ip = InstrumentedProblem(self.problem)
+            node = sma_star_search(ip, self.problem.h_max, max_nodes=max_nodes)
+            self.assertTrue(self.problem.goal_test(node.state))
+            self.assertEqual(len(node.solution()), 6)
+            self.assertLessEqual(ip.search_stats['max_nodes_used'], max_nodes)
+        self.assertGreater(ip.search_stats['forgotten'], 0)
+        # a budget that barely fits the solution path still finds an optimal plan
+        problem = air_cargo_random(2, 2, 3, seed=1)
+        for max_nodes in [10, 11]:
+            node = sma_star_search(problem, problem.h_max, max_nodes=max_nodes)
+            self.assertEqual(node.path_cost, 6)
+
+    def test_4_anytime_search(self):
+        problem = air_cargo_random(3, 2, 4, seed=2)
+        ip = InstrumentedProblem(problem)
+        nodes = list(anytime_weighted_astar_search(ip, problem.h_unmet_goals, 5, 1))
+        lengths = [len(node.solution()) for node in nodes]
+        self.assertGreater(len(lengths), 1)
+        # every new solution is strictly cheaper than the previous one
+        costs = [node.path_cost for node in nodes]
+        self.assertTrue(all(a > b for a, b in zip(costs, costs[1:])))
+        self.assertEqual(lengths[-1], len(astar_search(problem, problem.h_unmet_goals).solution()))
+        self.assertEqual(ip.search_stats, {'weight': 1.0, 'solutions': len(lengths)})
+
+        node = anytime_astar_search(self.problem, self.problem.h_unmet_goals, time_limit=10)
+        self.assertEqual(len(node.solution()), 6)
+        self.assertIsNone(anytime_astar_search(self.problem, self.problem.h_unmet_goals, time_limit=0))
+
+    def test_5_lazy_greedy_search(self):
+        problem = air_cargo_random(8, 4, 8, seed=1)
+        eager = InstrumentedProblem(problem)
+        greedy_best_first_graph_search(eager, problem.h_ff)
+        eager_evaluations = problem.heuristic_cache.misses
+
+        for preferred in [None, problem.preferred_ff]:
+            problem = air_cargo_random(8, 4, 8, seed=1)
+            ip = InstrumentedProblem(problem)
+            node = lazy_greedy_best_first_search(ip, problem.h_ff, preferred and problem.preferred_ff)
+            self.assertTrue(problem.goal_test(node.state))
+            # one evaluation per expanded node (preferred_ff also caches h_ff)
+            self.assertEqual(ip.search_stats['evaluations'], ip.succs)
+            self.assertEqual(problem.heuristic_cache.misses, ip.succs)
+        self.assertGreater(ip.search_stats['preferred_expansions'], 0)
+        self.assertLess(10 * ip.search_stats['evaluations'], eager_evaluations)
+
+    def test_6_compact_nodes(self):
+        root = Node(self.problem.initial)
+        child = root.child_node(self.problem, self.problem.actions(root.state)[0])
+        self.assertFalse(hasattr(child, '__dict__'))
+        f = memoize(lambda n: n.path_cost + 10, 'f')
+        self.assertEqual((f(child), child.f), (11, 11))
+        self.assertEqual(child.path(), [root, child])
+        self.assertEqual(child.depth, 1)
+
+        node = breadth_first_search(self.problem)
+        self.assertEqual(len(node.solution()), 6)
+        self.assertTrue(self.problem.goal_test(node.state))
+
+
+if __name__ == '__main__':
+    unittest.main()
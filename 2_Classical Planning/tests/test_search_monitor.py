@@ -0,0 +1,67 @@
+
+import json
+import os
+import tempfile
+import unittest
+
+from aimacode.search import (
+    InstrumentedProblem, astar_search, breadth_first_search, depth_first_graph_search,
+    iterative_deepening_astar_search
+)
+from air_cargo_problems import air_cargo_p1
+from search_monitor import SearchMonitor
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def expanded(self, node, frontier_size, explored_size):
+        self.events.append((node.depth, frontier_size, explored_size))
+
+
+class Test_1_SearchObservers(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_p1()
+
+    def test_1_expansion_events(self):
+        for search, args in [(breadth_first_search, ()), (depth_first_graph_search, ()),
+                             (astar_search, (self.problem.h_unmet_goals,)),
+                             (iterative_deepening_astar_search, (self.problem.h_max,))]:
+            ip = InstrumentedProblem(self.problem)
+            recorder = Recorder()
+            ip.add_observer(recorder)
+            search(ip, *args)
+            # every expansion generates the successors of the node once
+            self.assertEqual(len(recorder.events), ip.succs)
+
+    def test_2_timers(self):
+        # nothing is timed without an observer or a timed heuristic
+        ip = InstrumentedProblem(self.problem)
+        astar_search(ip, self.problem.h_ff)
+        self.assertEqual(ip.successor_time, 0)
+        ip = InstrumentedProblem(self.problem)
+        astar_search(ip, ip.timed(self.problem.h_ff))
+        self.assertGreater(ip.heuristic_time, 0)
+        self.assertGreater(ip.successor_time, 0)
+
+    def test_3_progress_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'progress.jsonl')
+            ip = InstrumentedProblem(self.problem)
+            with SearchMonitor(ip, path, interval=0, labels={'search': 'bfs'}) as monitor:
+                breadth_first_search(ip)
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), ip.succs + 1)
+        self.assertTrue(records[-1]['final'])
+        self.assertEqual(records[-1]['expansions'], ip.succs)
+        self.assertEqual(records[-1]['search'], 'bfs')
+        self.assertEqual(records[-1]['peak_explored'], max(r['explored'] for r in records))
+        summary = monitor.summary()
+        self.assertGreater(summary['expansions_per_sec'], 0)
+        self.assertGreater(summary['peak_rss_mb'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+
+import unittest
+
+from aimacode.planning import Action
+from aimacode.search import InstrumentedProblem, astar_search, breadth_first_search
+from _utils import FluentState, make_literal
+from air_cargo_problems import air_cargo_p1, air_cargo_p2
+from pddl import PddlProblem
+
+
+def switches(n):
+    """ n independent switches that must all be turned on """
+    on = [make_literal('On', 'S{}'.format(i)) for i in range(n)]
+    actions = []
+    for i, fluent in enumerate(on):
+        actions.append(Action(make_literal('TurnOn', 'S{}'.format(i)), [set(), {fluent}], [{fluent}, set()]))
+        actions.append(Action(make_literal('TurnOff', 'S{}'.format(i)), [{fluent}, set()], [set(), {fluent}]))
+    return PddlProblem(FluentState([], on), on, actions)
+
+
+class Test_1_StubbornSets(unittest.TestCase):
+    def test_1_independent_actions(self):
+        problem = switches(5)
+        problem.use_stubborn_sets = True
+        full, pruned = InstrumentedProblem(switches(5)), InstrumentedProblem(problem)
+        self.assertEqual(len(problem.actions(problem.initial)), 1)
+        self.assertEqual(len(breadth_first_search(pruned).solution()),
+                         len(breadth_first_search(full).solution()))
+        # the interleavings of the switches are not expanded
+        self.assertEqual(pruned.succs, 5)
+        self.assertGreater(full.succs, 2 ** 4)
+
+    def test_2_interference(self):
+        problem = air_cargo_p1()
+        stubborn = problem.stubborn_sets
+        fly = {str(a): i for i, a in enumerate(stubborn.actions)}
+        interfering = set(str(stubborn.actions[i]) for i in stubborn.interfering(fly['Fly(P1, SFO, JFK)']))
+        self.assertIn('Load(C1, P1, SFO)', interfering)
+        self.assertIn('Fly(P1, SFO, JFK)', set(str(stubborn.actions[i])
+                                              for i in stubborn.interfering(fly['Load(C1, P1, SFO)'])))
+        # flights from another airport never share a state with this one
+        self.assertNotIn('Fly(P1, JFK, SFO)', interfering)
+        self.assertNotIn('Load(C1, P2, SFO)', interfering)
+
+    def test_3_optimal_plans(self):
+        for problem_fn in [air_cargo_p1, air_cargo_p2]:
+            problem = problem_fn()
+            expected = len(astar_search(problem, problem.h_unmet_goals).solution())
+            problem.use_stubborn_sets = True
+            self.assertEqual(len(astar_search(problem, problem.h_unmet_goals).solution()), expected)
+            self.assertEqual(len(breadth_first_search(problem).solution()), expected)
+            self.assertLessEqual(problem.stubborn_sets.expanded, problem.stubborn_sets.applicable)
+            # pruning can be switched off again
+            problem.use_stubborn_sets = False
+            self.assertEqual(len(problem.actions(problem.initial)), 4 if problem_fn is air_cargo_p1 else 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+
+import unittest
+
+from aimacode.search import InstrumentedProblem, Node, astar_search, breadth_first_search
+from air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_random
+from symmetries import ObjectSymmetries
+
+
+class Test_1_ObjectSymmetries(unittest.TestCase):
+    def test_1_detection(self):
+        # no goal mentions the planes, and the other objects are told apart by the goals
+        self.assertEqual(air_cargo_p1().symmetries.classes, [['P1', 'P2']])
+        # cargos with the same start and goal airports are also interchangeable
+        self.assertEqual(air_cargo_p2().symmetries.classes, [['C2', 'C3'], ['P1', 'P2', 'P3']])
+
+    def test_2_canonical_states(self):
+        problem = air_cargo_p1()
+        problem.use_symmetries = True
+        actions = {str(a): a for a in problem.actions_list}
+        one_flight = problem.result(problem.initial, actions['Fly(P1, SFO, JFK)'])
+        swapped = problem.result(one_flight, actions['Fly(P2, JFK, SFO)'])
+        # the planes have swapped airports, so the state only differs from the initial state by their names
+        self.assertNotEqual(swapped, problem.initial)
+        self.assertEqual(problem.state_key(swapped), problem.state_key(problem.initial))
+        self.assertNotEqual(problem.state_key(one_flight), problem.state_key(problem.initial))
+        self.assertEqual(problem.h_ff(Node(swapped)), problem.h_ff(Node(problem.initial)))
+
+    def test_3_searches(self):
+        for problem_fn in [air_cargo_p2, lambda: air_cargo_random(2, 5, 3, seed=2)]:
+            full, reduced = InstrumentedProblem(problem_fn()), InstrumentedProblem(problem_fn())
+            reduced.problem.use_symmetries = True
+            for search in [breadth_first_search, lambda p: astar_search(p, p.problem.h_unmet_goals)]:
+                node = search(reduced)
+                self.assertTrue(reduced.goal_test(node.state))
+                self.assertEqual(len(node.solution()), len(search(full).solution()))
+            self.assertLess(3 * reduced.succs, full.succs)
+
+    def test_4_bounded_cache(self):
+        problem = air_cargo_p2()
+        bounded = ObjectSymmetries(problem, cache_size=4)
+        states = [problem.initial] + [problem.result(problem.initial, a) for a in problem.actions(problem.initial)]
+        for state in states:
+            self.assertEqual(bounded.canonical(state.packed), problem.symmetries.canonical(state.packed))
+        self.assertEqual(len(bounded._canonical), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+
+import pickle
+import unittest
+
+from aimacode.utils import Expr, expr
+
+
+class Test_1_Expressions(unittest.TestCase):
+    def test_1_interning(self):
+        literal = Expr('At', Expr('C1'), Expr('SFO'))
+        self.assertIs(literal, expr('At(C1, SFO)'))
+        self.assertIs(~literal, ~expr('At(C1, SFO)'))
+        self.assertIs(~~literal, literal)
+        self.assertIs(pickle.loads(pickle.dumps(~literal)), ~literal)
+        # numbers that compare equal but print differently stay distinct
+        self.assertIsNot(Expr('+', 1), Expr('+', 1.0))
+        self.assertIsNot(Expr('f', Expr('g', 1)), Expr('f', Expr('g', 1.0)))
+        self.assertIs(Expr('f', Expr('g', 1)), Expr('f', Expr('g', 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()